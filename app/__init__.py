@@ -1,2 +1,131 @@
 # App package initialization
 
+import os
+
+from flask import Flask, Response, g, jsonify, request
+from flask_cors import CORS
+from config import Config
+from app.routes.admin_routes import create_admin_blueprint
+from app.routes.public_routes import create_public_blueprint
+from app.utils import database
+from app.utils.indexes import ensure_indexes, verify_query_plans
+from app.utils.metrics import metrics
+from app.utils.profiling import PROFILE_HEADER, profiling_enabled, start_profile, finish_profile, profile_store
+
+def create_app(config=Config, public_routes=True):
+    """
+    Create and configure the Flask application
+    
+    Call this once per process after any fork (e.g. in each gunicorn worker),
+    so every worker opens its own MongoDB client.
+    
+    Args:
+        config: Configuration class
+        public_routes: Register the public /quizzes blueprint; False when the
+            ASGI router serves those routes natively (see app/asgi.py)
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    # Expose the pagination cursor and profile report headers to browser clients
+    CORS(app, expose_headers=["X-Next-Cursor", "X-Profile-Id"])
+    
+    db = None
+    error_message = None
+    
+    if config.METRICS_ENABLED:
+        @app.before_request
+        def start_request_metrics():
+            g.metrics_started = metrics.request_started()
+        
+        @app.after_request
+        def record_request_metrics(response):
+            started = g.pop("metrics_started", None)
+            if started is not None:
+                # Route templates keep the label set bounded
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                metrics.request_finished(started, request.method, route, response.status_code)
+            return response
+        
+        @app.route("/metrics")
+        def prometheus_metrics():
+            return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+    
+    # On Railway, MONGO_URI is set in the dashboard; locally it comes from .env
+    if not os.getenv("MONGO_URI"):
+        error_message = "MONGO_URI environment variable is not set"
+    else:
+        try:
+            db = database.get_db()
+        except Exception as e:
+            error_message = f"MongoDB connection failed: {str(e)}"
+            db = None
+    
+    if db is not None and config.ENSURE_INDEXES_ON_STARTUP:
+        try:
+            for collection_name, result in ensure_indexes(db).items():
+                if isinstance(result, str):
+                    print(f"✗ Index creation failed on {collection_name}: {result}")
+        except Exception as e:
+            print(f"✗ Index creation failed: {e}")
+    
+    if db is not None and config.VERIFY_QUERY_PLANS:
+        # Test mode: refuse to start if any controller query scans a collection
+        collscans = [q["name"] for q in verify_query_plans(db) if q["collscan"]]
+        if collscans:
+            raise RuntimeError(f"COLLSCAN in query plans: {', '.join(collscans)}")
+    
+    if db is not None and profiling_enabled(config):
+        # Without a secret or sampling rate no hook is installed, so profiling costs nothing
+        @app.before_request
+        def start_request_profile():
+            g.profile = start_profile(request.method, request.path, request.headers.get(PROFILE_HEADER))
+        
+        @app.after_request
+        def store_request_profile(response):
+            profile = g.pop("profile", None)
+            if profile is not None:
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                report = finish_profile(profile, route, response.status_code)
+                profile_store.save(db, report)
+                response.headers["X-Profile-Id"] = report["_id"]
+            return response
+        
+        @app.teardown_request
+        def stop_request_profile(error):
+            # after_request is skipped if the response could not be built
+            profile = g.pop("profile", None)
+            if profile is not None:
+                finish_profile(profile, None, 500)
+    
+    # Register blueprints only if db is available
+    if db is not None:
+        try:
+            app.register_blueprint(create_admin_blueprint(db))
+            if public_routes:
+                app.register_blueprint(create_public_blueprint(db))
+        except Exception as e:
+            error_message = f"Failed to register blueprints: {str(e)}"
+    
+    @app.route("/")
+    def home():
+        if db is None:
+            return jsonify({
+                "error": "MongoDB connection not configured",
+                "message": error_message or "Please set MONGO_URI environment variable"
+            }), 500
+        return jsonify({"message": "Quiz Management System API is running!"})
+    
+    @app.route("/health")
+    def health():
+        status = "healthy" if db is not None else "unhealthy"
+        response = {
+            "status": status,
+            "mongodb_connected": db is not None
+        }
+        if db is not None:
+            response["pool"] = database.pool_metrics.snapshot()
+        if error_message:
+            response["error"] = error_message
+        return jsonify(response), 200 if db is not None else 503
+    
+    return app
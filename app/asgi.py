@@ -0,0 +1,124 @@
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount, Route
+from config import Config
+from app import create_app
+from app.routes.async_public_routes import create_async_public_routes
+from app.utils import database
+from app.utils.metrics import metrics
+from app.utils.profiling import PROFILE_HEADER, profiling_enabled, start_profile, finish_profile, profile_store
+
+class RequestMetricsMiddleware:
+    """
+    Record request metrics of the native asyncio routes
+    
+    Requests passed on to the Flask app are recorded by its own request
+    hooks. Route templates are reported in Flask syntax, so both servers
+    produce the same series.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = metrics.request_started()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            if isinstance(route, Route):
+                path = route.path.replace("{", "<").replace("}", ">")
+                metrics.request_finished(started, scope["method"], path, status[0])
+
+class RequestProfileMiddleware:
+    """
+    Profile requests of the native asyncio routes (see app/utils/profiling.py)
+    
+    Wraps each native route, so requests passed on to the Flask app are left
+    to its own profiling hooks.
+    """
+    
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+    
+    async def __call__(self, scope, receive, send):
+        profile = start_profile(scope["method"], scope["path"], Headers(scope=scope).get(PROFILE_HEADER))
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        
+        route = scope["route"].path.replace("{", "<").replace("}", ">")
+        
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                report = finish_profile(profile, route, message["status"])
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", report["_id"].encode("latin-1"))]
+                await run_in_threadpool(profile_store.save, self.db, report)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            # The response could not be started
+            if not profile.finished:
+                finish_profile(profile, None, 500)
+
+def create_asgi_app(config=Config):
+    """
+    Create the ASGI application (SERVER_INTERFACE=asgi)
+    
+    The public /quizzes endpoints run natively on asyncio with
+    AsyncMongoClient, so an in-flight request holds no thread while it waits
+    on MongoDB. Every other path (admin, /health, /) is served by the Flask
+    app from create_app() in a thread pool of WEB_THREADS threads; that app
+    is built without the public blueprint, so the process has one public
+    controller and one attempt writer.
+    """
+    flask_app = create_app(config, public_routes=False)
+    routes = []
+    if "admin" in flask_app.blueprints:
+        # Only when create_app() reached MongoDB; otherwise Flask reports the error
+        route_middleware = None
+        if profiling_enabled(config):
+            route_middleware = [Middleware(RequestProfileMiddleware, db=database.get_db())]
+        routes = create_async_public_routes(database.get_async_db(), database.get_db(), route_middleware)
+    routes.append(Mount("", app=WSGIMiddleware(flask_app, workers=config.WEB_THREADS)))
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await database.close_async_db()
+    
+    middleware = [Middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Profile-Id"]
+    )]
+    if config.METRICS_ENABLED:
+        middleware.append(Middleware(RequestMetricsMiddleware))
+    
+    return Starlette(
+        routes=routes,
+        # Same policy as flask-cors in create_app(); replaces its headers on Flask responses
+        middleware=middleware,
+        lifespan=lifespan
+    )
@@ -1,9 +1,33 @@
-from flask import jsonify
+from datetime import datetime
+from flask import Response, jsonify
 from bson import ObjectId
 from bson.errors import InvalidId
 from app.models.quiz import QuizModel
 from app.models.question import QuestionModel
-from app.utils.slug import generate_unique_slug
+from app.models.attempt import AttemptModel
+from app.models.regrade_job import RegradeJobModel
+from app.models.quiz_analytics import QuizAnalyticsModel
+from app.models.quiz_stats import QuizStatsModel
+from app.models.request_profile import RequestProfileModel
+from app.utils.slug import save_with_unique_slug
+from app.utils.validation import QUESTION_TYPES, question_error, text_answer_error, scoring_error, delivery_error
+from app.utils.answer_key_cache import answer_key_cache
+from app.utils.response_cache import response_cache
+from app.utils.pagination import parse_limit, fetch_page
+from app.utils.queries import (
+    QUIZ_LIST_FIELD, QUESTION_LIST_FIELD, ATTEMPT_LIST_FIELD, QUESTION_ORDER, EXPORT_ORDER,
+    quiz_questions_filter, question_counts_pipeline
+)
+from app.utils.profiling import profile_store
+from app.utils.read_model import refresh_read_model
+from app.utils.regrade import RegradeInProgress, claim_regrade_job, start_regrade_thread
+from app.utils.analytics import get_quiz_analytics, invalidate_quiz_analytics
+from app.utils.export import EXPORT_FORMATS, attempt_filter, iter_csv, iter_ndjson
+from app.utils.quiz_transfer import (
+    QUIZ_FORMATS, parse_quiz_import, prepare_import, question_documents, insert_quiz,
+    iter_quiz_json, iter_quiz_ndjson
+)
+from config import Config
 
 class AdminController:
     """Controller for admin operations"""
@@ -13,35 +37,65 @@ class AdminController:
         self.quizzes_collection = db.quizzes
         self.questions_collection = db.questions
     
+    def _quiz_changed(self, quiz_id):
+        """Refresh derived per-quiz state after a quiz or one of its questions changed"""
+        answer_key_cache.invalidate(quiz_id)
+        response_cache.invalidate(quiz_id)
+        if Config.QUIZ_READ_MODEL:
+            refresh_read_model(self.db, quiz_id)
+    
     def create_quiz(self, data):
         """Create a new quiz"""
         if not data.get("title"):
             return {"error": "Title is required"}, 400
-        
-        # Generate unique slug
-        slug = generate_unique_slug(self.db, data.get("title"))
-        data["slug"] = slug
+        error = delivery_error(data)
+        if error:
+            return {"error": error}, 400
         
         quiz = QuizModel.create_quiz(data)
-        result = self.quizzes_collection.insert_one(quiz)
-        quiz["_id"] = result.inserted_id
+        
+        def insert(slug):
+            quiz["slug"] = slug
+            quiz["_id"] = self.quizzes_collection.insert_one(quiz).inserted_id
+        
+        # Insert with a unique slug, retrying if a concurrent create takes it first
+        save_with_unique_slug(self.db, data["title"], insert)
+        if quiz.get("published"):
+            self._quiz_changed(quiz["_id"])
         
         return jsonify(QuizModel.to_dict(quiz)), 201
     
-    def get_all_quizzes(self):
-        """Get all quizzes with question counts"""
-        quizzes = list(self.quizzes_collection.find().sort("created_at", -1))
+    def get_all_quizzes(self, limit=None, after=None):
+        """Get quizzes with question counts, optionally one page at a time"""
+        try:
+            quizzes, next_cursor = fetch_page(
+                self.quizzes_collection, {}, QUIZ_LIST_FIELD, parse_limit(limit), after, descending=True
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        # Count questions for the whole page in a single aggregation
+        question_counts = self._count_questions([quiz["_id"] for quiz in quizzes])
         
-        # Get question counts for each quiz
         quiz_list = []
         for quiz in quizzes:
             quiz_dict = QuizModel.to_dict(quiz)
-            # Count questions for this quiz
-            question_count = self.questions_collection.count_documents({"quiz_id": quiz["_id"]})
-            quiz_dict["question_count"] = question_count
+            quiz_dict["question_count"] = question_counts.get(quiz["_id"], 0)
             quiz_list.append(quiz_dict)
         
-        return jsonify(quiz_list), 200
+        response = jsonify(quiz_list)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response, 200
+    
+    def _count_questions(self, quiz_ids):
+        """Count questions per quiz with one $group aggregation"""
+        if not quiz_ids:
+            return {}
+        return {
+            row["_id"]: row["count"]
+            for row in self.questions_collection.aggregate(question_counts_pipeline(quiz_ids))
+        }
     
     def get_quiz_by_id(self, quiz_id, include_questions=False):
         """Get a quiz by ID"""
@@ -59,8 +113,8 @@ class AdminController:
             # If include_questions is True, fetch and include all questions
             if include_questions:
                 questions = list(
-                    self.questions_collection.find({"quiz_id": ObjectId(quiz_id)})
-                    .sort("created_at", 1)
+                    self.questions_collection.find(quiz_questions_filter(ObjectId(quiz_id)))
+                    .sort(QUESTION_ORDER)
                 )
                 quiz_dict["questions"] = [
                     QuestionModel.to_dict(q, include_correct_answers=True)
@@ -78,15 +132,27 @@ class AdminController:
             if not quiz:
                 return {"error": "Quiz not found"}, 404
             
-            # If title is being updated, regenerate slug
-            if "title" in data and data["title"] != quiz.get("title"):
-                data["slug"] = generate_unique_slug(self.db, data["title"], exclude_id=quiz_id)
+            error = delivery_error(data)
+            if error:
+                return {"error": error}, 400
             
+            # If title is being updated, regenerate slug
+            title_changed = "title" in data and data["title"] != quiz.get("title")
             updated_quiz = QuizModel.update_quiz(quiz, data)
-            self.quizzes_collection.update_one(
-                {"_id": ObjectId(quiz_id)},
-                {"$set": updated_quiz}
-            )
+            
+            def update(slug=None):
+                if slug is not None:
+                    updated_quiz["slug"] = slug
+                self.quizzes_collection.update_one(
+                    {"_id": ObjectId(quiz_id)},
+                    {"$set": updated_quiz}
+                )
+            
+            if title_changed:
+                save_with_unique_slug(self.db, data["title"], update, exclude_id=quiz_id)
+            else:
+                update()
+            self._quiz_changed(quiz_id)
             
             return jsonify(QuizModel.to_dict(updated_quiz)), 200
         except InvalidId:
@@ -105,6 +171,9 @@ class AdminController:
             
             # Delete the quiz
             self.quizzes_collection.delete_one({"_id": ObjectId(quiz_id)})
+            self._quiz_changed(quiz_id)
+            invalidate_quiz_analytics(self.db, quiz["_id"])
+            self.db.quiz_stats.delete_one({"_id": quiz["_id"]})
             
             return {"message": "Quiz deleted successfully"}, 200
         except InvalidId:
@@ -119,33 +188,15 @@ class AdminController:
                 return {"error": "Quiz not found"}, 404
             
             # Validate question data
-            if not data.get("text"):
-                return {"error": "Question text is required"}, 400
-            
-            question_type = data.get("type")
-            if question_type not in ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE", "TEXT"]:
-                return {"error": "Invalid question type"}, 400
-            
-            # Validate choices for MCQ and TRUE_FALSE
-            if question_type in ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE"]:
-                choices = data.get("choices", [])
-                if not choices or len(choices) < 2:
-                    return {"error": "At least 2 choices are required for MCQ/TRUE_FALSE questions"}, 400
-                
-                # Generate IDs for choices if not provided
-                for choice in choices:
-                    if "_id" not in choice:
-                        choice["_id"] = ObjectId()
-            
-            # Validate correct_text for TEXT questions
-            if question_type == "TEXT":
-                if not data.get("correct_text"):
-                    return {"error": "correct_text is required for TEXT questions"}, 400
+            error = question_error(data)
+            if error:
+                return {"error": error}, 400
             
             data["quiz_id"] = quiz_id
             question = QuestionModel.create_question(data)
             result = self.questions_collection.insert_one(question)
             question["_id"] = result.inserted_id
+            self._quiz_changed(quiz_id)
             
             return jsonify(QuestionModel.to_dict(question, include_correct_answers=True)), 201
         except InvalidId:
@@ -160,7 +211,7 @@ class AdminController:
             
             # Validate question type if being updated
             if "type" in data:
-                if data["type"] not in ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE", "TEXT"]:
+                if data["type"] not in QUESTION_TYPES:
                     return {"error": "Invalid question type"}, 400
             
             # Validate choices if being updated
@@ -176,11 +227,23 @@ class AdminController:
                         if "_id" not in choice:
                             choice["_id"] = ObjectId()
             
+            if data.get("pool") is not None and not isinstance(data["pool"], str):
+                return {"error": "pool must be a string"}, 400
+            # Partial credit only applies to MCQ_MULTI; a type change away from it drops the policy
+            question_type = data.get("type", question.get("type"))
+            if question.get("type") == "MCQ_MULTI" and question_type != "MCQ_MULTI":
+                data.setdefault("scoring", "all_or_nothing")
+                data.setdefault("penalty", 0)
+            error = text_answer_error(data) or scoring_error({**question, **data}, question_type)
+            if error:
+                return {"error": error}, 400
+            
             updated_question = QuestionModel.update_question(question, data)
             self.questions_collection.update_one(
                 {"_id": ObjectId(question_id)},
                 {"$set": updated_question}
             )
+            self._quiz_changed(question["quiz_id"])
             
             return jsonify(QuestionModel.to_dict(updated_question, include_correct_answers=True)), 200
         except InvalidId:
@@ -194,6 +257,12 @@ class AdminController:
                 return {"error": "Question not found"}, 404
             
             self.questions_collection.delete_one({"_id": ObjectId(question_id)})
+            # Move the quiz's updated_at forward so Last-Modified reflects the removal
+            self.quizzes_collection.update_one(
+                {"_id": question["quiz_id"]},
+                {"$set": {"updated_at": datetime.utcnow()}}
+            )
+            self._quiz_changed(question["quiz_id"])
             return {"message": "Question deleted successfully"}, 200
         except InvalidId:
             return {"error": "Invalid question ID"}, 400
@@ -208,23 +277,269 @@ class AdminController:
         except InvalidId:
             return {"error": "Invalid question ID"}, 400
     
-    def get_quiz_questions(self, quiz_id):
-        """Get all questions for a quiz with correct answers"""
+    def get_quiz_questions(self, quiz_id, limit=None, after=None):
+        """Get questions for a quiz with correct answers, optionally one page at a time"""
         try:
             # Verify quiz exists
             quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
             if not quiz:
                 return {"error": "Quiz not found"}, 404
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+        
+        try:
+            questions, next_cursor = fetch_page(
+                self.questions_collection, quiz_questions_filter(quiz["_id"]), QUESTION_LIST_FIELD,
+                parse_limit(limit), after, descending=False
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        response = jsonify([
+            QuestionModel.to_dict(q, include_correct_answers=True)
+            for q in questions
+        ])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response, 200
+    
+    def start_regrade(self, quiz_id, data):
+        """Start a background job regrading all attempts of a quiz"""
+        try:
+            quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
+            if not quiz:
+                return {"error": "Quiz not found"}, 404
+            
+            batch_size = data.get("batch_size", Config.REGRADE_BATCH_SIZE)
+            if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+                return {"error": "batch_size must be a positive integer"}, 400
+            
+            try:
+                job = claim_regrade_job(self.db, quiz["_id"], batch_size, resume=bool(data.get("resume")))
+            except RegradeInProgress as e:
+                return {"error": str(e)}, 409
+            
+            # Serialize before the worker thread starts updating the job
+            response = RegradeJobModel.to_dict(job)
+            start_regrade_thread(self.db, job)
+            return jsonify(response), 202
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+    
+    def get_regrade_status(self, quiz_id):
+        """Get the progress of the latest regrade job of a quiz"""
+        try:
+            job = self.db.regrade_jobs.find_one({"_id": ObjectId(quiz_id)})
+            if not job:
+                return {"error": "No regrade job for this quiz"}, 404
+            return jsonify(RegradeJobModel.to_dict(job)), 200
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+    
+    def get_quiz_stats(self, quiz_id, refresh=False, incremental=False):
+        """
+        Get score distribution, per-question correctness and per-choice picks
+        
+        Computed by aggregation over the quiz's attempts and cached for
+        ANALYTICS_CACHE_TTL seconds (see app/utils/analytics.py).
+        """
+        try:
+            quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)}, {"_id": 1})
+            if not quiz:
+                return {"error": "Quiz not found"}, 404
             
+            analytics = get_quiz_analytics(self.db, quiz["_id"], refresh=refresh, incremental=incremental)
             questions = list(
-                self.questions_collection.find({"quiz_id": ObjectId(quiz_id)})
-                .sort("created_at", 1)
+                self.questions_collection.find(quiz_questions_filter(quiz["_id"]))
+                .sort(QUESTION_ORDER)
             )
-            
-            return jsonify([
-                QuestionModel.to_dict(q, include_correct_answers=True)
-                for q in questions
-            ]), 200
+            return jsonify(QuizAnalyticsModel.to_dict(analytics, questions)), 200
         except InvalidId:
             return {"error": "Invalid quiz ID"}, 400
-
+    
+    def get_live_quiz_stats(self, quiz_id):
+        """Get the incrementally maintained counters of a quiz (one document read)"""
+        try:
+            quiz_id = ObjectId(quiz_id)
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+        
+        stats = self.db.quiz_stats.find_one({"_id": quiz_id})
+        if not stats and not self.quizzes_collection.find_one({"_id": quiz_id}, {"_id": 1}):
+            return {"error": "Quiz not found"}, 404
+        return jsonify(QuizStatsModel.to_dict(stats, quiz_id)), 200
+    
+    def export_attempts(self, quiz_id, args):
+        """
+        Stream a quiz's attempts as CSV or NDJSON
+        
+        Attempts are read in submission order from a projected, batched
+        cursor and rendered chunk by chunk, so memory use does not grow with
+        the number of attempts and the first bytes go out immediately.
+        """
+        try:
+            quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)}, {"slug": 1})
+            if not quiz:
+                return {"error": "Quiz not found"}, 404
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+        
+        export_format = args.get("format", "csv").lower()
+        if export_format not in EXPORT_FORMATS:
+            return {"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, 400
+        try:
+            query = attempt_filter(quiz["_id"], args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        if export_format == "csv":
+            projection = {
+                "name": 1, "email": 1, "submitted_at": 1, "score": 1, "max_score": 1,
+                "answers.question_id": 1, "answers.points_awarded": 1
+            }
+        else:
+            projection = None
+        cursor = (
+            self.db.attempts.find(query, projection)
+            .sort(EXPORT_ORDER)
+            .batch_size(Config.EXPORT_BATCH_SIZE)
+        )
+        
+        if export_format == "csv":
+            question_ids = [
+                str(q["_id"])
+                for q in self.questions_collection.find(quiz_questions_filter(quiz["_id"]), {"_id": 1}).sort(QUESTION_ORDER)
+            ]
+            chunks = iter_csv(cursor, question_ids)
+        else:
+            chunks = iter_ndjson(cursor)
+        
+        def stream():
+            try:
+                yield from chunks
+            finally:
+                # Also runs when the client disconnects mid-export
+                cursor.close()
+        
+        filename = f"{quiz.get('slug') or quiz['_id']}-attempts.{export_format}"
+        return Response(
+            stream(),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
+    def get_profiles(self, limit=None):
+        """Get summaries of the newest request profiles, newest first"""
+        try:
+            limit = parse_limit(limit) or Config.DEFAULT_PAGE_SIZE
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return jsonify([RequestProfileModel.to_dict(report) for report in profile_store.recent(self.db, limit)]), 200
+    
+    def get_profile(self, profile_id):
+        """Get a request profile: top functions and MongoDB command timeline"""
+        report = profile_store.get(self.db, profile_id)
+        if not report:
+            return {"error": "Profile not found"}, 404
+        return jsonify(RequestProfileModel.to_dict(report)), 200
+    
+    def get_quiz_attempts(self, quiz_id, args):
+        """
+        Get one page of a quiz's attempts, newest first
+        
+        Always paginated (DEFAULT_PAGE_SIZE unless ?limit= is given) with a
+        keyset cursor on (submitted_at, _id), so deep pages cost the same as
+        the first. Accepts the export filters (from, to, min_score, max_score).
+        """
+        try:
+            quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)}, {"_id": 1})
+            if not quiz:
+                return {"error": "Quiz not found"}, 404
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+        
+        try:
+            limit = parse_limit(args.get("limit")) or Config.DEFAULT_PAGE_SIZE
+            attempts, next_cursor = fetch_page(
+                self.db.attempts, attempt_filter(quiz["_id"], args), ATTEMPT_LIST_FIELD,
+                limit, args.get("after"), descending=True
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        response = jsonify([AttemptModel.to_dict(attempt) for attempt in attempts])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response, 200
+    
+    def import_quiz(self, body, import_format):
+        """
+        Create a quiz with all its questions from one JSON or NDJSON upload
+        
+        Every question is validated with the create_question rules before
+        anything is written; the quiz and its questions are then inserted
+        with one insert_one and one insert_many (in a transaction where the
+        deployment supports it).
+        """
+        if import_format not in QUIZ_FORMATS:
+            return {"error": f"format must be one of: {', '.join(QUIZ_FORMATS)}"}, 400
+        try:
+            quiz_data, questions = parse_quiz_import(body, import_format)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        questions, errors = prepare_import(quiz_data, questions)
+        if errors:
+            return {"error": errors[0]["error"], "errors": errors}, 400
+        
+        quiz = QuizModel.create_quiz(quiz_data)
+        quiz["_id"] = ObjectId()
+        documents = question_documents(quiz["_id"], questions, quiz["created_at"])
+        
+        def insert(slug):
+            quiz["slug"] = slug
+            insert_quiz(self.db, quiz, documents)
+        
+        save_with_unique_slug(self.db, quiz_data["title"], insert)
+        self._quiz_changed(quiz["_id"])
+        
+        quiz_dict = QuizModel.to_dict(quiz)
+        quiz_dict["question_count"] = len(documents)
+        return jsonify(quiz_dict), 201
+    
+    def export_quiz(self, quiz_id, export_format):
+        """
+        Stream a quiz with its questions (including correct answers)
+        
+        The output is accepted as is by import_quiz.
+        """
+        try:
+            quiz = self.quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
+            if not quiz:
+                return {"error": "Quiz not found"}, 404
+        except InvalidId:
+            return {"error": "Invalid quiz ID"}, 400
+        
+        export_format = (export_format or "json").lower()
+        if export_format not in QUIZ_FORMATS:
+            return {"error": f"format must be one of: {', '.join(QUIZ_FORMATS)}"}, 400
+        
+        cursor = (
+            self.questions_collection.find(quiz_questions_filter(quiz["_id"]))
+            .sort(QUESTION_ORDER)
+            .batch_size(Config.EXPORT_BATCH_SIZE)
+        )
+        chunks = iter_quiz_json(quiz, cursor) if export_format == "json" else iter_quiz_ndjson(quiz, cursor)
+        
+        def stream():
+            try:
+                yield from chunks
+            finally:
+                cursor.close()
+        
+        filename = f"{quiz.get('slug') or quiz['_id']}.{export_format}"
+        return Response(
+            stream(),
+            mimetype=QUIZ_FORMATS[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
@@ -0,0 +1,172 @@
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from starlette.responses import Response
+from app.models.quiz import QuizModel
+from app.models.question import QuestionModel
+from app.utils.answer_key_cache import answer_key_cache, published_quiz_filters
+from app.utils.read_model import find_read_document_async
+from app.utils.http_cache import QUESTION_VERSION_FIELDS, is_not_modified, validator_headers, quiz_validators, quiz_payload_validators, quiz_list_etag
+from app.utils.response_cache import cached_body, cached_body_async, render_json
+from app.utils.attempt_writer import QueueFull, shared_attempt_writer
+from app.utils.submission import grade_submission, attempt_response, attempt_start_response
+from app.utils.quiz_stats import record_attempts_async
+from app.utils.pagination import parse_limit, page_query, split_page
+from app.utils.queries import PUBLISHED_QUIZZES, QUIZ_LIST_FIELD, QUESTION_ORDER, quiz_questions_filter
+from app.utils.delivery import is_randomized, deliver_payload
+from app.utils.attempt_session import AttemptRejected, issue_start_token, verify_attempt, key_predates_token, claim_nonce_async, release_nonce_async
+from config import Config
+
+def json_response(payload, status=200, headers=None):
+    """Starlette response with the same body bytes as Flask's jsonify"""
+    return Response(render_json(payload), status_code=status, headers=headers, media_type="application/json")
+
+def body_response(status, body, headers):
+    """Starlette response from a cached_body() result"""
+    if body is None:
+        return Response(status_code=status, headers=headers)
+    return Response(body, status_code=status, headers=headers, media_type="application/json")
+
+def delivered_quiz_response(payload, attempt_token):
+    """Per-attempt response of a randomized quiz (never cached)"""
+    try:
+        payload = deliver_payload(payload, attempt_token)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    return json_response(payload, headers={"Cache-Control": "private, no-store"})
+
+class AsyncPublicController:
+    """
+    Controller for public operations on the asyncio (ASGI) server
+    
+    Mirrors PublicController with AsyncMongoClient queries; validation,
+    grading, caching and serialization are the same shared functions.
+    """
+    
+    def __init__(self, db, sync_db):
+        self.db = db
+        self.quizzes_collection = db.quizzes
+        self.questions_collection = db.questions
+        self.attempts_collection = db.attempts
+        # The write-behind queue flushes from its own thread with the sync client
+        self.attempt_writer = None
+        if Config.ATTEMPT_WRITE_MODE == "buffered":
+            self.attempt_writer = shared_attempt_writer(sync_db.attempts)
+    
+    async def get_published_quizzes(self, headers, limit=None, after=None):
+        """Get published quizzes, newest first, optionally one page at a time"""
+        try:
+            limit = parse_limit(limit)
+            query, sort, fetch_limit = page_query(PUBLISHED_QUIZZES, QUIZ_LIST_FIELD, limit, after, descending=True)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        
+        cursor = self.quizzes_collection.find(query).sort(sort)
+        if fetch_limit:
+            cursor = cursor.limit(fetch_limit)
+        quizzes, next_cursor = split_page(await cursor.to_list(), QUIZ_LIST_FIELD, limit)
+        
+        etag = quiz_list_etag(quizzes)
+        response_headers = validator_headers(etag)
+        if next_cursor:
+            response_headers["X-Next-Cursor"] = next_cursor
+        if is_not_modified(headers, etag):
+            return Response(status_code=304, headers=response_headers)
+        return json_response([QuizModel.to_dict(q) for q in quizzes], headers=response_headers)
+    
+    async def get_quiz_by_slug(self, slug_or_id, headers, attempt_token=None):
+        """Get a published quiz by slug or ID (without correct answers; per attempt if randomized)"""
+        if Config.QUIZ_READ_MODEL:
+            read_document = await find_read_document_async(self.db, slug_or_id)
+            if not read_document:
+                return json_response({"error": "Quiz not found"}, 404)
+            if is_randomized(read_document["quiz"]):
+                return delivered_quiz_response(read_document["quiz"], attempt_token)
+            if "etag" in read_document:
+                etag, last_modified = read_document["etag"], read_document["last_modified"]
+            else:
+                etag, last_modified = quiz_payload_validators(read_document["quiz"])
+            return body_response(*cached_body(
+                str(read_document["_id"]), etag, last_modified, lambda: read_document["quiz"], headers
+            ))
+        
+        quiz = None
+        for quiz_filter in published_quiz_filters(slug_or_id):
+            quiz = await self.quizzes_collection.find_one(quiz_filter)
+            if quiz:
+                break
+        
+        if not quiz:
+            return json_response({"error": "Quiz not found"}, 404)
+        
+        async def build_payload():
+            # Full questions are only read when the payload is rendered
+            questions = await self.questions_collection.find(quiz_questions_filter(quiz["_id"])).sort(QUESTION_ORDER).to_list()
+            quiz_dict = QuizModel.to_dict(quiz)
+            quiz_dict["questions"] = [
+                QuestionModel.to_dict(q, include_correct_answers=False)
+                for q in questions
+            ]
+            return quiz_dict
+        
+        if is_randomized(quiz):
+            return delivered_quiz_response(await build_payload(), attempt_token)
+        question_versions = await self.questions_collection.find(
+            quiz_questions_filter(quiz["_id"]), QUESTION_VERSION_FIELDS
+        ).sort(QUESTION_ORDER).to_list()
+        etag, last_modified = quiz_validators(quiz, question_versions)
+        return body_response(*await cached_body_async(str(quiz["_id"]), etag, last_modified, build_payload, headers))
+    
+    async def start_attempt(self, slug_or_id):
+        """Start a timed (or single-use) attempt with a signed start token"""
+        answer_key = await answer_key_cache.load_async(self.db, slug_or_id)
+        if not answer_key:
+            return json_response({"error": "Quiz not found"}, 404)
+        
+        claims, token = issue_start_token(answer_key)
+        return json_response(attempt_start_response(answer_key, claims, token), 201)
+    
+    async def submit_attempt(self, slug_or_id, data):
+        """Submit a quiz attempt and auto-grade it"""
+        answer_key = await answer_key_cache.load_async(self.db, slug_or_id)
+        if not answer_key:
+            return json_response({"error": "Quiz not found"}, 404)
+        
+        # Grading runs on the event loop: it is pure CPU over the compiled key
+        try:
+            claims = verify_attempt(answer_key, data)
+            if key_predates_token(answer_key, claims):
+                # Another worker issued the token from a newer key than this one cached
+                answer_key = await answer_key_cache.reload_async(self.db, answer_key["quiz_id"])
+                if not answer_key:
+                    return json_response({"error": "Quiz not found"}, 404)
+            attempt, correct_answers_summary = grade_submission(answer_key, data, claims)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        except AttemptRejected as e:
+            return json_response({"error": str(e)}, 409)
+        
+        single_use = bool(claims) and "nonce" in claims
+        if single_use and not await claim_nonce_async(self.db, claims):
+            return json_response({"error": "This attempt has already been submitted"}, 409)
+        
+        if self.attempt_writer:
+            attempt["_id"] = ObjectId()
+            try:
+                self.attempt_writer.submit(attempt)
+            except QueueFull:
+                if single_use:
+                    await release_nonce_async(self.db, claims)
+                return json_response(
+                    {"error": "Too many submissions, please retry shortly"}, 503, {"Retry-After": "1"}
+                )
+        else:
+            try:
+                result = await self.attempts_collection.insert_one(attempt)
+            except PyMongoError:
+                if single_use:
+                    await release_nonce_async(self.db, claims)
+                raise
+            attempt["_id"] = result.inserted_id
+            await record_attempts_async(self.db.quiz_stats, [attempt])
+        
+        return json_response(attempt_response(answer_key, attempt, correct_answers_summary), 201)
@@ -1,10 +1,20 @@
 from flask import jsonify
 from bson import ObjectId
-from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
 from app.models.quiz import QuizModel
 from app.models.question import QuestionModel
-from app.models.attempt import AttemptModel
-from app.utils.scoring import grade_answer, get_correct_answers
+from app.utils.answer_key_cache import answer_key_cache, published_quiz_filters
+from app.utils.read_model import find_read_document
+from app.utils.http_cache import QUESTION_VERSION_FIELDS, conditional_json, quiz_validators, quiz_payload_validators, quiz_list_etag
+from app.utils.response_cache import cached_json
+from app.utils.attempt_writer import QueueFull, shared_attempt_writer
+from app.utils.submission import grade_submission, attempt_response, attempt_start_response
+from app.utils.quiz_stats import record_attempts
+from app.utils.pagination import parse_limit, fetch_page
+from app.utils.queries import PUBLISHED_QUIZZES, QUIZ_LIST_FIELD, QUESTION_ORDER, quiz_questions_filter
+from app.utils.delivery import is_randomized, deliver_payload
+from app.utils.attempt_session import AttemptRejected, issue_start_token, verify_attempt, key_predates_token, claim_nonce, release_nonce
+from config import Config
 
 class PublicController:
     """Controller for public operations"""
@@ -14,151 +24,148 @@ class PublicController:
         self.quizzes_collection = db.quizzes
         self.questions_collection = db.questions
         self.attempts_collection = db.attempts
+        # Write-behind queue for graded attempts (ATTEMPT_WRITE_MODE=buffered)
+        self.attempt_writer = None
+        if Config.ATTEMPT_WRITE_MODE == "buffered":
+            self.attempt_writer = shared_attempt_writer(self.attempts_collection)
     
-    def get_published_quizzes(self):
-        """Get all published quizzes"""
-        quizzes = list(
-            self.quizzes_collection.find({"published": True})
-            .sort("created_at", -1)
+    def get_published_quizzes(self, limit=None, after=None):
+        """Get published quizzes, newest first, optionally one page at a time"""
+        try:
+            quizzes, next_cursor = fetch_page(
+                self.quizzes_collection, PUBLISHED_QUIZZES, QUIZ_LIST_FIELD,
+                parse_limit(limit), after, descending=True
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        # No Last-Modified: unpublishing a quiz removes it without moving the max updated_at
+        response = conditional_json(
+            quiz_list_etag(quizzes),
+            None,
+            lambda: [QuizModel.to_dict(q) for q in quizzes]
         )
-        return jsonify([QuizModel.to_dict(q) for q in quizzes]), 200
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
     
-    def get_quiz_by_slug(self, slug_or_id):
-        """Get a published quiz by slug or ID (without correct answers)"""
-        # Try to find by ID first (if it's a valid ObjectId)
+    def get_quiz_by_slug(self, slug_or_id, attempt_token=None):
+        """
+        Get a published quiz by slug or ID (without correct answers)
+        
+        Randomized quizzes (question pools or shuffling) are delivered per
+        attempt: the response holds the attempt's questions and a signed
+        attempt_token, which resumes the same attempt when passed back.
+        """
+        if Config.QUIZ_READ_MODEL:
+            # Single indexed read of the materialized quiz document
+            read_document = find_read_document(self.db, slug_or_id)
+            if not read_document:
+                return {"error": "Quiz not found"}, 404
+            if is_randomized(read_document["quiz"]):
+                return self._delivered_quiz(read_document["quiz"], attempt_token)
+            if "etag" in read_document:
+                etag, last_modified = read_document["etag"], read_document["last_modified"]
+            else:
+                etag, last_modified = quiz_payload_validators(read_document["quiz"])
+            return cached_json(str(read_document["_id"]), etag, last_modified, lambda: read_document["quiz"])
+        
+        # Try to find by ID first (if it's a valid ObjectId), then by slug
         quiz = None
-        try:
-            quiz = self.quizzes_collection.find_one({"_id": ObjectId(slug_or_id), "published": True})
-        except (InvalidId, ValueError):
-            pass
-        
-        # If not found by ID, try by slug
-        if not quiz:
-            quiz = self.quizzes_collection.find_one({"slug": slug_or_id, "published": True})
+        for quiz_filter in published_quiz_filters(slug_or_id):
+            quiz = self.quizzes_collection.find_one(quiz_filter)
+            if quiz:
+                break
         
         if not quiz:
             return {"error": "Quiz not found"}, 404
         
-        # Get questions without correct answers
-        questions = list(
-            self.questions_collection.find({"quiz_id": quiz["_id"]})
-            .sort("created_at", 1)
-        )
-        
-        quiz_dict = QuizModel.to_dict(quiz)
-        quiz_dict["questions"] = [
-            QuestionModel.to_dict(q, include_correct_answers=False)
-            for q in questions
-        ]
+        def build_payload():
+            # Full questions are only read when the payload is rendered
+            questions = self.questions_collection.find(quiz_questions_filter(quiz["_id"])).sort(QUESTION_ORDER)
+            quiz_dict = QuizModel.to_dict(quiz)
+            quiz_dict["questions"] = [
+                QuestionModel.to_dict(q, include_correct_answers=False)
+                for q in questions
+            ]
+            return quiz_dict
+        
+        if is_randomized(quiz):
+            return self._delivered_quiz(build_payload(), attempt_token)
+        # The validators need only the ID and updated_at of each question
+        question_versions = self.questions_collection.find(
+            quiz_questions_filter(quiz["_id"]), QUESTION_VERSION_FIELDS
+        ).sort(QUESTION_ORDER)
+        etag, last_modified = quiz_validators(quiz, question_versions)
+        return cached_json(str(quiz["_id"]), etag, last_modified, build_payload)
+    
+    def _delivered_quiz(self, payload, attempt_token):
+        """Per-attempt response of a randomized quiz (never cached)"""
+        try:
+            payload = deliver_payload(payload, attempt_token)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        response = jsonify(payload)
+        response.headers["Cache-Control"] = "private, no-store"
+        return response
+    
+    def start_attempt(self, slug_or_id):
+        """
+        Start a timed (or single-use) attempt
+        
+        Returns a signed start token carrying the quiz's grading version, the
+        start time and the deadline; submissions are checked against it
+        without reading the database. Served from the cached answer key.
+        """
+        answer_key = answer_key_cache.load(self.db, slug_or_id)
+        if not answer_key:
+            return {"error": "Quiz not found"}, 404
         
-        return jsonify(quiz_dict), 200
+        claims, token = issue_start_token(answer_key)
+        return jsonify(attempt_start_response(answer_key, claims, token)), 201
     
     def submit_attempt(self, slug_or_id, data):
         """Submit a quiz attempt and auto-grade it"""
-        # Try to find by ID first (if it's a valid ObjectId)
-        quiz = None
-        try:
-            quiz = self.quizzes_collection.find_one({"_id": ObjectId(slug_or_id), "published": True})
-        except (InvalidId, ValueError):
-            pass
-        
-        # If not found by ID, try by slug
-        if not quiz:
-            quiz = self.quizzes_collection.find_one({"slug": slug_or_id, "published": True})
-        
-        if not quiz:
+        # Resolve the quiz and its compiled answer key (cached per process)
+        answer_key = answer_key_cache.load(self.db, slug_or_id)
+        if not answer_key:
             return {"error": "Quiz not found"}, 404
         
-        # Get all questions for this quiz
-        questions = list(
-            self.questions_collection.find({"quiz_id": quiz["_id"]})
-            .sort("created_at", 1)
-        )
-        
-        if not questions:
-            return {"error": "Quiz has no questions"}, 400
-        
-        # Validate submission data
-        # if not data.get("name"):
-        #     return {"error": "Name is required"}, 400
-        # if not data.get("email"):
-        #     return {"error": "Email is required"}, 400
-        
-        answers_data = data.get("answers", [])
-        if len(answers_data) != len(questions):
-            return {"error": f"Expected {len(questions)} answers, got {len(answers_data)}"}, 400
-        
-        # Grade each answer
-        total_score = 0
-        max_score = sum(q.get("points", 1) for q in questions)
-        graded_answers = []
-        correct_answers_summary = []
-        
-        # Create a map of question_id to question for quick lookup
-        question_map = {str(q["_id"]): q for q in questions}
-        
-        for answer_data in answers_data:
-            question_id = answer_data.get("question_id")
-            if not question_id:
-                return {"error": "question_id is required for each answer"}, 400
-            
-            question = question_map.get(question_id)
-            if not question:
-                return {"error": f"Question {question_id} not found"}, 400
-            
-            # Grade the answer
-            points_awarded, is_correct = grade_answer(question, answer_data)
-            total_score += points_awarded
-            
-            # Store graded answer
-            try:
-                graded_answer = {
-                    "question_id": ObjectId(question_id),
-                    "selected_choice_ids": [ObjectId(cid) for cid in answer_data.get("selected_choice_ids", [])],
-                    "text_answer": answer_data.get("text_answer", ""),
-                    "points_awarded": points_awarded
-                }
-                graded_answers.append(graded_answer)
-            except (InvalidId, TypeError) as e:
-                return {"error": f"Invalid ID format in answer: {str(e)}"}, 400
-            
-            # Get correct answer for response
-            correct_answer_info = get_correct_answers(question)
-            correct_answer_info["is_correct"] = is_correct
-            correct_answer_info["points_awarded"] = points_awarded
-            correct_answer_info["max_points"] = question.get("points", 1)
-            correct_answers_summary.append(correct_answer_info)
-        
-        # Create attempt document
-        attempt_data = {
-            "quiz_id": str(quiz["_id"]),
-            "name": data.get("name"),
-            "email": data.get("email"),
-            "score": total_score,
-            "max_score": max_score,
-            "answers": graded_answers
-        }
-        
         try:
-            attempt = AttemptModel.create_attempt(attempt_data)
-            result = self.attempts_collection.insert_one(attempt)
-            attempt["_id"] = result.inserted_id
+            claims = verify_attempt(answer_key, data)
+            if key_predates_token(answer_key, claims):
+                # Another worker issued the token from a newer key than this one cached
+                answer_key = answer_key_cache.reload(self.db, answer_key["quiz_id"])
+                if not answer_key:
+                    return {"error": "Quiz not found"}, 404
+            attempt, correct_answers_summary = grade_submission(answer_key, data, claims)
         except ValueError as e:
             return {"error": str(e)}, 400
+        except AttemptRejected as e:
+            return {"error": str(e)}, 409
         
-        # Prepare response
-        response = {
-            "attempt_id": str(attempt["_id"]),
-            "quiz_id": str(quiz["_id"]),
-            "quiz_title": quiz.get("title"),
-            "name": data.get("name"),
-            "email": data.get("email"),
-            "score": total_score,
-            "max_score": max_score,
-            "percentage": round((total_score / max_score * 100) if max_score > 0 else 0, 2),
-            "submitted_at": attempt.get("submitted_at").isoformat(),
-            "answers": correct_answers_summary
-        }
+        # A start token is accepted once; the claim is undone if the attempt is not saved
+        single_use = bool(claims) and "nonce" in claims
+        if single_use and not claim_nonce(self.db, claims):
+            return {"error": "This attempt has already been submitted"}, 409
         
-        return jsonify(response), 201
-
+        if self.attempt_writer:
+            # The ID is assigned here so the response can return it before the insert
+            attempt["_id"] = ObjectId()
+            try:
+                self.attempt_writer.submit(attempt)
+            except QueueFull:
+                if single_use:
+                    release_nonce(self.db, claims)
+                return {"error": "Too many submissions, please retry shortly"}, 503, {"Retry-After": "1"}
+        else:
+            try:
+                result = self.attempts_collection.insert_one(attempt)
+            except PyMongoError:
+                if single_use:
+                    release_nonce(self.db, claims)
+                raise
+            attempt["_id"] = result.inserted_id
+            record_attempts(self.db.quiz_stats, [attempt])
+        
+        return jsonify(attempt_response(answer_key, attempt, correct_answers_summary)), 201
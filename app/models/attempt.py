@@ -36,7 +36,8 @@ class AttemptModel:
                 "question_id": str(answer.get("question_id", "")),
                 "selected_choice_ids": [str(cid) for cid in answer.get("selected_choice_ids", [])],
                 "text_answer": answer.get("text_answer", ""),
-                "points_awarded": answer.get("points_awarded", 0)
+                "points_awarded": answer.get("points_awarded", 0),
+                "is_correct": answer.get("is_correct")
             }
             answers.append(answer_dict)
         
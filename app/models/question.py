@@ -13,7 +13,14 @@ class QuestionModel:
             "text": data.get("text"),
             "choices": data.get("choices", []),  # For MCQ and TRUE_FALSE
             "correct_text": data.get("correct_text", ""),  # For TEXT questions
+            "accepted_answers": data.get("accepted_answers", []),  # Further answers accepted for TEXT
+            "ignore_punctuation": data.get("ignore_punctuation", False),
+            "numeric_tolerance": data.get("numeric_tolerance"),  # Absolute; None compares numbers as text
+            "max_edit_distance": data.get("max_edit_distance", 0),  # Typos tolerated per TEXT answer
             "points": data.get("points", 1),
+            "scoring": data.get("scoring", "all_or_nothing"),  # MCQ_MULTI partial credit policy
+            "penalty": data.get("penalty", 0),  # Points deducted for a wrong answer under "negative"
+            "pool": data.get("pool"),  # Question pool drawn from (see Quiz "pools")
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
@@ -30,8 +37,17 @@ class QuestionModel:
             existing_question["choices"] = data["choices"]
         if "correct_text" in data:
             existing_question["correct_text"] = data["correct_text"]
+        for field in ("accepted_answers", "ignore_punctuation", "numeric_tolerance", "max_edit_distance"):
+            if field in data:
+                existing_question[field] = data[field]
         if "points" in data:
             existing_question["points"] = data["points"]
+        if "scoring" in data:
+            existing_question["scoring"] = data["scoring"]
+        if "penalty" in data:
+            existing_question["penalty"] = data["penalty"]
+        if "pool" in data:
+            existing_question["pool"] = data["pool"]
         existing_question["updated_at"] = datetime.utcnow()
         return existing_question
     
@@ -58,12 +74,22 @@ class QuestionModel:
             "text": question.get("text"),
             "choices": choices,
             "points": question.get("points", 1),
+            "pool": question.get("pool"),
             "created_at": question.get("created_at").isoformat() if question.get("created_at") else None,
             "updated_at": question.get("updated_at").isoformat() if question.get("updated_at") else None
         }
         
+        # Participants see how a multi-choice question is marked
+        if question.get("type") == "MCQ_MULTI":
+            question_dict["scoring"] = question.get("scoring") or "all_or_nothing"
+            question_dict["penalty"] = question.get("penalty", 0)
+        
         if include_correct_answers and question.get("type") == "TEXT":
             question_dict["correct_text"] = question.get("correct_text", "")
+            question_dict["accepted_answers"] = question.get("accepted_answers") or []
+            question_dict["ignore_punctuation"] = question.get("ignore_punctuation", False)
+            question_dict["numeric_tolerance"] = question.get("numeric_tolerance")
+            question_dict["max_edit_distance"] = question.get("max_edit_distance", 0)
         
         return question_dict
 
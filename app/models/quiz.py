@@ -12,6 +12,12 @@ class QuizModel:
             "slug": data.get("slug"),
             "description": data.get("description", ""),
             "published": data.get("published", False),
+            # Per-attempt delivery: {pool name: questions drawn} and shuffling
+            "pools": data.get("pools", {}),
+            "shuffle_questions": data.get("shuffle_questions", False),
+            "shuffle_choices": data.get("shuffle_choices", False),
+            # Seconds from POST /quizzes/<slug>/start to the submission deadline
+            "time_limit_seconds": data.get("time_limit_seconds"),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
@@ -28,6 +34,14 @@ class QuizModel:
             existing_quiz["description"] = data["description"]
         if "published" in data:
             existing_quiz["published"] = data["published"]
+        if "pools" in data:
+            existing_quiz["pools"] = data["pools"]
+        if "shuffle_questions" in data:
+            existing_quiz["shuffle_questions"] = data["shuffle_questions"]
+        if "shuffle_choices" in data:
+            existing_quiz["shuffle_choices"] = data["shuffle_choices"]
+        if "time_limit_seconds" in data:
+            existing_quiz["time_limit_seconds"] = data["time_limit_seconds"]
         existing_quiz["updated_at"] = datetime.utcnow()
         return existing_quiz
     
@@ -42,6 +56,10 @@ class QuizModel:
             "slug": quiz.get("slug"),
             "description": quiz.get("description"),
             "published": quiz.get("published", False),
+            "pools": quiz.get("pools", {}),
+            "shuffle_questions": quiz.get("shuffle_questions", False),
+            "shuffle_choices": quiz.get("shuffle_choices", False),
+            "time_limit_seconds": quiz.get("time_limit_seconds"),
             "created_at": quiz.get("created_at").isoformat() if quiz.get("created_at") else None,
             "updated_at": quiz.get("updated_at").isoformat() if quiz.get("updated_at") else None
         }
@@ -0,0 +1,112 @@
+import math
+
+class QuizAnalyticsModel:
+    """Cached quiz analytics data model (one document per quiz, keyed by quiz ID)"""
+    
+    @staticmethod
+    def create_analytics(quiz_id, state, computed_at, computed_through, incremental=False):
+        """Create an analytics document from a mergeable counter state"""
+        return {
+            "_id": quiz_id,
+            "count": state["count"],
+            "score_sum": state["score_sum"],
+            "score_sq_sum": state["score_sq_sum"],
+            "max_score_sum": state["max_score_sum"],
+            "score_min": state["score_min"],
+            "score_max": state["score_max"],
+            # Scores may be fractional, so they are stored as values, not field names
+            "score_counts": [
+                {"score": score, "count": count}
+                for score, count in sorted(state["score_counts"].items())
+            ],
+            "questions": state["questions"],
+            "computed_at": computed_at,
+            "computed_through": computed_through,
+            "incremental": incremental
+        }
+    
+    @staticmethod
+    def state(analytics):
+        """Get the mergeable counter state of an analytics document"""
+        return {
+            "count": analytics.get("count", 0),
+            "score_sum": analytics.get("score_sum", 0),
+            "score_sq_sum": analytics.get("score_sq_sum", 0),
+            "max_score_sum": analytics.get("max_score_sum", 0),
+            "score_min": analytics.get("score_min"),
+            "score_max": analytics.get("score_max"),
+            "score_counts": {row["score"]: row["count"] for row in analytics.get("score_counts", [])},
+            "questions": analytics.get("questions", {})
+        }
+    
+    @staticmethod
+    def to_dict(analytics, questions):
+        """
+        Convert an analytics document to the stats response
+        
+        Args:
+            analytics: Analytics document from database
+            questions: Current question documents of the quiz, in order
+        
+        Returns:
+            dict: Score distribution and per-question / per-choice statistics
+        """
+        count = analytics.get("count", 0)
+        mean = analytics["score_sum"] / count if count else None
+        std_dev = None
+        if count:
+            variance = max(analytics["score_sq_sum"] / count - mean * mean, 0)
+            std_dev = round(math.sqrt(variance), 4)
+        
+        question_stats = analytics.get("questions", {})
+        
+        def question_dict(question_id, stats, question=None):
+            answered = stats.get("answered", 0)
+            picks = stats.get("choices", {})
+            choices = []
+            if question is not None:
+                for choice in question.get("choices", []):
+                    choice_id = str(choice.get("_id", ""))
+                    choices.append({
+                        "choice_id": choice_id,
+                        "text": choice.get("text"),
+                        "is_correct": choice.get("is_correct", False),
+                        "picks": picks.get(choice_id, 0)
+                    })
+            return {
+                "question_id": question_id,
+                "text": question.get("text") if question else None,
+                "type": question.get("type") if question else None,
+                "deleted": question is None,
+                "answered": answered,
+                "correct": stats.get("correct", 0),
+                "correct_rate": round(stats.get("correct", 0) / answered, 4) if answered else None,
+                "average_points": round(stats.get("points_sum", 0) / answered, 4) if answered else None,
+                "choices": choices
+            }
+        
+        question_list = []
+        seen = set()
+        for question in questions:
+            question_id = str(question["_id"])
+            seen.add(question_id)
+            question_list.append(question_dict(question_id, question_stats.get(question_id, {}), question))
+        # Answers to questions that have since been deleted
+        for question_id, stats in question_stats.items():
+            if question_id not in seen:
+                question_list.append(question_dict(question_id, stats))
+        
+        return {
+            "quiz_id": str(analytics["_id"]),
+            "attempts": count,
+            "mean_score": round(mean, 4) if mean is not None else None,
+            "std_dev": std_dev,
+            "lowest_score": analytics.get("score_min"),
+            "highest_score": analytics.get("score_max"),
+            "mean_percentage": round(analytics["score_sum"] / analytics["max_score_sum"] * 100, 2) if analytics.get("max_score_sum") else None,
+            "score_distribution": analytics.get("score_counts", []),
+            "questions": question_list,
+            "computed_at": analytics["computed_at"].isoformat(),
+            "computed_through": analytics["computed_through"].isoformat(),
+            "incremental": analytics.get("incremental", False)
+        }
@@ -0,0 +1,47 @@
+import math
+from app.utils.quiz_stats import parse_score_key
+
+class QuizStatsModel:
+    """Live quiz statistics counters (one document per quiz, keyed by quiz ID)"""
+    
+    @staticmethod
+    def to_dict(stats, quiz_id):
+        """
+        Convert counters to mean, variance, histogram and per-question rates
+        
+        Args:
+            stats: quiz_stats document, or None if the quiz has no attempts
+            quiz_id: Quiz ID
+        """
+        stats = stats or {}
+        count = stats.get("count", 0)
+        mean = stats.get("score_sum", 0) / count if count else None
+        variance = max(stats.get("score_sq_sum", 0) / count - mean * mean, 0) if count else None
+        
+        histogram = sorted(
+            ({"score": parse_score_key(key), "count": value} for key, value in stats.get("histogram", {}).items() if value),
+            key=lambda bucket: bucket["score"]
+        )
+        questions = []
+        for question_id, counters in stats.get("questions", {}).items():
+            answered = counters.get("answered", 0)
+            correct = counters.get("correct", 0)
+            questions.append({
+                "question_id": question_id,
+                "answered": answered,
+                "correct": correct,
+                "correct_rate": round(correct / answered, 4) if answered else None
+            })
+        
+        return {
+            "quiz_id": str(quiz_id),
+            "attempts": count,
+            "mean_score": round(mean, 4) if mean is not None else None,
+            "variance": round(variance, 4) if variance is not None else None,
+            "std_dev": round(math.sqrt(variance), 4) if variance is not None else None,
+            "mean_percentage": round(stats["score_sum"] / stats["max_score_sum"] * 100, 2) if stats.get("max_score_sum") else None,
+            "histogram": histogram,
+            "questions": questions,
+            "updated_at": stats.get("updated_at").isoformat() if stats.get("updated_at") else None,
+            "rebuilt_at": stats.get("rebuilt_at").isoformat() if stats.get("rebuilt_at") else None
+        }
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+class RegradeJobModel:
+    """Regrade job data model (one document per quiz, keyed by quiz ID)"""
+    
+    @staticmethod
+    def create_job(quiz_id, batch_size, last_attempt_id=None, processed=0, updated=0):
+        """Create the fields of a newly started regrade job"""
+        now = datetime.utcnow()
+        return {
+            "quiz_id": quiz_id,
+            "status": "running",
+            "batch_size": batch_size,
+            "total": None,
+            "processed": processed,
+            "updated": updated,
+            "last_attempt_id": last_attempt_id,
+            "error": None,
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+    
+    @staticmethod
+    def to_dict(job):
+        """Convert regrade job document to dictionary with string IDs"""
+        if not job:
+            return None
+        return {
+            "quiz_id": str(job.get("quiz_id", "")),
+            "status": job.get("status"),
+            "batch_size": job.get("batch_size"),
+            "total": job.get("total"),
+            "processed": job.get("processed", 0),
+            "updated": job.get("updated", 0),
+            "last_attempt_id": str(job["last_attempt_id"]) if job.get("last_attempt_id") else None,
+            "error": job.get("error"),
+            "started_at": job.get("started_at").isoformat() if job.get("started_at") else None,
+            "updated_at": job.get("updated_at").isoformat() if job.get("updated_at") else None,
+            "finished_at": job.get("finished_at").isoformat() if job.get("finished_at") else None
+        }
@@ -0,0 +1,12 @@
+class RequestProfileModel:
+    """Request profile report data model (see app/utils/profiling.py)"""
+    
+    @staticmethod
+    def to_dict(report):
+        """Convert a profile report (or its summary) to a dictionary"""
+        if not report:
+            return None
+        report_dict = {key: value for key, value in report.items() if key != "_id"}
+        report_dict["id"] = report["_id"]
+        report_dict["created_at"] = report.get("created_at").isoformat() if report.get("created_at") else None
+        return report_dict
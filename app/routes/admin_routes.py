@@ -12,10 +12,26 @@ def create_admin_blueprint(db):
         data = request.get_json()
         return controller.create_quiz(data)
     
+    @admin_bp.route("/quizzes/import", methods=["POST"])
+    def import_quiz():
+        """Create a quiz with its questions from a JSON or NDJSON body"""
+        import_format = request.args.get("format")
+        if not import_format:
+            import_format = "ndjson" if request.mimetype in ("application/x-ndjson", "application/ndjson") else "json"
+        return controller.import_quiz(request.get_data(as_text=True), import_format.lower())
+    
+    @admin_bp.route("/quizzes/<quiz_id>/export", methods=["GET"])
+    def export_quiz(quiz_id):
+        """Stream a quiz with its questions as JSON or NDJSON (?format=json|ndjson)"""
+        return controller.export_quiz(quiz_id, request.args.get("format"))
+    
     @admin_bp.route("/quizzes", methods=["GET"])
     def get_all_quizzes():
-        """Get all quizzes"""
-        return controller.get_all_quizzes()
+        """Get all quizzes (paginated with ?limit=&after=)"""
+        return controller.get_all_quizzes(
+            limit=request.args.get("limit"),
+            after=request.args.get("after")
+        )
     
     @admin_bp.route("/quizzes/<quiz_id>", methods=["GET"])
     def get_quiz(quiz_id):
@@ -58,8 +74,56 @@ def create_admin_blueprint(db):
     
     @admin_bp.route("/quizzes/<quiz_id>/questions", methods=["GET"])
     def get_quiz_questions(quiz_id):
-        """Get all questions for a quiz with correct answers"""
-        return controller.get_quiz_questions(quiz_id)
+        """Get all questions for a quiz with correct answers (paginated with ?limit=&after=)"""
+        return controller.get_quiz_questions(
+            quiz_id,
+            limit=request.args.get("limit"),
+            after=request.args.get("after")
+        )
+    
+    @admin_bp.route("/quizzes/<quiz_id>/regrade", methods=["POST"])
+    def start_regrade(quiz_id):
+        """Regrade all attempts of a quiz in the background"""
+        data = request.get_json(silent=True) or {}
+        return controller.start_regrade(quiz_id, data)
+    
+    @admin_bp.route("/quizzes/<quiz_id>/regrade", methods=["GET"])
+    def get_regrade_status(quiz_id):
+        """Get regrade job progress for a quiz"""
+        return controller.get_regrade_status(quiz_id)
+    
+    @admin_bp.route("/quizzes/<quiz_id>/stats", methods=["GET"])
+    def get_quiz_stats(quiz_id):
+        """Get attempt statistics for a quiz (?refresh=true, ?incremental=true)"""
+        return controller.get_quiz_stats(
+            quiz_id,
+            refresh=request.args.get("refresh", "false").lower() == "true",
+            incremental=request.args.get("incremental", "false").lower() == "true"
+        )
+    
+    @admin_bp.route("/quizzes/<quiz_id>/stats/live", methods=["GET"])
+    def get_live_quiz_stats(quiz_id):
+        """Get live attempt counters for a quiz (mean, variance, histogram)"""
+        return controller.get_live_quiz_stats(quiz_id)
+    
+    @admin_bp.route("/quizzes/<quiz_id>/attempts", methods=["GET"])
+    def get_quiz_attempts(quiz_id):
+        """Get a page of attempts for a quiz, newest first (?limit=&after= plus export filters)"""
+        return controller.get_quiz_attempts(quiz_id, request.args)
+    
+    @admin_bp.route("/quizzes/<quiz_id>/attempts/export", methods=["GET"])
+    def export_attempts(quiz_id):
+        """Stream attempts as CSV or NDJSON (?format=, ?from=, ?to=, ?min_score=, ?max_score=)"""
+        return controller.export_attempts(quiz_id, request.args)
+    
+    @admin_bp.route("/profiles", methods=["GET"])
+    def get_profiles():
+        """Get the newest request profiles (?limit=)"""
+        return controller.get_profiles(limit=request.args.get("limit"))
+    
+    @admin_bp.route("/profiles/<profile_id>", methods=["GET"])
+    def get_profile(profile_id):
+        """Get a request profile with its hot functions and MongoDB timeline"""
+        return controller.get_profile(profile_id)
     
     return admin_bp
-
@@ -0,0 +1,50 @@
+from starlette.routing import Route
+from app.controllers.async_public_controller import AsyncPublicController, json_response
+
+def create_async_public_routes(db, sync_db, middleware=None):
+    """
+    Create the ASGI routes of the public /quizzes endpoints
+    
+    Args:
+        db: Async (AsyncMongoClient) database
+        sync_db: Sync database, for the attempt writer's flush thread
+        middleware: Starlette middleware wrapped around each route, if any
+    """
+    controller = AsyncPublicController(db, sync_db)
+    
+    async def get_published_quizzes(request):
+        """Get published quizzes (paginated with ?limit=&after=)"""
+        return await controller.get_published_quizzes(
+            request.headers,
+            limit=request.query_params.get("limit"),
+            after=request.query_params.get("after")
+        )
+    
+    async def get_quiz_by_slug(request):
+        """Get a published quiz by slug or ID"""
+        return await controller.get_quiz_by_slug(
+            request.path_params["slug_or_id"],
+            request.headers,
+            request.query_params.get("attempt_token")
+        )
+    
+    async def start_attempt(request):
+        """Start an attempt and get its signed start token"""
+        return await controller.start_attempt(request.path_params["slug_or_id"])
+    
+    async def submit_attempt(request):
+        """Submit a quiz attempt"""
+        try:
+            data = await request.json()
+        except ValueError:
+            return json_response({"error": "Request body must be valid JSON"}, 400)
+        if not isinstance(data, dict):
+            return json_response({"error": "Request body must be a JSON object"}, 400)
+        return await controller.submit_attempt(request.path_params["slug_or_id"], data)
+    
+    return [
+        Route("/quizzes", get_published_quizzes, methods=["GET"], middleware=middleware),
+        Route("/quizzes/{slug_or_id}", get_quiz_by_slug, methods=["GET"], middleware=middleware),
+        Route("/quizzes/{slug_or_id}/start", start_attempt, methods=["POST"], middleware=middleware),
+        Route("/quizzes/{slug_or_id}/attempt", submit_attempt, methods=["POST"], middleware=middleware)
+    ]
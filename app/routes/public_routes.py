@@ -8,13 +8,21 @@ def create_public_blueprint(db):
     
     @public_bp.route("", methods=["GET"])
     def get_published_quizzes():
-        """Get all published quizzes"""
-        return controller.get_published_quizzes()
+        """Get published quizzes (paginated with ?limit=&after=)"""
+        return controller.get_published_quizzes(
+            limit=request.args.get("limit"),
+            after=request.args.get("after")
+        )
     
     @public_bp.route("/<slug_or_id>", methods=["GET"])
     def get_quiz_by_slug(slug_or_id):
         """Get a published quiz by slug or ID"""
-        return controller.get_quiz_by_slug(slug_or_id)
+        return controller.get_quiz_by_slug(slug_or_id, request.args.get("attempt_token"))
+    
+    @public_bp.route("/<slug_or_id>/start", methods=["POST"])
+    def start_attempt(slug_or_id):
+        """Start an attempt and get its signed start token"""
+        return controller.start_attempt(slug_or_id)
     
     @public_bp.route("/<slug_or_id>/attempt", methods=["POST"])
     def submit_attempt(slug_or_id):
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from app.models.quiz_analytics import QuizAnalyticsModel
+
+# An answer counts as correct by its stored flag; attempts graded before the
+# flag existed fall back to having earned points
+CORRECT_EXPRESSION = {
+    "$ifNull": ["$answers.is_correct", {"$gt": ["$answers.points_awarded", 0]}]
+}
+
+def analytics_pipeline(quiz_id, since=None, through=None):
+    """
+    Aggregation computing additive statistics over a quiz's attempts
+    
+    One $facet pass yields the summary counters, per-score counts,
+    per-question correctness and per-choice pick counts of the attempts
+    submitted in (since, through].
+    """
+    submitted_at = {}
+    if since is not None:
+        submitted_at["$gt"] = since
+    if through is not None:
+        submitted_at["$lte"] = through
+    match = {"quiz_id": quiz_id}
+    if submitted_at:
+        match["submitted_at"] = submitted_at
+    
+    return [
+        {"$match": match},
+        {"$facet": {
+            "summary": [
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "score_sum": {"$sum": "$score"},
+                    "score_sq_sum": {"$sum": {"$multiply": ["$score", "$score"]}},
+                    "max_score_sum": {"$sum": "$max_score"},
+                    "score_min": {"$min": "$score"},
+                    "score_max": {"$max": "$score"}
+                }}
+            ],
+            "scores": [
+                {"$group": {"_id": "$score", "count": {"$sum": 1}}}
+            ],
+            "questions": [
+                {"$unwind": "$answers"},
+                {"$group": {
+                    "_id": "$answers.question_id",
+                    "answered": {"$sum": 1},
+                    "correct": {"$sum": {"$cond": [CORRECT_EXPRESSION, 1, 0]}},
+                    "points_sum": {"$sum": "$answers.points_awarded"}
+                }}
+            ],
+            "choices": [
+                {"$unwind": "$answers"},
+                {"$unwind": "$answers.selected_choice_ids"},
+                {"$group": {
+                    "_id": {
+                        "question_id": "$answers.question_id",
+                        "choice_id": "$answers.selected_choice_ids"
+                    },
+                    "picks": {"$sum": 1}
+                }}
+            ]
+        }}
+    ]
+
+def compute_analytics(db, quiz_id, since=None, through=None):
+    """
+    Run the analytics pipeline and fold its facets into a mergeable state
+    
+    Returns:
+        dict: Counters with 'score_counts' ({score: count}) and 'questions'
+        ({question_id: {answered, correct, points_sum, choices}}), keyed by
+        strings
+    """
+    result = next(db.attempts.aggregate(analytics_pipeline(quiz_id, since, through)), {})
+    summary = (result.get("summary") or [{}])[0]
+    state = {
+        "count": summary.get("count", 0),
+        "score_sum": summary.get("score_sum", 0),
+        "score_sq_sum": summary.get("score_sq_sum", 0),
+        "max_score_sum": summary.get("max_score_sum", 0),
+        "score_min": summary.get("score_min"),
+        "score_max": summary.get("score_max"),
+        "score_counts": {},
+        "questions": {}
+    }
+    for row in result.get("scores", []):
+        state["score_counts"][row["_id"]] = row["count"]
+    for row in result.get("questions", []):
+        state["questions"][str(row["_id"])] = {
+            "answered": row["answered"],
+            "correct": row["correct"],
+            "points_sum": row["points_sum"],
+            "choices": {}
+        }
+    for row in result.get("choices", []):
+        question = state["questions"].get(str(row["_id"]["question_id"]))
+        if question is not None:
+            question["choices"][str(row["_id"]["choice_id"])] = row["picks"]
+    return state
+
+def _merge_extreme(a, b, pick):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return pick(a, b)
+
+def merge_analytics(base, delta):
+    """Add the counters of delta (newer attempts) to base"""
+    merged = {
+        "count": base["count"] + delta["count"],
+        "score_sum": base["score_sum"] + delta["score_sum"],
+        "score_sq_sum": base["score_sq_sum"] + delta["score_sq_sum"],
+        "max_score_sum": base["max_score_sum"] + delta["max_score_sum"],
+        "score_min": _merge_extreme(base["score_min"], delta["score_min"], min),
+        "score_max": _merge_extreme(base["score_max"], delta["score_max"], max),
+        "score_counts": dict(base["score_counts"]),
+        "questions": {qid: dict(q, choices=dict(q["choices"])) for qid, q in base["questions"].items()}
+    }
+    for score, count in delta["score_counts"].items():
+        merged["score_counts"][score] = merged["score_counts"].get(score, 0) + count
+    for question_id, question in delta["questions"].items():
+        target = merged["questions"].setdefault(
+            question_id, {"answered": 0, "correct": 0, "points_sum": 0, "choices": {}}
+        )
+        target["answered"] += question["answered"]
+        target["correct"] += question["correct"]
+        target["points_sum"] += question["points_sum"]
+        for choice_id, picks in question["choices"].items():
+            target["choices"][choice_id] = target["choices"].get(choice_id, 0) + picks
+    return merged
+
+def get_quiz_analytics(db, quiz_id, refresh=False, incremental=False):
+    """
+    Get the cached analytics of a quiz, recomputing them when stale
+    
+    Cached results younger than ANALYTICS_CACHE_TTL are returned as is.
+    Otherwise (or with refresh) they are recomputed: from scratch, or with
+    incremental only over attempts submitted after the cached watermark.
+    Attempts younger than ANALYTICS_SETTLE_SECONDS are left for the next
+    computation, so writes still in flight are not skipped by the watermark.
+    
+    Returns:
+        dict: Stored analytics document (see QuizAnalyticsModel)
+    """
+    cached = db.quiz_analytics.find_one({"_id": quiz_id})
+    now = datetime.utcnow()
+    if cached and not refresh and now - cached["computed_at"] < timedelta(seconds=Config.ANALYTICS_CACHE_TTL):
+        return cached
+    
+    through = now - timedelta(seconds=Config.ANALYTICS_SETTLE_SECONDS)
+    if cached and incremental:
+        if through <= cached["computed_through"]:
+            return cached
+        state = merge_analytics(
+            QuizAnalyticsModel.state(cached),
+            compute_analytics(db, quiz_id, since=cached["computed_through"], through=through)
+        )
+        document = QuizAnalyticsModel.create_analytics(quiz_id, state, now, through, incremental=True)
+        # Only apply the delta to the snapshot it was computed against, and
+        # never re-create analytics invalidated meanwhile (e.g. by a regrade)
+        result = db.quiz_analytics.replace_one(
+            {"_id": quiz_id, "computed_through": cached["computed_through"]}, document
+        )
+        if result.matched_count:
+            return document
+        current = db.quiz_analytics.find_one({"_id": quiz_id})
+        if current is not None:
+            # A concurrent computation moved the watermark first
+            return current
+    
+    state = compute_analytics(db, quiz_id, through=through)
+    document = QuizAnalyticsModel.create_analytics(quiz_id, state, now, through, incremental=False)
+    try:
+        db.quiz_analytics.replace_one({"_id": quiz_id}, document, upsert=True)
+    except DuplicateKeyError:
+        # A concurrent computation inserted its result first
+        return db.quiz_analytics.find_one({"_id": quiz_id}) or document
+    return document
+
+def invalidate_quiz_analytics(db, quiz_id):
+    """Drop cached analytics (after attempts were regraded or deleted)"""
+    db.quiz_analytics.delete_one({"_id": quiz_id})
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from bson.errors import InvalidId
+from config import Config
+from app.utils.scoring import compile_question
+from app.utils.queries import QUESTION_ORDER, quiz_questions_filter
+
+def compile_answer_key(quiz, questions):
+    """
+    Compile a quiz and its ordered questions into an answer key
+    
+    Args:
+        quiz: Quiz document from database
+        questions: Question documents sorted by created_at
+    
+    Returns:
+        dict: Quiz identity, delivery settings, question order, max_score,
+        compiled questions, their grading version and when the key was compiled
+    """
+    compiled_questions = [compile_question(q) for q in questions]
+    key = {
+        "quiz_id": str(quiz["_id"]),
+        "slug": quiz.get("slug"),
+        "title": quiz.get("title"),
+        "pools": quiz.get("pools") or {},
+        "shuffle_questions": quiz.get("shuffle_questions", False),
+        "shuffle_choices": quiz.get("shuffle_choices", False),
+        "time_limit_seconds": quiz.get("time_limit_seconds"),
+        "question_order": [q["id"] for q in compiled_questions],
+        "questions": {q["id"]: q for q in compiled_questions},
+        "max_score": sum(q["points"] for q in compiled_questions)
+    }
+    key["version"] = grading_version(key)
+    key["compiled_at"] = time.time()
+    return key
+
+def grading_version(key):
+    """
+    Short hash of everything grading depends on
+    
+    Covers the question set and order, points, scoring policies, pools,
+    choice IDs and correct answers, but not display text, so typo fixes do
+    not invalidate attempts in progress while answer changes do.
+    """
+    parts = [key["pools"], key["shuffle_questions"], key["question_order"]]
+    for question_id in key["question_order"]:
+        question = key["questions"][question_id]
+        parts.append([
+            question["type"], question["points"], question["pool"], question["choice_bits"],
+            question["correct_mask"], question["scoring"], question["penalty"],
+            question["text_matcher"].signature() if question["text_matcher"] else None
+        ])
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+def _parse_object_id(value):
+    """Return value as an ObjectId, or None if it is not a valid one"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+def published_quiz_filters(slug_or_id):
+    """Filters to try in order when resolving a public quiz: by ID, then by slug"""
+    filters = []
+    quiz_id = _parse_object_id(slug_or_id)
+    if quiz_id is not None:
+        filters.append({"_id": quiz_id, "published": True})
+    filters.append({"slug": slug_or_id, "published": True})
+    return filters
+
+class AnswerKeyCache:
+    """
+    Per-process LRU cache of compiled answer keys for published quizzes
+    
+    Entries are keyed by quiz ID with slug aliases. Admin writes invalidate
+    entries in this process; the TTL bounds staleness across worker processes.
+    """
+    
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get(self, slug_or_id):
+        """Get a cached answer key by quiz ID or slug"""
+        with self._lock:
+            quiz_id = slug_or_id
+            if quiz_id not in self._entries and _parse_object_id(slug_or_id) is None:
+                quiz_id = self._aliases.get(slug_or_id)
+            entry = self._entries.get(quiz_id) if quiz_id else None
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            loaded_at, key = entry
+            if self.ttl and time.monotonic() - loaded_at > self.ttl:
+                self._remove(quiz_id)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(quiz_id)
+            self.hits += 1
+            return key
+    
+    def put(self, key, generation=None):
+        """Store an answer key unless the cache was invalidated since generation"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            
+            quiz_id = key["quiz_id"]
+            self._remove(quiz_id)
+            self._entries[quiz_id] = (time.monotonic(), key)
+            if key.get("slug"):
+                self._aliases[key["slug"]] = quiz_id
+            
+            while len(self._entries) > self.max_size:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+    
+    def invalidate(self, quiz_id):
+        """Drop the answer key for a quiz"""
+        with self._lock:
+            self._generation += 1
+            self._remove(str(ObjectId(quiz_id)))
+    
+    def clear(self):
+        """Drop all answer keys"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._aliases.clear()
+    
+    def load(self, db, slug_or_id):
+        """
+        Get the answer key for a published quiz, compiling it on a miss
+        
+        Resolves slug_or_id like the public endpoints: by ID first, then by slug.
+        
+        Returns:
+            dict: Compiled answer key, or None if no published quiz matches
+        """
+        key = self.get(slug_or_id)
+        if key is not None:
+            return key
+        
+        with self._lock:
+            generation = self._generation
+        
+        quiz = None
+        for quiz_filter in published_quiz_filters(slug_or_id):
+            quiz = db.quizzes.find_one(quiz_filter)
+            if quiz:
+                break
+        if not quiz:
+            return None
+        
+        questions = list(
+            db.questions.find(quiz_questions_filter(quiz["_id"]))
+            .sort(QUESTION_ORDER)
+        )
+        key = compile_answer_key(quiz, questions)
+        self.put(key, generation=generation)
+        return key
+    
+    def reload(self, db, quiz_id):
+        """Drop a quiz's cached answer key and compile it from the database"""
+        self.invalidate(quiz_id)
+        return self.load(db, quiz_id)
+    
+    async def reload_async(self, db, quiz_id):
+        """reload() for an async (AsyncMongoClient) database"""
+        self.invalidate(quiz_id)
+        return await self.load_async(db, quiz_id)
+    
+    async def load_async(self, db, slug_or_id):
+        """load() for an async (AsyncMongoClient) database"""
+        key = self.get(slug_or_id)
+        if key is not None:
+            return key
+        
+        with self._lock:
+            generation = self._generation
+        
+        quiz = None
+        for quiz_filter in published_quiz_filters(slug_or_id):
+            quiz = await db.quizzes.find_one(quiz_filter)
+            if quiz:
+                break
+        if not quiz:
+            return None
+        
+        questions = await db.questions.find(quiz_questions_filter(quiz["_id"])).sort(QUESTION_ORDER).to_list()
+        key = compile_answer_key(quiz, questions)
+        self.put(key, generation=generation)
+        return key
+    
+    def _remove(self, quiz_id):
+        """Remove an entry and its slug alias (caller holds the lock)"""
+        entry = self._entries.pop(quiz_id, None)
+        if entry is not None:
+            slug = entry[1].get("slug")
+            if slug and self._aliases.get(slug) == quiz_id:
+                del self._aliases[slug]
+
+# Shared by the admin and public controllers in this process
+answer_key_cache = AnswerKeyCache(Config.ANSWER_KEY_CACHE_SIZE, Config.ANSWER_KEY_CACHE_TTL)
@@ -0,0 +1,223 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itsdangerous import BadSignature, URLSafeSerializer
+from pymongo.errors import DuplicateKeyError
+from config import Config
+
+# Namespaces attempt tokens apart from anything else signed with SECRET_KEY
+ATTEMPT_TOKEN_SALT = "quiz-attempt"
+
+# Seconds of slack when comparing a token's start time (whole seconds, set by
+# possibly another host) with when this process compiled an answer key
+TOKEN_CLOCK_SKEW = 5
+
+class AttemptRejected(Exception):
+    """Raised for a genuine attempt token that can no longer be submitted"""
+
+def _serializer():
+    return URLSafeSerializer(Config.SECRET_KEY, salt=ATTEMPT_TOKEN_SALT)
+
+def issue_attempt_token(quiz_id, **claims):
+    """
+    Draw a new seed and sign it, with any extra claims, into an attempt token
+    
+    Returns:
+        tuple: (claims including quiz_id and seed, token)
+    """
+    claims = dict(claims, quiz_id=str(quiz_id), seed=secrets.randbits(48))
+    return claims, _serializer().dumps(claims)
+
+def read_attempt_token(token, quiz_id):
+    """
+    Verify an attempt token (signature and quiz) and return its claims
+    
+    Raises:
+        ValueError: If the token is not valid for this quiz
+    """
+    try:
+        claims = _serializer().loads(token)
+    except BadSignature:
+        raise ValueError("Invalid attempt token")
+    if not isinstance(claims, dict) or claims.get("quiz_id") != str(quiz_id):
+        raise ValueError("Attempt token does not belong to this quiz")
+    return claims
+
+def issue_start_token(answer_key, now=None):
+    """
+    Issue the start token of a new attempt
+    
+    The token is stateless: it carries the quiz's grading version, the start
+    time, the deadline (start + time_limit_seconds, if the quiz is timed),
+    the expiry of the token and a nonce that lets it be submitted only once.
+    
+    Returns:
+        tuple: (claims, token)
+    """
+    started_at = int(now if now is not None else time.time())
+    time_limit = answer_key.get("time_limit_seconds")
+    return issue_attempt_token(
+        answer_key["quiz_id"],
+        version=answer_key["version"],
+        nonce=secrets.token_hex(8),
+        started_at=started_at,
+        deadline=started_at + time_limit if time_limit else None,
+        expires_at=started_at + (time_limit + Config.ATTEMPT_DEADLINE_GRACE if time_limit else Config.ATTEMPT_TOKEN_MAX_AGE)
+    )
+
+def verify_attempt(answer_key, data, now=None):
+    """
+    Check the attempt token of a submission, without any database read
+    
+    Timed quizzes need a start token; the seed of a delivery token (see
+    app/utils/delivery.py) is accepted wherever no start token is required.
+    
+    Returns:
+        dict: Token claims, or None if the submission has no token
+    
+    Raises:
+        ValueError: If a required token is missing or invalid
+        AttemptRejected: If a start token is past its deadline
+    """
+    token = data.get("attempt_token")
+    if not token:
+        if answer_key.get("time_limit_seconds"):
+            raise ValueError("This quiz is timed; start it with POST /quizzes/<slug>/start")
+        return None
+    
+    claims = read_attempt_token(token, answer_key["quiz_id"])
+    if "nonce" not in claims:
+        # A delivery token from GET /quizzes/<slug> only carries a seed
+        if answer_key.get("time_limit_seconds"):
+            raise ValueError("This quiz is timed; start it with POST /quizzes/<slug>/start")
+        return claims
+    
+    now = now if now is not None else time.time()
+    if claims.get("deadline") and now > claims["deadline"] + Config.ATTEMPT_DEADLINE_GRACE:
+        raise AttemptRejected("Time limit exceeded")
+    if now > claims["expires_at"]:
+        raise AttemptRejected("Attempt token has expired")
+    return claims
+
+def key_predates_token(answer_key, claims):
+    """
+    Whether a start token may carry a newer grading version than answer_key
+    
+    Answer keys are cached per process for up to ANSWER_KEY_CACHE_TTL
+    seconds, so a worker can hold an older key than the one the token was
+    issued from. Only a key compiled before the token was issued can be
+    behind it; the caller reloads it and grades against the reloaded key.
+    """
+    if not claims or "nonce" not in claims:
+        return False
+    issued_after_compile = answer_key["compiled_at"] <= claims["started_at"] + TOKEN_CLOCK_SKEW
+    return claims["version"] != answer_key["version"] and issued_after_compile
+
+def session_fields(claims, version):
+    """
+    Attempt document fields recording the token an attempt was submitted with
+    
+    Args:
+        claims: Verified token claims, or None
+        version: Grading version the attempt was graded against; the
+            token's own version is kept as started_version if it differs
+    """
+    if not claims:
+        return {}
+    fields = {"seed": claims["seed"]}
+    if "nonce" in claims:
+        fields["quiz_version"] = version
+        fields["started_at"] = datetime.utcfromtimestamp(claims["started_at"])
+        if claims["version"] != version:
+            fields["started_version"] = claims["version"]
+    return fields
+
+class NonceCache:
+    """
+    Bounded per-process set of used start token nonces
+    
+    Nonces are kept until their token expires. When full, the oldest
+    entries are dropped first, so only the longest-running tokens could be
+    replayed. Only correct with a single worker process; NONCE_STORE=mongo
+    shares the set across processes.
+    """
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def claim(self, nonce, expires_at, now=None):
+        """Record a nonce; False if it was already used"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            # Entries are in claim order, so expired ones gather at the front
+            while self._entries and next(iter(self._entries.values())) < now:
+                self._entries.popitem(last=False)
+            if nonce in self._entries:
+                return False
+            self._entries[nonce] = expires_at
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True
+    
+    def release(self, nonce):
+        """Forget a claimed nonce so its token can be submitted again"""
+        with self._lock:
+            self._entries.pop(nonce, None)
+
+nonce_cache = NonceCache(Config.NONCE_CACHE_SIZE)
+
+def claim_nonce(db, claims):
+    """
+    Mark a start token as submitted
+    
+    With NONCE_STORE=mongo this is one insert into attempt_nonces (a TTL
+    index removes expired nonces); the unique _id rejects a replay.
+    
+    Returns:
+        bool: False if the token was already submitted
+    """
+    if Config.NONCE_STORE == "memory":
+        return nonce_cache.claim(claims["nonce"], claims["expires_at"])
+    try:
+        db.attempt_nonces.insert_one(
+            {"_id": claims["nonce"], "expires_at": datetime.utcfromtimestamp(claims["expires_at"])}
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+def release_nonce(db, claims):
+    """
+    Undo claim_nonce() when the attempt could not be saved
+    
+    The nonce is claimed before the write so concurrent replays are
+    rejected; if the write then fails, the token must stay usable for the
+    client's retry.
+    """
+    if Config.NONCE_STORE == "memory":
+        nonce_cache.release(claims["nonce"])
+        return
+    db.attempt_nonces.delete_one({"_id": claims["nonce"]})
+
+async def claim_nonce_async(db, claims):
+    """claim_nonce() for an async (AsyncMongoClient) database"""
+    if Config.NONCE_STORE == "memory":
+        return nonce_cache.claim(claims["nonce"], claims["expires_at"])
+    try:
+        await db.attempt_nonces.insert_one(
+            {"_id": claims["nonce"], "expires_at": datetime.utcfromtimestamp(claims["expires_at"])}
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def release_nonce_async(db, claims):
+    """release_nonce() for an async (AsyncMongoClient) database"""
+    if Config.NONCE_STORE == "memory":
+        nonce_cache.release(claims["nonce"])
+        return
+    await db.attempt_nonces.delete_one({"_id": claims["nonce"]})
@@ -0,0 +1,262 @@
+import atexit
+import fcntl
+import glob
+import os
+import queue
+import threading
+import time
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+from config import Config
+from app.utils.quiz_stats import record_attempts
+from app.utils.analytics import invalidate_quiz_analytics
+
+DUPLICATE_KEY = 11000
+
+class QueueFull(Exception):
+    """Raised when the write-behind queue cannot take another attempt"""
+
+def spill_path(directory, pid=None):
+    """Append-only spill file of one process"""
+    return os.path.join(directory, f"attempts-{pid or os.getpid()}.ndjson")
+
+def insert_ignoring_duplicates(collection, documents):
+    """
+    insert_many(ordered=False) that treats already-inserted documents as done
+    
+    Attempts carry their _id from submission, so retries and spill replays
+    are idempotent.
+    
+    Returns:
+        tuple: (documents inserted by this call, documents that failed for
+        reasons other than a duplicate _id)
+    """
+    try:
+        collection.insert_many(documents, ordered=False)
+        return documents, []
+    except BulkWriteError as e:
+        if e.details.get("writeConcernErrors"):
+            return [], documents
+        errors = {error["index"]: error.get("code") for error in e.details.get("writeErrors", [])}
+        inserted = [doc for index, doc in enumerate(documents) if index not in errors]
+        failed = [documents[index] for index, code in errors.items() if code != DUPLICATE_KEY]
+        return inserted, failed
+
+class AttemptWriter:
+    """
+    Write-behind buffer for graded attempts
+    
+    submit() enqueues an attempt (with its _id already assigned) and returns
+    immediately. A background thread flushes the queue with
+    insert_many(ordered=False) whenever ATTEMPT_FLUSH_SIZE attempts are
+    queued or ATTEMPT_FLUSH_INTERVAL_MS has passed. Batches that fail, or
+    arrive while the queue is backed up past ATTEMPT_SPILL_BACKLOG because
+    Mongo is slow, are appended to a local NDJSON spill file instead (see
+    replay_spill_files). The queue is flushed on interpreter exit.
+    
+    Inserted attempts are added to the quiz_stats counters with one $inc per
+    quiz and batch.
+    """
+    
+    def __init__(self, collection, max_queue=None, flush_size=None, flush_interval_ms=None,
+                 spill_dir=None, spill_backlog=None):
+        self.collection = collection
+        self.flush_size = flush_size or Config.ATTEMPT_FLUSH_SIZE
+        self.flush_interval = (flush_interval_ms or Config.ATTEMPT_FLUSH_INTERVAL_MS) / 1000
+        self.spill_dir = spill_dir or Config.ATTEMPT_SPILL_DIR
+        max_queue = max_queue or Config.ATTEMPT_QUEUE_SIZE
+        self.spill_threshold = int(max_queue * (spill_backlog or Config.ATTEMPT_SPILL_BACKLOG))
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.inserted = 0
+        self.spilled = 0
+        self.rejected = 0
+        self._thread = None
+        self._thread_pid = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+    
+    def submit(self, attempt):
+        """
+        Queue an attempt document for insertion
+        
+        Raises:
+            QueueFull: If the queue is at capacity (the caller should answer 503)
+        """
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(attempt)
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFull("Attempt queue is full")
+    
+    def _ensure_started(self):
+        """Start the flush thread in this process (it does not survive a fork)"""
+        if self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+            atexit.register(self.close)
+    
+    def _run(self):
+        """Collect batches by size or time and flush them"""
+        while not self._stopping.is_set() or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+    
+    def _flush(self, batch):
+        """Insert a batch, spilling it to disk if Mongo is failing or falling behind"""
+        if self.queue.qsize() >= self.spill_threshold:
+            self._spill(batch)
+            return
+        try:
+            inserted, failed = insert_ignoring_duplicates(self.collection, batch)
+        except PyMongoError:
+            inserted, failed = [], batch
+        self.inserted += len(batch) - len(failed)
+        if inserted:
+            record_attempts(self.collection.database.quiz_stats, inserted)
+        if failed:
+            self._spill(failed)
+    
+    def _spill(self, documents):
+        """Append documents to this process's spill file"""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        lines = "".join(json_util.dumps(doc, json_options=json_util.CANONICAL_JSON_OPTIONS) + "\n" for doc in documents)
+        path = spill_path(self.spill_dir)
+        with self._spill_lock:
+            while True:
+                with open(path, "a", encoding="utf-8") as spill_file:
+                    fcntl.flock(spill_file, fcntl.LOCK_EX)
+                    # A replay may have renamed the file between open and lock
+                    try:
+                        current = os.stat(path).st_ino == os.fstat(spill_file.fileno()).st_ino
+                    except FileNotFoundError:
+                        current = False
+                    if not current:
+                        continue
+                    spill_file.write(lines)
+                    spill_file.flush()
+                    if Config.ATTEMPT_SPILL_FSYNC:
+                        os.fsync(spill_file.fileno())
+                    break
+        self.spilled += len(documents)
+    
+    def close(self, timeout=10):
+        """Flush everything still queued and stop the flush thread"""
+        if self._thread is None or self._thread_pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        # Whatever the thread could not flush in time is spilled
+        leftover = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._spill(leftover)
+    
+    def stats(self):
+        """Queue depth and counters of this process"""
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "inserted": self.inserted,
+            "spilled": self.spilled,
+            "rejected": self.rejected
+        }
+
+_shared_writer = None
+_shared_writer_lock = threading.Lock()
+
+def shared_attempt_writer(collection):
+    """
+    The process's AttemptWriter, created on first use
+    
+    The sync and async public controllers submit to the same queue, so a
+    process has a single flush thread, spill file and set of counters.
+    
+    Args:
+        collection: Sync attempts collection the writer flushes to
+    """
+    global _shared_writer
+    with _shared_writer_lock:
+        if _shared_writer is None:
+            _shared_writer = AttemptWriter(collection)
+        return _shared_writer
+
+def replay_batch(collection, batch, path):
+    """
+    Insert one batch of spilled attempts and count the new ones in quiz_stats
+    
+    Replayed attempts keep their submitted_at, which lies before the
+    watermark of incremental analytics, so the analytics of their quizzes
+    are dropped to be recomputed in full.
+    """
+    inserted, failed = insert_ignoring_duplicates(collection, batch)
+    if inserted:
+        record_attempts(collection.database.quiz_stats, inserted)
+        for quiz_id in {attempt["quiz_id"] for attempt in inserted}:
+            invalidate_quiz_analytics(collection.database, quiz_id)
+    if failed:
+        raise RuntimeError(f"Could not insert attempts from {path}")
+
+def replay_spill_files(collection, spill_dir=None, batch_size=1000, progress=None):
+    """
+    Insert attempts from spill files and remove each file once replayed
+    
+    Files are renamed before reading so a live writer starts a new one.
+    
+    Returns:
+        int: Number of attempts read from spill files
+    """
+    spill_dir = spill_dir or Config.ATTEMPT_SPILL_DIR
+    replayed = 0
+    # Files left over from an interrupted replay are picked up again
+    paths = sorted(glob.glob(os.path.join(spill_dir, "attempts-*.ndjson.replaying")))
+    for path in sorted(glob.glob(os.path.join(spill_dir, "attempts-*.ndjson"))):
+        os.replace(path, f"{path}.replaying")
+        paths.append(f"{path}.replaying")
+    
+    for replaying_path in paths:
+        batch = []
+        with open(replaying_path, encoding="utf-8") as spill_file:
+            # Wait for a writer that opened the file before the rename
+            fcntl.flock(spill_file, fcntl.LOCK_EX)
+            for line in spill_file:
+                if not line.strip():
+                    continue
+                batch.append(json_util.loads(line))
+                if len(batch) == batch_size:
+                    replay_batch(collection, batch, replaying_path)
+                    replayed += len(batch)
+                    batch = []
+                    if progress:
+                        progress(replayed)
+        if batch:
+            replay_batch(collection, batch, replaying_path)
+            replayed += len(batch)
+            if progress:
+                progress(replayed)
+        os.remove(replaying_path)
+    return replayed
@@ -1,28 +1,249 @@
+import importlib.util
 import os
+import threading
+import time
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.monitoring import ConnectionPoolListener
 from config import Config
+from app.utils.metrics import metrics, command_metrics
+from app.utils.profiling import profiling_enabled, profile_command_listener
 
-# Global database connection
+# Global database connection (one client per process)
 db = None
 client = None
+client_pid = None
+
+# Asyncio client of the ASGI server (one per process, see get_async_db)
+async_client = None
+async_client_pid = None
+
+class PoolMetrics(ConnectionPoolListener):
+    """Connection pool counters collected from pymongo pool events"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+    
+    def reset(self):
+        """Zero all counters"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.in_use = 0
+            self.open_connections = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.pool_clears = 0
+    
+    def _wait_time(self, event):
+        # pymongo >= 4.7 reports the checkout duration on the event itself
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            started = getattr(self._local, "checkout_started", None)
+            duration = time.perf_counter() - started if started else 0.0
+        return duration
+    
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+    
+    def connection_checked_out(self, event):
+        wait = self._wait_time(event)
+        metrics.observe("quiz_mongo_pool_wait_seconds", wait)
+        metrics.inc("quiz_mongo_pool_connections", ("in_use",))
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_time_total += wait
+            if wait > self.wait_time_max:
+                self.wait_time_max = wait
+    
+    def connection_check_out_failed(self, event):
+        wait = self._wait_time(event)
+        metrics.observe("quiz_mongo_pool_wait_seconds", wait)
+        with self._lock:
+            self.checkout_failures += 1
+            self.wait_time_total += wait
+            if wait > self.wait_time_max:
+                self.wait_time_max = wait
+    
+    def connection_checked_in(self, event):
+        metrics.inc("quiz_mongo_pool_connections", ("in_use",), -1)
+        with self._lock:
+            self.in_use -= 1
+    
+    def connection_created(self, event):
+        metrics.inc("quiz_mongo_pool_connections", ("open",))
+        with self._lock:
+            self.connections_created += 1
+            self.open_connections += 1
+    
+    def connection_closed(self, event):
+        metrics.inc("quiz_mongo_pool_connections", ("open",), -1)
+        with self._lock:
+            self.connections_closed += 1
+            self.open_connections -= 1
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def snapshot(self):
+        """Return the counters with pool settings and average checkout wait"""
+        with self._lock:
+            attempts = self.checkouts + self.checkout_failures
+            return {
+                "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+                "wait_queue_timeout_ms": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "in_use": self.in_use,
+                "open_connections": self.open_connections,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "pool_clears": self.pool_clears,
+                "wait_time_avg_ms": round(self.wait_time_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3)
+            }
+
+pool_metrics = PoolMetrics()
+
+# Module each wire compressor needs; pymongo drops a compressor whose module is missing
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+def compressors_in_effect(compressors=None):
+    """
+    The configured MONGO_COMPRESSORS that pymongo can actually use
+    
+    Returns:
+        tuple: (usable compressors, configured compressors that are unavailable)
+    """
+    configured = [name.strip() for name in (compressors or Config.MONGO_COMPRESSORS).split(",") if name.strip()]
+    usable, missing = [], []
+    for name in configured:
+        module = COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            usable.append(name)
+        else:
+            missing.append(name)
+    return usable, missing
+
+def log_compressors():
+    """Print which configured wire compressors are in effect"""
+    if not Config.MONGO_COMPRESSORS:
+        return
+    usable, missing = compressors_in_effect()
+    print(f"MongoDB wire compression: {', '.join(usable) or 'none'}")
+    if missing:
+        print(f"✗ Unavailable MONGO_COMPRESSORS (module not installed or unknown name): {', '.join(missing)}")
+
+def client_options():
+    """MongoClient keyword arguments built from Config"""
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "readPreference": Config.MONGO_READ_PREFERENCE,
+        "event_listeners": [pool_metrics]
+    }
+    if Config.METRICS_ENABLED:
+        # Command latency and commands per request for /metrics
+        options["event_listeners"].append(command_metrics)
+    if profiling_enabled():
+        # MongoDB command timeline of profiled requests
+        options["event_listeners"].append(profile_command_listener)
+    if Config.MONGO_COMPRESSORS:
+        # Only the usable ones, so pymongo has nothing to drop silently (see log_compressors)
+        usable, _ = compressors_in_effect()
+        if usable:
+            options["compressors"] = ",".join(usable)
+    return options
 
 def init_db():
-    """Initialize MongoDB connection"""
-    global db, client
+    """Initialize the process-wide MongoDB client"""
+    global db, client, client_pid
     
     try:
-        client = MongoClient(os.environ.get("MONGO_URI"))
-        db = client[os.environ.get("DB_NAME")]
+        client = MongoClient(Config.MONGO_URI, **client_options())
+        db = client[Config.DB_NAME]
+        client_pid = os.getpid()
+        log_compressors()
         return db
     except Exception as e:
         print(f"✗ Error connecting to MongoDB: {e}")
         raise
 
 def get_db():
-    """Get database instance"""
+    """Get database instance, creating a new client in a forked child process"""
     global db
-    if db is None:
+    if db is None or client_pid != os.getpid():
         init_db()
     return db
 
+def get_client():
+    """Get the process-wide MongoClient"""
+    get_db()
+    return client
+
+def close_db():
+    """Close the MongoDB client of this process"""
+    global db, client, client_pid
+    if client is not None and client_pid == os.getpid():
+        client.close()
+    db = None
+    client = None
+    client_pid = None
+
+def get_async_db():
+    """
+    Get the AsyncMongoClient database of this process
+    
+    The client shares the pool settings and metrics of the sync client and
+    connects lazily on first use, inside the server's event loop.
+    """
+    global async_client, async_client_pid
+    if async_client is None or async_client_pid != os.getpid():
+        async_client = AsyncMongoClient(Config.MONGO_URI, **client_options())
+        async_client_pid = os.getpid()
+    return async_client[Config.DB_NAME]
+
+async def close_async_db():
+    """Close the AsyncMongoClient of this process"""
+    global async_client, async_client_pid
+    if async_client is not None and async_client_pid == os.getpid():
+        await async_client.close()
+    async_client = None
+    async_client_pid = None
+
+def reset_after_fork():
+    """
+    Forget a client inherited from a parent process
+    
+    MongoClient is not fork-safe, so a worker must open its own connections.
+    The inherited client is dropped without closing it, as its sockets are
+    still owned by the parent.
+    """
+    global db, client, client_pid, async_client, async_client_pid
+    db = None
+    client = None
+    client_pid = None
+    async_client = None
+    async_client_pid = None
+    pool_metrics.reset()
+    metrics.reset()
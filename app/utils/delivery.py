@@ -0,0 +1,104 @@
+import hashlib
+from app.utils.attempt_session import issue_attempt_token, read_attempt_token
+
+def is_randomized(quiz):
+    """
+    Whether a quiz is delivered per attempt (question pools or shuffling)
+    
+    Accepts a quiz document, its public payload or its answer key; all
+    carry the same delivery settings.
+    """
+    return bool(quiz.get("pools") or quiz.get("shuffle_questions") or quiz.get("shuffle_choices"))
+
+def _rank(seed, *parts):
+    """Deterministic pseudo-random sort key of an item under a seed"""
+    key = ":".join([str(seed)] + [str(part) for part in parts])
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+
+def select_questions(settings, questions, seed):
+    """
+    The questions of one attempt, in delivery order
+    
+    For every pool in settings['pools'] ({pool name: questions drawn}) the
+    drawn questions are the ones ranked first under the seed; questions
+    without a configured pool are always included. With shuffle_questions
+    the selection is reordered under the seed, otherwise it keeps quiz
+    order. Depends only on the seed and the question IDs, so the public
+    payload and the answer key yield the same selection.
+    
+    Args:
+        settings: Quiz delivery settings (quiz dict or answer key)
+        questions: (question_id, pool) pairs in quiz order
+        seed: Seed of the attempt
+    
+    Returns:
+        list: Question IDs
+    """
+    pools = settings.get("pools") or {}
+    selected = set()
+    pool_members = {}
+    for question_id, pool in questions:
+        if pool in pools:
+            pool_members.setdefault(pool, []).append(question_id)
+        else:
+            selected.add(question_id)
+    for pool, question_ids in pool_members.items():
+        question_ids.sort(key=lambda question_id: _rank(seed, "pool", question_id))
+        selected.update(question_ids[:pools[pool]])
+    
+    order = [question_id for question_id, _ in questions if question_id in selected]
+    if settings.get("shuffle_questions"):
+        order.sort(key=lambda question_id: _rank(seed, "order", question_id))
+    return order
+
+def deliver_payload(payload, attempt_token=None):
+    """
+    The public quiz payload of one attempt
+    
+    Resumes the attempt of attempt_token (a start token, or a delivery
+    token from an earlier request after a page reload) or issues a new
+    delivery token. Cached payloads are not modified.
+    
+    Returns:
+        dict: The payload with the attempt's questions, choices shuffled if
+        enabled, and its 'attempt_token'
+    
+    Raises:
+        ValueError: If attempt_token is not valid for this quiz
+    """
+    if attempt_token:
+        seed = read_attempt_token(attempt_token, payload["id"])["seed"]
+    else:
+        claims, attempt_token = issue_attempt_token(payload["id"])
+        seed = claims["seed"]
+    
+    questions = {question["id"]: question for question in payload.get("questions", [])}
+    order = select_questions(
+        payload,
+        [(question["id"], question.get("pool")) for question in payload.get("questions", [])],
+        seed
+    )
+    delivered = []
+    for question_id in order:
+        question = questions[question_id]
+        if payload.get("shuffle_choices"):
+            question = dict(question, choices=sorted(
+                question["choices"], key=lambda choice: _rank(seed, question_id, choice["id"])
+            ))
+        delivered.append(question)
+    return dict(payload, questions=delivered, attempt_token=attempt_token)
+
+def attempt_answer_key(answer_key, seed):
+    """The answer key restricted to the questions of one attempt"""
+    questions = answer_key["questions"]
+    order = select_questions(
+        answer_key,
+        [(question_id, questions[question_id].get("pool")) for question_id in answer_key["question_order"]],
+        seed
+    )
+    return dict(
+        answer_key,
+        question_order=order,
+        questions={question_id: questions[question_id] for question_id in order},
+        max_score=sum(questions[question_id]["points"] for question_id in order)
+    )
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime, timezone
+from app.models.attempt import AttemptModel
+
+# Rows rendered per chunk yielded to the WSGI server
+CHUNK_ROWS = 500
+
+# Leading characters that make spreadsheet applications evaluate a cell
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+def parse_datetime(value, name):
+    """
+    Parse an ISO 8601 query value as a naive UTC datetime (as stored)
+    
+    Raises:
+        ValueError: If the value is not a valid ISO 8601 timestamp
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_score(value, name):
+    """Parse a score bound from a query value (finite numbers only)"""
+    try:
+        score = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(score):
+        raise ValueError(f"{name} must be a number")
+    return score
+
+def csv_text(value):
+    """Participant-supplied CSV cell, quoted with ' so spreadsheets do not run it as a formula"""
+    value = value or ""
+    return f"'{value}" if value.startswith(FORMULA_PREFIXES) else value
+
+def attempt_filter(quiz_id, args):
+    """
+    Build the attempts query of a quiz from request filters
+    
+    Args:
+        quiz_id: Quiz ObjectId
+        args: Mapping with optional 'from' and 'to' (submitted_at range,
+            inclusive) and 'min_score' / 'max_score'
+    
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    query = {"quiz_id": quiz_id}
+    submitted_at = {}
+    if args.get("from"):
+        submitted_at["$gte"] = parse_datetime(args["from"], "from")
+    if args.get("to"):
+        submitted_at["$lte"] = parse_datetime(args["to"], "to")
+    if submitted_at:
+        query["submitted_at"] = submitted_at
+    
+    score = {}
+    if args.get("min_score"):
+        score["$gte"] = parse_score(args["min_score"], "min_score")
+    if args.get("max_score"):
+        score["$lte"] = parse_score(args["max_score"], "max_score")
+    if score:
+        query["score"] = score
+    return query
+
+def render_chunks(rows, render):
+    """Render rows in chunks of CHUNK_ROWS so every yield carries a useful payload"""
+    buffer = []
+    for row in rows:
+        buffer.append(render(row))
+        if len(buffer) == CHUNK_ROWS:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+def iter_ndjson(attempts):
+    """Yield attempts as newline-delimited JSON (AttemptModel.to_dict per line)"""
+    return render_chunks(
+        attempts,
+        lambda attempt: json.dumps(AttemptModel.to_dict(attempt), separators=(",", ":")) + "\n"
+    )
+
+def iter_csv(attempts, question_ids):
+    """
+    Yield attempts as CSV, one row per attempt
+    
+    Besides the attempt fields, there is one points column per question in
+    quiz order (empty if the attempt has no answer to it).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def render(row):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+    
+    def rows():
+        yield (
+            ["attempt_id", "name", "email", "submitted_at", "score", "max_score", "percentage"]
+            + [f"points_{question_id}" for question_id in question_ids]
+        )
+        for attempt in attempts:
+            points = {
+                str(answer.get("question_id")): answer.get("points_awarded", 0)
+                for answer in attempt.get("answers", [])
+            }
+            max_score = attempt.get("max_score", 0)
+            score = attempt.get("score", 0)
+            yield (
+                [
+                    str(attempt["_id"]),
+                    csv_text(attempt.get("name")),
+                    csv_text(attempt.get("email")),
+                    attempt["submitted_at"].isoformat() if attempt.get("submitted_at") else "",
+                    score,
+                    max_score,
+                    round(score / max_score * 100, 2) if max_score else 0
+                ]
+                + [points.get(question_id, "") for question_id in question_ids]
+            )
+    
+    return render_chunks(rows(), render)
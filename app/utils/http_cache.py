@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime
+from flask import Response, jsonify, request
+from werkzeug.http import http_date, quote_etag
+from werkzeug.sansio.http import is_resource_modified
+from config import Config
+
+# Projection of the question fields quiz_validators reads
+QUESTION_VERSION_FIELDS = {"_id": 1, "updated_at": 1}
+
+def compute_etag(parts):
+    """Compute a strong ETag value (unquoted) from an iterable of strings"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _isoformat(value):
+    return value.isoformat() if value else ""
+
+def quiz_validators(quiz, questions):
+    """
+    ETag and Last-Modified of a public quiz payload from its documents
+
+    The ETag covers the quiz and the ID and updated_at of every question in
+    order, so edits, additions, deletions and reordering all change it.
+
+    Returns:
+        tuple: (etag, last_modified)
+    """
+    parts = [str(quiz["_id"]), _isoformat(quiz.get("updated_at"))]
+    last_modified = quiz.get("updated_at")
+    for question in questions:
+        updated_at = question.get("updated_at")
+        parts.append(str(question["_id"]))
+        parts.append(_isoformat(updated_at))
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return compute_etag(parts), last_modified
+
+def quiz_payload_validators(quiz_dict):
+    """
+    ETag and Last-Modified of an already serialized public quiz payload
+
+    Yields the same values as quiz_validators on the source documents.
+    """
+    parts = [quiz_dict["id"], quiz_dict.get("updated_at") or ""]
+    timestamps = [quiz_dict.get("updated_at")]
+    for question in quiz_dict.get("questions", []):
+        parts.append(question["id"])
+        parts.append(question.get("updated_at") or "")
+        timestamps.append(question.get("updated_at"))
+    timestamps = [datetime.fromisoformat(t) for t in timestamps if t]
+    return compute_etag(parts), max(timestamps) if timestamps else None
+
+def quiz_list_etag(quizzes):
+    """ETag of a list of quiz documents, from their IDs and updated_at"""
+    parts = []
+    for quiz in quizzes:
+        parts.append(str(quiz["_id"]))
+        parts.append(_isoformat(quiz.get("updated_at")))
+    return compute_etag(parts)
+
+def validator_headers(etag, last_modified=None):
+    """ETag, Last-Modified and CDN-friendly Cache-Control header values"""
+    headers = {"ETag": quote_etag(etag)}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    headers["Cache-Control"] = (
+        f"public, max-age={Config.PUBLIC_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={Config.PUBLIC_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    return headers
+
+def cache_headers(response, etag, last_modified=None):
+    """Set validator and CDN-friendly Cache-Control headers on a response"""
+    response.headers.update(validator_headers(etag, last_modified))
+    return response
+
+def is_not_modified(request_headers, etag, last_modified=None):
+    """
+    Check the client's If-None-Match / If-Modified-Since against a representation
+    
+    request_headers is any case-insensitive header mapping (Flask or ASGI).
+    """
+    return not is_resource_modified(
+        http_if_none_match=request_headers.get("If-None-Match"),
+        http_if_modified_since=request_headers.get("If-Modified-Since"),
+        etag=etag,
+        last_modified=last_modified
+    )
+
+def conditional_json(etag, last_modified, build_payload):
+    """
+    Answer a GET with 304 Not Modified when the client's validators match
+
+    build_payload is only called (and the payload only serialized) when the
+    client does not already hold the current representation.
+    """
+    if is_not_modified(request.headers, etag, last_modified):
+        return cache_headers(Response(status=304), etag, last_modified)
+    return cache_headers(jsonify(build_payload()), etag, last_modified)
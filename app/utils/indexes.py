@@ -0,0 +1,170 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from config import Config
+from app.utils.analytics import analytics_pipeline
+from app.utils.answer_key_cache import published_quiz_filters
+from app.utils.export import attempt_filter
+from app.utils.pagination import EPOCH, encode_cursor, page_query
+from app.utils.queries import (
+    PUBLISHED_QUIZZES, QUIZ_LIST_FIELD, QUESTION_LIST_FIELD, ATTEMPT_LIST_FIELD, QUESTION_ORDER,
+    EXPORT_ORDER, REGRADE_ORDER, STATS_REBUILD_ORDER, RECENT_PROFILES_ORDER,
+    quiz_questions_filter, question_counts_pipeline, regrade_attempts_filter, stats_rebuild_filter
+)
+from app.utils.read_model import read_document_filter
+from app.utils.slug import taken_slugs_pipeline
+
+# Indexes required by the controller queries, per collection
+INDEXES = {
+    "quizzes": [
+        IndexModel([("slug", ASCENDING)], name="slug_unique", unique=True),
+        IndexModel(
+            [("published", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="published_created_at"
+        ),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at")
+    ],
+    "questions": [
+        IndexModel(
+            [("quiz_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="quiz_id_created_at_id"
+        )
+    ],
+    "attempts": [
+        IndexModel([("quiz_id", ASCENDING), ("_id", ASCENDING)], name="quiz_id_id"),
+        IndexModel(
+            [("quiz_id", ASCENDING), ("submitted_at", ASCENDING), ("_id", ASCENDING)],
+            name="quiz_id_submitted_at"
+        )
+    ],
+    "attempt_nonces": [
+        # Nonces of submitted start tokens are only needed until the token expires
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0)
+    ],
+    "request_profiles": [
+        # Profile reports of PROFILE_STORE=mongo are kept for PROFILE_RETENTION_SECONDS
+        IndexModel(
+            [("created_at", DESCENDING)], name="created_at_ttl",
+            expireAfterSeconds=Config.PROFILE_RETENTION_SECONDS
+        )
+    ],
+    "quiz_read_models": [
+        IndexModel([("slug", ASCENDING)], name="slug")
+    ]
+}
+
+def ensure_indexes(db):
+    """
+    Create all declared indexes (a no-op for indexes that already exist)
+    
+    Returns:
+        dict: Collection name to list of index names, or to an error message
+        if the collection's indexes could not be built (e.g. duplicate slugs)
+    """
+    results = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            results[collection_name] = db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            results[collection_name] = f"error: {e}"
+    return results
+
+def _query(name, collection, query, sort=None):
+    return {"name": name, "collection": collection, "filter": query, "sort": sort}
+
+def _page_queries(name, collection, query, field, descending):
+    """The first and a later keyset page of a paginated controller list"""
+    cursor = encode_cursor(datetime.utcnow() if descending else EPOCH, ObjectId())
+    first, sort, _ = page_query(query, field, Config.DEFAULT_PAGE_SIZE, None, descending)
+    later, _, _ = page_query(query, field, Config.DEFAULT_PAGE_SIZE, cursor, descending)
+    return [_query(name, collection, first, sort), _query(f"{name} page", collection, later, sort)]
+
+def controller_queries(db):
+    """
+    The hot controller queries, filled with sample values from the database
+    
+    Built with the same helpers as the controllers (app/utils/queries.py,
+    published_quiz_filters, page_query, attempt_filter, the slug and
+    analytics pipelines), so they cannot drift from the queries that run.
+    
+    Returns:
+        list: Dicts with 'name', 'collection' and either 'filter'/'sort'
+        or 'pipeline'
+    """
+    quiz = db.quizzes.find_one({}, {"slug": 1}) or {}
+    quiz_id = quiz.get("_id", ObjectId())
+    slug = quiz.get("slug", "sample-quiz")
+    by_id = published_quiz_filters(str(quiz_id))[0]
+    by_slug = published_quiz_filters(slug)[-1]
+    
+    return [
+        _query("public quiz by id", "quizzes", by_id),
+        _query("public quiz by slug", "quizzes", by_slug),
+        *_page_queries("published quizzes", "quizzes", PUBLISHED_QUIZZES, QUIZ_LIST_FIELD, True),
+        {"name": "slug allocation", "collection": "quizzes", "pipeline": taken_slugs_pipeline(slug)},
+        *_page_queries("admin quizzes", "quizzes", {}, QUIZ_LIST_FIELD, True),
+        _query("quiz questions", "questions", quiz_questions_filter(quiz_id), QUESTION_ORDER),
+        *_page_queries("admin questions", "questions", quiz_questions_filter(quiz_id), QUESTION_LIST_FIELD, False),
+        {"name": "question counts", "collection": "questions", "pipeline": question_counts_pipeline([quiz_id])},
+        _query("regrade attempts", "attempts", regrade_attempts_filter(quiz_id, ObjectId()), REGRADE_ORDER),
+        *_page_queries("admin attempts", "attempts", attempt_filter(quiz_id, {}), ATTEMPT_LIST_FIELD, True),
+        _query(
+            "attempts export", "attempts",
+            attempt_filter(quiz_id, {"from": EPOCH.isoformat(), "min_score": "0"}), EXPORT_ORDER
+        ),
+        _query("stats rebuild", "attempts", stats_rebuild_filter(quiz_id), STATS_REBUILD_ORDER),
+        _query("stats rebuild (all quizzes)", "attempts", stats_rebuild_filter(), STATS_REBUILD_ORDER),
+        {"name": "quiz analytics", "collection": "attempts",
+         "pipeline": analytics_pipeline(quiz_id, since=EPOCH, through=datetime.utcnow())},
+        _query("recent request profiles", "request_profiles", {}, RECENT_PROFILES_ORDER),
+        _query("quiz read model by id or slug", "quiz_read_models", read_document_filter(str(quiz_id))[0])
+    ]
+
+def _winning_plan_stages(explain_output):
+    """Collect the stage names of every winning plan in an explain() result"""
+    stages = []
+    
+    def walk(node, in_plan):
+        if isinstance(node, dict):
+            if in_plan and "stage" in node:
+                stages.append(node["stage"])
+            for key, value in node.items():
+                walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_plan)
+    
+    walk(explain_output, False)
+    return stages
+
+def explain_query(db, query):
+    """Run explain() for a query spec from controller_queries"""
+    collection = db[query["collection"]]
+    if "pipeline" in query:
+        return db.command(
+            "explain",
+            {"aggregate": collection.name, "pipeline": query["pipeline"], "cursor": {}},
+            verbosity="queryPlanner"
+        )
+    cursor = collection.find(query["filter"])
+    if query.get("sort"):
+        cursor = cursor.sort(query["sort"])
+    return cursor.explain()
+
+def verify_query_plans(db):
+    """
+    Explain every controller query and flag collection scans
+    
+    Returns:
+        list: One dict per query with 'name', 'stages' and 'collscan'
+    """
+    report = []
+    for query in controller_queries(db):
+        stages = _winning_plan_stages(explain_query(db, query))
+        report.append({
+            "name": query["name"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
@@ -0,0 +1,311 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pymongo.monitoring import CommandListener
+from config import Config
+from app.utils.answer_key_cache import answer_key_cache
+from app.utils.response_cache import response_cache
+
+# Upper bounds (seconds) of request and MongoDB latency buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Grading one attempt takes microseconds to milliseconds
+GRADING_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+# MongoDB commands sent while serving one request; a growing tail means N+1 queries
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64, 128)
+
+# name: (type, help, label names, histogram buckets)
+METRICS = {
+    "quiz_http_request_duration_seconds": (
+        "histogram", "HTTP request latency until the response is returned",
+        ("method", "route", "status"), LATENCY_BUCKETS
+    ),
+    "quiz_mongo_commands_per_request": (
+        "histogram", "MongoDB commands sent while serving one request",
+        ("method", "route"), COMMAND_COUNT_BUCKETS
+    ),
+    "quiz_mongo_request_seconds": (
+        "histogram", "Time spent in MongoDB commands while serving one request",
+        ("method", "route"), LATENCY_BUCKETS
+    ),
+    "quiz_mongo_command_duration_seconds": (
+        "histogram", "MongoDB command latency by command",
+        ("command", "outcome"), LATENCY_BUCKETS
+    ),
+    "quiz_mongo_pool_wait_seconds": (
+        "histogram", "Time waited to check a connection out of the MongoDB pool",
+        (), LATENCY_BUCKETS
+    ),
+    "quiz_mongo_pool_connections": (
+        "gauge", "MongoDB pool connections by state",
+        ("state",), None
+    ),
+    "quiz_grading_duration_seconds": (
+        "histogram", "Time to validate and grade one submitted attempt",
+        (), GRADING_BUCKETS
+    ),
+    "quiz_cache_requests_total": (
+        "counter", "Per-process cache lookups by cache and result",
+        ("cache", "result"), None
+    )
+}
+
+# [commands, seconds] spent in MongoDB by the request served in this context
+# (a thread under WSGI, a task under ASGI)
+_request_commands = ContextVar("request_commands", default=None)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def cache_series():
+    """Hit and miss counters of the per-process caches, read at scrape time"""
+    for cache, counters in (("answer_key", answer_key_cache), ("response", response_cache)):
+        yield "quiz_cache_requests_total", (cache, "hit"), counters.hits
+        yield "quiz_cache_requests_total", (cache, "miss"), counters.misses
+
+class MetricsRegistry:
+    """
+    Per-process Prometheus metrics with lock-free recording
+    
+    Every thread records into its own shard, a dict no other thread writes,
+    so inc() and observe() take no lock and lose no updates; snapshot() sums
+    the shards. Counters kept by other components (cache hits) are read
+    from collectors at scrape time instead of on every lookup.
+    
+    With METRICS_DIR set, each worker process also writes its series to a
+    file there and render() reports the sum over all workers (see collect).
+    """
+    
+    def __init__(self, definitions, collectors=(), directory=None, write_interval=None):
+        self.definitions = definitions
+        self.collectors = list(collectors)
+        self.directory = directory if directory is not None else Config.METRICS_DIR
+        self.write_interval = write_interval if write_interval is not None else Config.METRICS_WRITE_INTERVAL
+        self._next_write = 0.0
+        self._write_lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Drop all recorded series (called after a fork)"""
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+    
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+    
+    def inc(self, name, labels=(), value=1):
+        """Add value to a counter or gauge series"""
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+    
+    def observe(self, name, value, labels=()):
+        """Record one observation in a histogram series"""
+        shard = self._shard()
+        key = (name, labels)
+        buckets = self.definitions[name][3]
+        series = shard.get(key)
+        if series is None:
+            # Count per bucket, the +Inf bucket, then the sum
+            series = shard[key] = [0] * (len(buckets) + 2)
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+    
+    def snapshot(self):
+        """
+        Sum the shards of all threads and the collectors
+        
+        Returns:
+            dict: (name, labels) to a number, or to a histogram list
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        series = {}
+        for shard in shards:
+            # dict.copy() is atomic, the owning thread may add keys meanwhile
+            merge_series(series, shard.copy())
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                series[(name, labels)] = series.get((name, labels), 0) + value
+        return series
+    
+    def request_started(self):
+        """Start counting the MongoDB commands of the request served in this context"""
+        _request_commands.set([0, 0.0])
+        return time.perf_counter()
+    
+    def request_finished(self, started, method, route, status):
+        """Record the latency and MongoDB usage of a request"""
+        duration = time.perf_counter() - started
+        self.observe("quiz_http_request_duration_seconds", duration, (method, route, str(status)))
+        commands = _request_commands.get()
+        if commands is not None:
+            _request_commands.set(None)
+            self.observe("quiz_mongo_commands_per_request", commands[0], (method, route))
+            self.observe("quiz_mongo_request_seconds", commands[1], (method, route))
+        
+        if self.directory and time.monotonic() >= self._next_write:
+            # One thread writes; the others carry on instead of waiting
+            if self._write_lock.acquire(blocking=False):
+                try:
+                    self._next_write = time.monotonic() + self.write_interval
+                    self.write_snapshot()
+                except OSError:
+                    pass
+                finally:
+                    self._write_lock.release()
+    
+    def write_snapshot(self):
+        """Replace this process's file in METRICS_DIR with its current series"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as snapshot_file:
+            json.dump(encode_series(self.snapshot()), snapshot_file)
+        os.replace(temporary, path)
+    
+    def collect(self):
+        """
+        The series to export
+        
+        Without METRICS_DIR, the series of this process. With it, the sum
+        over the files of all workers: files of exited workers are folded
+        into metrics-retired.json (without their gauges), so counters stay
+        monotonic when gunicorn recycles a worker.
+        """
+        if not self.directory:
+            return self.snapshot()
+        
+        self.write_snapshot()
+        retired_path = os.path.join(self.directory, "metrics-retired.json")
+        series = {}
+        with open(os.path.join(self.directory, "metrics.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            retired = read_series(retired_path)
+            retired_changed = False
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                if path == retired_path:
+                    continue
+                worker_series = read_series(path)
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+                if _process_alive(pid):
+                    merge_series(series, worker_series)
+                    continue
+                merge_series(retired, {
+                    key: value for key, value in worker_series.items()
+                    if self.definitions.get(key[0], ("gauge",))[0] != "gauge"
+                })
+                retired_changed = True
+                os.remove(path)
+            if retired_changed:
+                temporary = f"{retired_path}.tmp"
+                with open(temporary, "w", encoding="utf-8") as retired_file:
+                    json.dump(encode_series(retired), retired_file)
+                os.replace(temporary, retired_path)
+        merge_series(series, retired)
+        return series
+    
+    def render(self):
+        """Render the exported series in the Prometheus text format (version 0.0.4)"""
+        by_name = {}
+        for (name, labels), value in self.collect().items():
+            by_name.setdefault(name, []).append((labels, value))
+        
+        lines = []
+        for name, (metric_type, help_text, label_names, buckets) in self.definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+                if metric_type != "histogram":
+                    lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{_labels(label_names + ('le',), labels + (_number(bound),))} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(label_names, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+def merge_series(target, series):
+    """Add series (numbers or histogram lists) into target"""
+    for key, value in series.items():
+        if isinstance(value, list):
+            total = target.get(key)
+            if total is None:
+                target[key] = list(value)
+            else:
+                for index, count in enumerate(value):
+                    total[index] += count
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+def encode_series(series):
+    """JSON-serializable form of series"""
+    return [[name, list(labels), value] for (name, labels), value in series.items()]
+
+def read_series(path):
+    """Series from a file written by write_snapshot ({} if missing or partial)"""
+    try:
+        with open(path, encoding="utf-8") as series_file:
+            return {(name, tuple(labels)): value for name, labels, value in json.load(series_file)}
+    except (OSError, ValueError):
+        return {}
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class CommandMetrics(CommandListener):
+    """MongoDB command latency, and commands per request (see request_started)"""
+    
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        self._record(event, "success")
+    
+    def failed(self, event):
+        self._record(event, "failure")
+    
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        metrics.observe("quiz_mongo_command_duration_seconds", seconds, (event.command_name, outcome))
+        commands = _request_commands.get()
+        if commands is not None:
+            commands[0] += 1
+            commands[1] += seconds
+
+# Shared by the WSGI and ASGI request hooks and the MongoDB listeners of this process
+metrics = MetricsRegistry(METRICS, collectors=[cache_series])
+command_metrics = CommandMetrics()
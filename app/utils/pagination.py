@@ -0,0 +1,118 @@
+import base64
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from config import Config
+
+EPOCH = datetime(1970, 1, 1)
+
+def parse_limit(value, maximum=None):
+    """
+    Parse a page size from a query string value
+    
+    Returns:
+        int: The page size, or None if no limit was requested
+    
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value is None or value == "":
+        return None
+    maximum = maximum or Config.MAX_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a positive integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
+
+def encode_cursor(sort_value, doc_id):
+    """Encode a (datetime, ObjectId) sort position as an opaque cursor"""
+    millis = (sort_value - EPOCH) // timedelta(milliseconds=1)
+    raw = f"{millis}:{doc_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decode an opaque cursor produced by encode_cursor
+    
+    Returns:
+        tuple: (datetime, ObjectId)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, doc_id = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+        return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(field, sort_value, doc_id, descending=True):
+    """
+    Build a filter selecting documents after a (field, _id) sort position
+    
+    The matching sort is [(field, d), ("_id", d)] with d = -1 if descending.
+    """
+    op = "$lt" if descending else "$gt"
+    return {
+        "$or": [
+            {field: {op: sort_value}},
+            {field: sort_value, "_id": {op: doc_id}}
+        ]
+    }
+
+def page_query(query, field, limit, after, descending=True):
+    """
+    Apply a keyset page to a query sorted by (field, _id)
+    
+    Args:
+        query: Base filter
+        field: Sort field (a datetime)
+        limit: Page size from parse_limit, or None for no paging
+        after: Cursor of the previous page, or None for the first page
+        descending: Sort direction
+    
+    Returns:
+        tuple: (filter, sort, number of documents to fetch or None). One
+        document more than the page is fetched to detect a next page.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if after:
+        sort_value, last_id = decode_cursor(after)
+        seek = keyset_filter(field, sort_value, last_id, descending)
+        query = {"$and": [query, seek]} if "$or" in query else dict(query, **seek)
+    direction = -1 if descending else 1
+    return query, [(field, direction), ("_id", direction)], limit + 1 if limit else None
+
+def split_page(documents, field, limit):
+    """
+    Drop the look-ahead document fetched by page_query
+    
+    Returns:
+        tuple: (documents of the page, cursor of the next page or None)
+    """
+    if limit is None or len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor(documents[-1][field], documents[-1]["_id"])
+
+def fetch_page(collection, query, field, limit, after, descending=True, projection=None):
+    """
+    Fetch one keyset page (or everything when limit is None)
+    
+    Returns:
+        tuple: (documents, cursor of the next page or None)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query, sort, fetch_limit = page_query(query, field, limit, after, descending)
+    cursor = collection.find(query, projection).sort(sort)
+    if fetch_limit:
+        cursor = cursor.limit(fetch_limit)
+    return split_page(list(cursor), field, limit)
@@ -0,0 +1,292 @@
+import hmac
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from pymongo.monitoring import CommandListener
+from config import Config
+from app.utils.queries import RECENT_PROFILES_ORDER
+
+# Request header that asks for a profile; its value must be PROFILE_SECRET
+PROFILE_HEADER = "X-Profile"
+
+# Profile of the request served in this context, if it is being profiled
+_active_profile = ContextVar("active_profile", default=None)
+
+# Only one request per process is profiled at a time
+_profiling_lock = threading.Lock()
+
+def profiling_enabled(config=Config):
+    """Whether any request can be profiled (otherwise no hooks or listeners are installed)"""
+    return bool(config.PROFILE_SECRET) or config.PROFILE_SAMPLE_RATE > 0
+
+def profile_trigger(header_value):
+    """
+    Why a request should be profiled
+    
+    Returns:
+        str: "header" for a request carrying PROFILE_SECRET, "sample" for a
+        sampled one, or None
+    """
+    if header_value and Config.PROFILE_SECRET and hmac.compare_digest(
+        header_value.encode("utf-8"), Config.PROFILE_SECRET.encode("utf-8")
+    ):
+        return "header"
+    if Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+def _function_name(key):
+    """'path:line(function)' of a pstats key, with paths relative to the project or site-packages"""
+    filename, line, function = key
+    if filename == "~":
+        return function
+    for root in (os.getcwd(), "site-packages"):
+        index = filename.find(root)
+        if index != -1:
+            filename = filename[index + len(root):].lstrip(os.sep)
+            break
+    return f"{filename}:{line}({function})"
+
+def _builtin_key(function):
+    """pstats-style key of a C function"""
+    module = getattr(function, "__module__", None) or type(getattr(function, "__self__", None)).__name__
+    return ("~", 0, f"<built-in method {module}.{function.__qualname__}>")
+
+def top_functions(stats, sort_index, top_n):
+    """The top_n entries of ContextProfiler.stats sorted by self (1) or cumulative (2) time"""
+    rows = sorted(stats.items(), key=lambda item: item[1][sort_index], reverse=True)[:top_n]
+    return [
+        {
+            "function": _function_name(key),
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 3),
+            "cumulative_ms": round(cumulative_time * 1000, 3)
+        }
+        for key, (calls, self_time, cumulative_time) in rows
+    ]
+
+class ContextProfiler:
+    """
+    Deterministic profiler of the calls made for one request
+    
+    cProfile is not used: from Python 3.12 it hooks sys.monitoring, which
+    records every thread of the process. sys.setprofile only hooks the
+    calling thread, and events are only counted while the request's context
+    is current, which also leaves out the other requests' coroutines that
+    share an event loop with a profiled ASGI request. Those requests still
+    pay for the hook while it is installed.
+    """
+    
+    def __init__(self, profile):
+        self.profile = profile
+        # (filename, line, function) -> [calls, self time, cumulative time]
+        self.stats = {}
+        self._stack = []
+        self._depth = {}
+        self._previous = None
+    
+    def enable(self):
+        self._previous = sys.getprofile()
+        sys.setprofile(self._event)
+    
+    def disable(self):
+        sys.setprofile(self._previous)
+        # Frames still running (e.g. the caller of finish()) end now
+        now = time.perf_counter()
+        while self._stack:
+            self._pop(now)
+    
+    def _event(self, frame, event, arg):
+        if _active_profile.get() is not self.profile:
+            return
+        now = time.perf_counter()
+        if event == "call":
+            code = frame.f_code
+            self._push((code.co_filename, code.co_firstlineno, code.co_name), now)
+        elif event == "c_call":
+            self._push(_builtin_key(arg), now)
+        elif self._stack:
+            # return, c_return or c_exception; returns of frames entered
+            # before enable() find an empty stack
+            self._pop(now)
+    
+    def _push(self, key, now):
+        self._stack.append([key, now, 0.0])
+        self._depth[key] = self._depth.get(key, 0) + 1
+    
+    def _pop(self, now):
+        key, started, child_time = self._stack.pop()
+        elapsed = now - started
+        entry = self.stats.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed - child_time
+        self._depth[key] -= 1
+        if not self._depth[key]:
+            # Recursive calls count towards cumulative time once
+            entry[2] += elapsed
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+class RequestProfile:
+    """Function profile and MongoDB command timeline of one request"""
+    
+    def __init__(self, method, path, trigger):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.created_at = datetime.utcnow()
+        self.commands = []
+        self._pending = {}
+        self.profiler = ContextProfiler(self)
+        self.finished = False
+        self.started = time.perf_counter()
+        self._token = _active_profile.set(self)
+        self.profiler.enable()
+    
+    def command_started(self, event):
+        collection = event.command.get(event.command_name)
+        self._pending[event.request_id] = (time.perf_counter(), collection if isinstance(collection, str) else None)
+    
+    def command_finished(self, event, outcome):
+        started, collection = self._pending.pop(event.request_id, (None, None))
+        if started is None:
+            # Only the reply was seen; place the command by its duration
+            started = time.perf_counter() - event.duration_micros / 1e6
+        self.commands.append({
+            "command": event.command_name,
+            "collection": collection,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(event.duration_micros / 1000, 3),
+            "outcome": outcome
+        })
+    
+    def finish(self, route, status, top_n=None):
+        """
+        Stop profiling and build the report
+        
+        Returns:
+            dict: Request, timing, MongoDB command timeline and the top_n
+            functions by self and by cumulative time
+        """
+        self.profiler.disable()
+        self.finished = True
+        duration = time.perf_counter() - self.started
+        _active_profile.reset(self._token)
+        top_n = top_n or Config.PROFILE_TOP_N
+        stats = self.profiler.stats
+        return {
+            "_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status,
+            "trigger": self.trigger,
+            "pid": os.getpid(),
+            "created_at": self.created_at,
+            "duration_ms": round(duration * 1000, 3),
+            "mongo": {
+                "commands": len(self.commands),
+                "total_ms": round(sum(command["duration_ms"] for command in self.commands), 3),
+                "timeline": self.commands
+            },
+            "by_self_time": top_functions(stats, 1, top_n),
+            "by_cumulative_time": top_functions(stats, 2, top_n)
+        }
+
+def start_profile(method, path, header_value):
+    """
+    Start profiling the request served in this context if it is selected
+    
+    Returns:
+        RequestProfile: The running profile, or None if the request is not
+        selected or another request of this process is being profiled
+    """
+    trigger = profile_trigger(header_value)
+    if trigger is None or not _profiling_lock.acquire(blocking=False):
+        return None
+    try:
+        return RequestProfile(method, path, trigger)
+    except Exception:
+        _profiling_lock.release()
+        raise
+
+def finish_profile(profile, route, status):
+    """Stop a profile started by start_profile and return its report"""
+    try:
+        return profile.finish(route, status)
+    finally:
+        _profiling_lock.release()
+
+class ProfileCommandListener(CommandListener):
+    """Adds MongoDB commands to the timeline of the request being profiled"""
+    
+    def started(self, event):
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.command_started(event)
+    
+    def succeeded(self, event):
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.command_finished(event, "success")
+    
+    def failed(self, event):
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.command_finished(event, "failure")
+
+class ProfileStore:
+    """
+    Recent profile reports
+    
+    PROFILE_STORE=memory keeps the last PROFILE_BUFFER_SIZE reports of this
+    process in a ring buffer. PROFILE_STORE=mongo saves them to the
+    request_profiles collection (a TTL index drops them after
+    PROFILE_RETENTION_SECONDS), so any worker can serve them.
+    """
+    
+    def __init__(self, max_size):
+        self._reports = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+    
+    def save(self, db, report):
+        if Config.PROFILE_STORE == "mongo":
+            try:
+                db.request_profiles.insert_one(report)
+            except PyMongoError as e:
+                print(f"✗ Could not store request profile {report['_id']}: {e}")
+            return
+        with self._lock:
+            self._reports.append(report)
+    
+    def recent(self, db, limit):
+        """Summaries of the newest reports, newest first"""
+        fields = ["_id", "method", "path", "route", "status", "trigger", "pid", "created_at", "duration_ms"]
+        if Config.PROFILE_STORE == "mongo":
+            cursor = db.request_profiles.find({}, {field: 1 for field in fields}).sort(RECENT_PROFILES_ORDER)
+            return list(cursor.limit(limit))
+        with self._lock:
+            reports = list(self._reports)[::-1][:limit]
+        return [{field: report[field] for field in fields} for report in reports]
+    
+    def get(self, db, profile_id):
+        """A full report by ID, or None"""
+        if Config.PROFILE_STORE == "mongo":
+            return db.request_profiles.find_one({"_id": profile_id})
+        with self._lock:
+            for report in self._reports:
+                if report["_id"] == profile_id:
+                    return report
+        return None
+
+# Shared by the request hooks and the admin profile endpoints of this process
+profile_store = ProfileStore(Config.PROFILE_BUFFER_SIZE)
+profile_command_listener = ProfileCommandListener()
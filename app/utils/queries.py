@@ -0,0 +1,48 @@
+# Filters and sorts of the hot controller queries. The controllers and
+# verify_query_plans (app/utils/indexes.py) both build their queries from
+# these, so the plans checked for collection scans are those that run.
+
+# Public quiz list, newest first (keyset pages on created_at, _id)
+PUBLISHED_QUIZZES = {"published": True}
+QUIZ_LIST_FIELD = "created_at"
+
+# Admin attempt pages, newest first (keyset pages on submitted_at, _id)
+ATTEMPT_LIST_FIELD = "submitted_at"
+
+# Questions of a quiz are always read in creation order
+QUESTION_LIST_FIELD = "created_at"
+QUESTION_ORDER = [(QUESTION_LIST_FIELD, 1), ("_id", 1)]
+
+# Attempt export in submission order
+EXPORT_ORDER = [(ATTEMPT_LIST_FIELD, 1), ("_id", 1)]
+
+# Regrades walk a quiz's attempts by _id so a checkpoint can resume
+REGRADE_ORDER = [("_id", 1)]
+
+# Stats rebuilds read attempts grouped by quiz
+STATS_REBUILD_ORDER = [("quiz_id", 1), (ATTEMPT_LIST_FIELD, 1), ("_id", 1)]
+
+# Newest request profiles first (PROFILE_STORE=mongo)
+RECENT_PROFILES_ORDER = [("created_at", -1)]
+
+def quiz_questions_filter(quiz_id):
+    """Filter of a quiz's questions (sort with QUESTION_ORDER)"""
+    return {"quiz_id": quiz_id}
+
+def question_counts_pipeline(quiz_ids):
+    """Aggregation counting the questions of each quiz in quiz_ids"""
+    return [
+        {"$match": {"quiz_id": {"$in": quiz_ids}}},
+        {"$group": {"_id": "$quiz_id", "count": {"$sum": 1}}}
+    ]
+
+def regrade_attempts_filter(quiz_id, after_id=None):
+    """Filter of the attempts a regrade still has to visit (sort with REGRADE_ORDER)"""
+    query = {"quiz_id": quiz_id}
+    if after_id:
+        query["_id"] = {"$gt": after_id}
+    return query
+
+def stats_rebuild_filter(quiz_id=None):
+    """Filter of the attempts counted by a stats rebuild (all quizzes if quiz_id is None)"""
+    return {"quiz_id": quiz_id} if quiz_id is not None else {}
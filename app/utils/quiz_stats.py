@@ -0,0 +1,173 @@
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from app.utils.queries import STATS_REBUILD_ORDER, stats_rebuild_filter
+
+def score_key(score):
+    """Histogram field name of a score (field names cannot contain '.')"""
+    if isinstance(score, float) and score.is_integer():
+        score = int(score)
+    return str(score).replace(".", "_")
+
+def parse_score_key(key):
+    """Score value of a histogram field name"""
+    value = key.replace("_", ".")
+    return float(value) if "." in value else int(value)
+
+def answer_is_correct(answer):
+    """Stored correctness of a graded answer (earned points for attempts graded before the flag existed)"""
+    is_correct = answer.get("is_correct")
+    if is_correct is None:
+        return answer.get("points_awarded", 0) > 0
+    return bool(is_correct)
+
+def attempt_stats_delta(attempt, sign=1):
+    """
+    $inc fields adding (sign=1) or removing (sign=-1) one attempt's contribution
+    
+    Returns:
+        dict: Dotted counter field names to increments
+    """
+    score = attempt.get("score", 0)
+    delta = {
+        "count": sign,
+        "score_sum": sign * score,
+        "score_sq_sum": sign * score * score,
+        "max_score_sum": sign * attempt.get("max_score", 0),
+        f"histogram.{score_key(score)}": sign
+    }
+    for answer in attempt.get("answers", []):
+        prefix = f"questions.{answer.get('question_id')}"
+        delta[f"{prefix}.answered"] = delta.get(f"{prefix}.answered", 0) + sign
+        if answer_is_correct(answer):
+            delta[f"{prefix}.correct"] = delta.get(f"{prefix}.correct", 0) + sign
+    return delta
+
+def combine_deltas(deltas, into=None):
+    """Sum several $inc deltas into one"""
+    combined = into if into is not None else {}
+    for delta in deltas:
+        for field, increment in delta.items():
+            combined[field] = combined.get(field, 0) + increment
+    return combined
+
+def stats_update(delta):
+    """
+    Update document applying a $inc delta to a quiz_stats document
+    
+    Returns:
+        dict: The update, or None if every increment cancels out
+    """
+    increments = {field: increment for field, increment in delta.items() if increment}
+    if not increments:
+        return None
+    return {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+
+def apply_stats_deltas(stats_collection, deltas_by_quiz):
+    """
+    Apply one combined $inc per quiz
+    
+    Counter updates are best-effort: the attempts are already stored, and
+    "python manage.py rebuild-stats" recomputes the counters from them.
+    
+    Returns:
+        bool: Whether every update succeeded
+    """
+    try:
+        for quiz_id, delta in deltas_by_quiz.items():
+            update = stats_update(delta)
+            if update:
+                stats_collection.update_one({"_id": quiz_id}, update, upsert=True)
+        return True
+    except PyMongoError:
+        return False
+
+async def apply_stats_deltas_async(stats_collection, deltas_by_quiz):
+    """apply_stats_deltas for an async (AsyncMongoClient) collection"""
+    try:
+        for quiz_id, delta in deltas_by_quiz.items():
+            update = stats_update(delta)
+            if update:
+                await stats_collection.update_one({"_id": quiz_id}, update, upsert=True)
+        return True
+    except PyMongoError:
+        return False
+
+def attempts_deltas(attempts):
+    """Combined $inc delta of each quiz the attempts belong to"""
+    deltas_by_quiz = {}
+    for attempt in attempts:
+        combine_deltas([attempt_stats_delta(attempt)], deltas_by_quiz.setdefault(attempt["quiz_id"], {}))
+    return deltas_by_quiz
+
+def record_attempts(stats_collection, attempts):
+    """Add newly inserted attempts to their quizzes' counters"""
+    return apply_stats_deltas(stats_collection, attempts_deltas(attempts))
+
+async def record_attempts_async(stats_collection, attempts):
+    """record_attempts for an async (AsyncMongoClient) collection"""
+    return await apply_stats_deltas_async(stats_collection, attempts_deltas(attempts))
+
+def rebuild_quiz_stats(db, quiz_id=None, batch_size=1000, progress=None):
+    """
+    Recompute quiz_stats counters from attempts in one streaming pass
+    
+    Attempts are read in quiz order with a projected, batched cursor, so
+    only one quiz's counters are held in memory at a time. Submissions made
+    while a quiz is being rebuilt may be missed; rebuild during quiet periods.
+    
+    Returns:
+        int: Number of attempts counted
+    """
+    query = stats_rebuild_filter(quiz_id)
+    cursor = (
+        db.attempts.find(query, {
+            "quiz_id": 1,
+            "score": 1,
+            "max_score": 1,
+            "answers.question_id": 1,
+            "answers.is_correct": 1,
+            "answers.points_awarded": 1
+        })
+        .sort(STATS_REBUILD_ORDER)
+        .batch_size(batch_size)
+    )
+    
+    counted = 0
+    rebuilt = set()
+    current_quiz_id = None
+    delta = {}
+    
+    def write(quiz_id, delta):
+        document = {"_id": quiz_id, "updated_at": datetime.utcnow(), "rebuilt_at": datetime.utcnow()}
+        for field, value in delta.items():
+            if not value:
+                continue
+            # Expand dotted $inc fields into nested documents
+            target = document
+            *parents, leaf = field.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        db.quiz_stats.replace_one({"_id": quiz_id}, document, upsert=True)
+        rebuilt.add(quiz_id)
+    
+    for attempt in cursor:
+        if attempt["quiz_id"] != current_quiz_id:
+            if current_quiz_id is not None:
+                write(current_quiz_id, delta)
+            current_quiz_id = attempt["quiz_id"]
+            delta = {}
+        combine_deltas([attempt_stats_delta(attempt)], delta)
+        counted += 1
+        if progress and counted % batch_size == 0:
+            progress(counted)
+    if current_quiz_id is not None:
+        write(current_quiz_id, delta)
+    
+    # Quizzes without attempts have no counters
+    stale = {"_id": {"$nin": list(rebuilt)}}
+    if quiz_id is not None:
+        stale = {"_id": quiz_id} if quiz_id not in rebuilt else None
+    if stale is not None:
+        db.quiz_stats.delete_many(stale)
+    return counted
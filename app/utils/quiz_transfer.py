@@ -0,0 +1,169 @@
+import json
+from datetime import timedelta
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from config import Config
+from app.models.quiz import QuizModel
+from app.models.question import QuestionModel
+from app.utils.validation import question_error, delivery_error
+from app.utils.export import render_chunks
+
+QUIZ_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson"
+}
+
+# Question fields read from an import; anything else (exported IDs,
+# timestamps) is ignored
+QUESTION_FIELDS = [
+    "type", "text", "choices", "correct_text", "accepted_answers", "ignore_punctuation",
+    "numeric_tolerance", "max_edit_distance", "scoring", "penalty", "points", "pool"
+]
+
+def parse_quiz_import(body, import_format):
+    """
+    Parse an uploaded quiz with its questions
+    
+    JSON is one object with the quiz fields and a 'questions' array. NDJSON
+    has the quiz object on the first line and one question per line after
+    it. Both are the formats written by the quiz export.
+    
+    Returns:
+        tuple: (quiz data, list of question data)
+    
+    Raises:
+        ValueError: If the body cannot be parsed
+    """
+    if import_format == "ndjson":
+        records = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Line {number} is not valid JSON")
+        if not records or not isinstance(records[0], dict):
+            raise ValueError("The first line must be the quiz object")
+        quiz_data, questions = records[0], records[1:]
+    else:
+        try:
+            quiz_data = json.loads(body)
+        except ValueError:
+            raise ValueError("Request body must be valid JSON")
+        if not isinstance(quiz_data, dict):
+            raise ValueError("Request body must be a JSON object")
+        questions = quiz_data.get("questions", [])
+        if not isinstance(questions, list):
+            raise ValueError("questions must be an array")
+    
+    if len(questions) > Config.IMPORT_MAX_QUESTIONS:
+        raise ValueError(f"At most {Config.IMPORT_MAX_QUESTIONS} questions can be imported at once")
+    return quiz_data, questions
+
+def prepare_import(quiz_data, questions):
+    """
+    Validate an import with the rules of create_quiz and create_question
+    
+    Only the authoring fields of each question are kept, and choices are
+    reduced to text and is_correct so every import gets fresh IDs.
+    
+    Returns:
+        tuple: (question data ready for question_documents, list of dicts
+        with 'index' (None for the quiz itself) and 'error')
+    """
+    errors = []
+    if not quiz_data.get("title"):
+        errors.append({"index": None, "error": "Title is required"})
+    error = delivery_error(quiz_data)
+    if error:
+        errors.append({"index": None, "error": error})
+    
+    prepared = []
+    for index, data in enumerate(questions):
+        if isinstance(data, dict):
+            data = {field: data[field] for field in QUESTION_FIELDS if field in data}
+            choices = data.get("choices", [])
+            if not isinstance(choices, list) or not all(isinstance(choice, dict) for choice in choices):
+                errors.append({"index": index, "error": "choices must be an array of objects"})
+                continue
+            data["choices"] = [
+                {"text": choice.get("text", ""), "is_correct": bool(choice.get("is_correct", False))}
+                for choice in choices
+            ]
+        error = question_error(data)
+        if error:
+            errors.append({"index": index, "error": error})
+        prepared.append(data)
+    return prepared, errors
+
+def question_documents(quiz_id, questions, created_at):
+    """
+    Build the question documents of an import
+    
+    created_at steps by one millisecond (the precision MongoDB stores) per
+    question, so the imported order is the order questions are listed in.
+    """
+    documents = []
+    for index, data in enumerate(questions):
+        question = QuestionModel.create_question(dict(data, quiz_id=quiz_id))
+        question["_id"] = ObjectId()
+        question["created_at"] = question["updated_at"] = created_at + timedelta(milliseconds=index)
+        documents.append(question)
+    return documents
+
+def supports_transactions(client):
+    """Whether the deployment runs multi-document transactions (replica set or sharded cluster)"""
+    topology = getattr(client, "topology_description", None)
+    return topology is not None and topology.topology_type_name in ("ReplicaSetWithPrimary", "Sharded")
+
+def insert_quiz(db, quiz, questions):
+    """
+    Insert a quiz with its questions as one unit
+    
+    On a replica set or sharded cluster both inserts run in a transaction.
+    On a standalone server the quiz is deleted again if the questions
+    cannot be inserted.
+    """
+    if supports_transactions(db.client):
+        with db.client.start_session() as session:
+            with session.start_transaction():
+                db.quizzes.insert_one(quiz, session=session)
+                if questions:
+                    db.questions.insert_many(questions, session=session)
+        return
+    
+    db.quizzes.insert_one(quiz)
+    try:
+        if questions:
+            db.questions.insert_many(questions)
+    except PyMongoError:
+        db.questions.delete_many({"quiz_id": quiz["_id"]})
+        db.quizzes.delete_one({"_id": quiz["_id"]})
+        raise
+
+def iter_quiz_ndjson(quiz, questions):
+    """Yield a quiz as NDJSON: the quiz on the first line, then one question per line"""
+    yield json.dumps(QuizModel.to_dict(quiz), separators=(",", ":")) + "\n"
+    yield from render_chunks(
+        questions,
+        lambda question: json.dumps(
+            QuestionModel.to_dict(question, include_correct_answers=True), separators=(",", ":")
+        ) + "\n"
+    )
+
+def iter_quiz_json(quiz, questions):
+    """Yield a quiz as one JSON object with a 'questions' array, rendered question by question"""
+    head = json.dumps(QuizModel.to_dict(quiz), separators=(",", ":"))
+    yield head[:-1] + ',"questions":['
+    first = [True]
+    
+    def render(question):
+        separator = "" if first[0] else ","
+        first[0] = False
+        return separator + json.dumps(
+            QuestionModel.to_dict(question, include_correct_answers=True), separators=(",", ":")
+        )
+    
+    yield from render_chunks(questions, render)
+    yield "]}"
@@ -0,0 +1,107 @@
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
+from app.models.quiz import QuizModel
+from app.models.question import QuestionModel
+from app.utils.http_cache import quiz_validators
+from app.utils.queries import PUBLISHED_QUIZZES, QUESTION_ORDER, quiz_questions_filter
+
+def build_read_document(quiz, questions, built_at):
+    """
+    Build the public read document of a published quiz
+    
+    The 'quiz' field holds the exact payload of GET /quizzes/<slug_or_id>:
+    the quiz with its ordered questions, correct answers stripped.
+    """
+    quiz_dict = QuizModel.to_dict(quiz)
+    quiz_dict["questions"] = [
+        QuestionModel.to_dict(q, include_correct_answers=False)
+        for q in questions
+    ]
+    etag, last_modified = quiz_validators(quiz, questions)
+    return {
+        "_id": quiz["_id"],
+        "slug": quiz.get("slug"),
+        "quiz": quiz_dict,
+        "etag": etag,
+        "last_modified": last_modified,
+        "built_at": built_at
+    }
+
+def refresh_read_model(db, quiz_id):
+    """
+    Rebuild (or remove) the read document of one quiz after a write
+    
+    Unpublished and deleted quizzes have no read document. A rebuild never
+    overwrites a document built from a later snapshot.
+    """
+    quiz_id = ObjectId(quiz_id)
+    built_at = datetime.utcnow()
+    quiz = db.quizzes.find_one({"_id": quiz_id})
+    if not quiz or not quiz.get("published"):
+        db.quiz_read_models.delete_one({"_id": quiz_id})
+        return None
+    
+    questions = list(
+        db.questions.find(quiz_questions_filter(quiz_id))
+        .sort(QUESTION_ORDER)
+    )
+    document = build_read_document(quiz, questions, built_at)
+    try:
+        db.quiz_read_models.replace_one(
+            {"_id": quiz_id, "built_at": {"$lt": built_at}},
+            document,
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent refresh already stored a newer snapshot
+        pass
+    return document
+
+def read_document_filter(slug_or_id):
+    """Filter matching a read document by ID or slug, and the ID if valid"""
+    try:
+        quiz_id = ObjectId(slug_or_id)
+    except (InvalidId, TypeError):
+        return {"slug": slug_or_id}, None
+    return {"$or": [{"_id": quiz_id}, {"slug": slug_or_id}]}, quiz_id
+
+def _pick_read_document(documents, quiz_id):
+    """An ID match wins over a slug match, like the two-step lookup"""
+    for document in documents:
+        if document["_id"] == quiz_id:
+            return document
+    return documents[0] if documents else None
+
+def find_read_document(db, slug_or_id):
+    """
+    Find the read document of a published quiz in one query
+    
+    Matches by ID or slug; an ID match wins, like the two-step lookup.
+    """
+    read_filter, quiz_id = read_document_filter(slug_or_id)
+    return _pick_read_document(list(db.quiz_read_models.find(read_filter).limit(2)), quiz_id)
+
+async def find_read_document_async(db, slug_or_id):
+    """find_read_document() for an async (AsyncMongoClient) database"""
+    read_filter, quiz_id = read_document_filter(slug_or_id)
+    return _pick_read_document(await db.quiz_read_models.find(read_filter).limit(2).to_list(), quiz_id)
+
+def rebuild_read_models(db, progress=None):
+    """
+    Build read documents for every published quiz and drop stale ones
+    
+    Returns:
+        int: Number of read documents built
+    """
+    built = 0
+    published_ids = []
+    for quiz in db.quizzes.find(PUBLISHED_QUIZZES, {"_id": 1}).batch_size(500):
+        refresh_read_model(db, quiz["_id"])
+        published_ids.append(quiz["_id"])
+        built += 1
+        if progress:
+            progress(built)
+    db.quiz_read_models.delete_many({"_id": {"$nin": published_ids}})
+    return built
@@ -0,0 +1,205 @@
+import threading
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from app.models.regrade_job import RegradeJobModel
+from app.utils.analytics import invalidate_quiz_analytics
+from app.utils.answer_key_cache import compile_answer_key
+from app.utils.queries import QUESTION_ORDER, REGRADE_ORDER, regrade_attempts_filter
+from app.utils.quiz_stats import attempt_stats_delta, combine_deltas, apply_stats_deltas
+from app.utils.scoring import grade_attempt
+
+class RegradeInProgress(Exception):
+    """Raised when another regrade job is already running for the quiz"""
+
+def load_answer_key(db, quiz_id):
+    """Compile the current answer key of a quiz, published or not"""
+    quiz = db.quizzes.find_one({"_id": quiz_id})
+    if not quiz:
+        return None
+    questions = list(
+        db.questions.find(quiz_questions_filter(quiz_id))
+        .sort(QUESTION_ORDER)
+    )
+    return compile_answer_key(quiz, questions)
+
+def regrade_operation(answer_key, attempt):
+    """
+    Regrade one stored attempt
+    
+    Returns:
+        tuple: (UpdateOne for the changed score fields, quiz_stats $inc delta),
+        or (None, None) if the stored grading is already current
+    """
+    stored_answers = attempt.get("answers", [])
+    answers = [
+        {
+            "question_id": str(answer.get("question_id")),
+            "selected_choice_ids": answer.get("selected_choice_ids", []),
+            "text_answer": answer.get("text_answer", "")
+        }
+        for answer in stored_answers
+    ]
+    score, graded = grade_attempt(answer_key, answers)
+    
+    # Answers to deleted questions no longer count towards max_score
+    questions = answer_key["questions"]
+    max_score = sum(questions[qid]["points"] for qid, _, _ in graded if qid in questions)
+    
+    changes = {}
+    for index, (stored_answer, (_, points_awarded, is_correct)) in enumerate(zip(stored_answers, graded)):
+        if stored_answer.get("points_awarded") != points_awarded:
+            changes[f"answers.{index}.points_awarded"] = points_awarded
+        if stored_answer.get("is_correct") != is_correct:
+            changes[f"answers.{index}.is_correct"] = is_correct
+    if attempt.get("score") != score:
+        changes["score"] = score
+    if attempt.get("max_score") != max_score:
+        changes["max_score"] = max_score
+    
+    if not changes:
+        return None, None
+    changes["regraded_at"] = datetime.utcnow()
+    
+    # Move the attempt's contribution to the live counters from old to new grading
+    regraded = {
+        "score": score,
+        "max_score": max_score,
+        "answers": [
+            {"question_id": stored_answer.get("question_id"), "is_correct": is_correct}
+            for stored_answer, (_, _, is_correct) in zip(stored_answers, graded)
+        ]
+    }
+    stats_delta = combine_deltas([attempt_stats_delta(regraded), attempt_stats_delta(attempt, sign=-1)])
+    return UpdateOne({"_id": attempt["_id"]}, {"$set": changes}), stats_delta
+
+def claim_regrade_job(db, quiz_id, batch_size, resume=False):
+    """
+    Atomically mark the regrade job of a quiz as running
+    
+    With resume, an interrupted or failed job continues after its last
+    checkpointed attempt instead of starting over.
+    
+    Raises:
+        RegradeInProgress: If a job for the quiz is running and not stale
+    """
+    previous = db.regrade_jobs.find_one({"_id": quiz_id})
+    if resume and previous and previous.get("status") != "completed":
+        fields = RegradeJobModel.create_job(
+            quiz_id,
+            batch_size,
+            last_attempt_id=previous.get("last_attempt_id"),
+            processed=previous.get("processed", 0),
+            updated=previous.get("updated", 0)
+        )
+    else:
+        fields = RegradeJobModel.create_job(quiz_id, batch_size)
+    
+    # A running job that stopped checkpointing (e.g. its worker died) can be taken over
+    stale_before = datetime.utcnow() - timedelta(seconds=Config.REGRADE_STALE_AFTER)
+    try:
+        return db.regrade_jobs.find_one_and_update(
+            {
+                "_id": quiz_id,
+                "$or": [{"status": {"$ne": "running"}}, {"updated_at": {"$lt": stale_before}}]
+            },
+            {"$set": fields},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise RegradeInProgress(f"A regrade of quiz {quiz_id} is already running")
+
+def run_regrade(db, job, progress=None):
+    """
+    Regrade all attempts of a claimed job's quiz
+    
+    Streams attempts in _id order with a batched cursor and writes changed
+    scores with one unordered bulk_write per batch, checkpointing the job
+    after each batch.
+    
+    Args:
+        db: Database handle
+        job: Job document returned by claim_regrade_job
+        progress: Optional callable receiving the job document after each batch
+    
+    Returns:
+        dict: The final job document
+    """
+    quiz_id = job["_id"]
+    batch_size = job["batch_size"]
+    
+    def checkpoint(fields):
+        fields["updated_at"] = datetime.utcnow()
+        job.update(fields)
+        db.regrade_jobs.update_one({"_id": quiz_id}, {"$set": fields})
+        if progress:
+            progress(job)
+    
+    try:
+        answer_key = load_answer_key(db, quiz_id)
+        if answer_key is None:
+            raise ValueError("Quiz not found")
+        
+        query = regrade_attempts_filter(quiz_id, job.get("last_attempt_id"))
+        checkpoint({"total": job["processed"] + db.attempts.count_documents(query)})
+        
+        cursor = (
+            db.attempts.find(query, {"answers": 1, "score": 1, "max_score": 1})
+            .sort(REGRADE_ORDER)
+            .batch_size(batch_size)
+        )
+        
+        operations = []
+        stats_delta = {}
+        pending = 0
+        for attempt in cursor:
+            operation, attempt_delta = regrade_operation(answer_key, attempt)
+            if operation is not None:
+                operations.append(operation)
+                combine_deltas([attempt_delta], stats_delta)
+            pending += 1
+            
+            if pending == batch_size:
+                if operations:
+                    db.attempts.bulk_write(operations, ordered=False)
+                    apply_stats_deltas(db.quiz_stats, {quiz_id: stats_delta})
+                checkpoint({
+                    "processed": job["processed"] + pending,
+                    "updated": job["updated"] + len(operations),
+                    "last_attempt_id": attempt["_id"]
+                })
+                operations = []
+                stats_delta = {}
+                pending = 0
+        
+        if pending:
+            if operations:
+                db.attempts.bulk_write(operations, ordered=False)
+                apply_stats_deltas(db.quiz_stats, {quiz_id: stats_delta})
+            checkpoint({
+                "processed": job["processed"] + pending,
+                "updated": job["updated"] + len(operations),
+                "last_attempt_id": attempt["_id"]
+            })
+        
+        checkpoint({"status": "completed", "finished_at": datetime.utcnow()})
+    except Exception as e:
+        checkpoint({"status": "failed", "error": str(e), "finished_at": datetime.utcnow()})
+    finally:
+        # Cached stats were computed from the old scores (even a failed run changed some)
+        invalidate_quiz_analytics(db, quiz_id)
+    
+    return job
+
+def start_regrade_thread(db, job):
+    """Run a claimed regrade job in a background thread"""
+    thread = threading.Thread(
+        target=run_regrade,
+        args=(db, job),
+        name=f"regrade-{job['_id']}",
+        daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,173 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from bson import ObjectId
+from flask import Response, request
+from werkzeug.http import parse_accept_header
+from config import Config
+from app.utils.http_cache import is_not_modified, validator_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fixed per-entry bookkeeping cost counted against the byte budget
+ENTRY_OVERHEAD = 256
+
+ENCODERS = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+    "br": (lambda body: brotli.compress(body, quality=5)) if brotli else None
+}
+
+def enabled_encodings():
+    """Configured precompression encodings that are available, in preference order"""
+    names = [name.strip() for name in Config.RESPONSE_CACHE_ENCODINGS.split(",") if name.strip()]
+    return [name for name in names if ENCODERS.get(name)]
+
+class ResponseCache:
+    """
+    Per-process LRU of rendered public quiz JSON bodies, bounded in bytes
+    
+    One entry per quiz holds the rendered body for one quiz version (its ETag)
+    plus precompressed variants. A request for a newer version replaces it.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, etag):
+        """Get the rendered variants of a quiz version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["etag"] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["bodies"]
+    
+    def put(self, key, etag, body):
+        """
+        Store a rendered body and its precompressed variants
+        
+        Returns:
+            dict: Encoding ("identity", "gzip", "br") to body bytes
+        """
+        bodies = {"identity": body}
+        for encoding in enabled_encodings():
+            bodies[encoding] = ENCODERS[encoding](body)
+        entry_size = sum(len(b) for b in bodies.values()) + ENTRY_OVERHEAD
+        
+        with self._lock:
+            self._remove(key)
+            if entry_size > self.max_bytes:
+                return bodies
+            self._entries[key] = {"etag": etag, "bodies": bodies, "size": entry_size}
+            self.size += entry_size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return bodies
+    
+    def invalidate(self, key):
+        """Drop the rendered bodies of a quiz"""
+        with self._lock:
+            self._remove(str(ObjectId(key)))
+    
+    def clear(self):
+        """Drop all rendered bodies"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+    
+    def _remove(self, key):
+        """Remove an entry (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry["size"]
+
+# Shared by the admin and public controllers in this process
+response_cache = ResponseCache(Config.RESPONSE_CACHE_MAX_BYTES)
+
+def render_json(payload):
+    """Render a payload to bytes exactly as jsonify does outside debug mode"""
+    return f"{json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(',', ':'))}\n".encode("utf-8")
+
+def _negotiate(etag, last_modified, request_headers):
+    """
+    Content coding of a response and whether the client already has it
+    
+    Returns:
+        tuple: (encoding, variant ETag, 304 headers or None)
+    """
+    offers = enabled_encodings() + ["identity"] if response_cache.max_bytes else ["identity"]
+    encoding = parse_accept_header(request_headers.get("Accept-Encoding")).best_match(offers, default="identity")
+    variant_etag = etag if encoding == "identity" else f"{etag}-{encoding}"
+    
+    if is_not_modified(request_headers, variant_etag, last_modified):
+        headers = validator_headers(variant_etag, last_modified)
+        headers["Vary"] = "Accept-Encoding"
+        return encoding, variant_etag, headers
+    return encoding, variant_etag, None
+
+def _variant(bodies, encoding, etag, variant_etag, last_modified):
+    """The (status, body, headers) of the negotiated variant of cached bodies"""
+    if encoding not in bodies:
+        # Rendered before the encoding was configured
+        encoding, variant_etag = "identity", etag
+    headers = validator_headers(variant_etag, last_modified)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept-Encoding"
+    return 200, bodies[encoding], headers
+
+def cached_body(key, etag, last_modified, build_payload, request_headers):
+    """
+    Pick the pre-rendered, precompressed body of a public JSON payload
+    
+    Compressed variants get their own ETag (suffixed with the encoding), as a
+    strong validator must differ per content coding. The payload is built
+    and rendered only on a cache miss; a 304 never touches the cache. Shared
+    by the Flask and ASGI public endpoints.
+    
+    Returns:
+        tuple: (status, body bytes or None for a 304, response headers)
+    """
+    encoding, variant_etag, not_modified = _negotiate(etag, last_modified, request_headers)
+    if not_modified is not None:
+        return 304, None, not_modified
+    
+    if not response_cache.max_bytes:
+        bodies = {"identity": render_json(build_payload())}
+    else:
+        bodies = response_cache.get(key, etag)
+        if bodies is None:
+            bodies = response_cache.put(key, etag, render_json(build_payload()))
+    return _variant(bodies, encoding, etag, variant_etag, last_modified)
+
+async def cached_body_async(key, etag, last_modified, build_payload, request_headers):
+    """cached_body() whose build_payload is a coroutine function (e.g. one that queries MongoDB)"""
+    encoding, variant_etag, not_modified = _negotiate(etag, last_modified, request_headers)
+    if not_modified is not None:
+        return 304, None, not_modified
+    
+    if not response_cache.max_bytes:
+        bodies = {"identity": render_json(await build_payload())}
+    else:
+        bodies = response_cache.get(key, etag)
+        if bodies is None:
+            bodies = response_cache.put(key, etag, render_json(await build_payload()))
+    return _variant(bodies, encoding, etag, variant_etag, last_modified)
+
+def cached_json(key, etag, last_modified, build_payload):
+    """Serve a public JSON payload from the response cache (see cached_body)"""
+    status, body, headers = cached_body(key, etag, last_modified, build_payload, request.headers)
+    if body is None:
+        return Response(status=status, headers=headers)
+    return Response(body, status=status, headers=headers, mimetype="application/json")
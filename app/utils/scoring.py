@@ -1,5 +1,46 @@
 from bson import ObjectId
 from bson.errors import InvalidId
+from app.utils.text_matching import TextMatcher
+
+# Scoring policies of MCQ_MULTI questions (see multi_choice_points)
+SCORING_POLICIES = ["all_or_nothing", "proportional", "right_minus_wrong", "negative"]
+
+def multi_choice_points(question, right, wrong, correct_count):
+    """
+    Points of an MCQ_MULTI answer under the question's scoring policy
+    
+    - all_or_nothing: full points for exactly the correct choices
+    - proportional: points * right / correct_count, nothing if any wrong
+      choice is selected
+    - right_minus_wrong: points * (right - wrong) / correct_count, at least 0
+    - negative: full points for exactly the correct choices, nothing without
+      a selection, otherwise minus the question's penalty
+    
+    Args:
+        question: Question document or compiled question ('scoring',
+            'points' and 'penalty')
+        right: Number of correct choices selected
+        wrong: Number of other choices (or unknown IDs) selected
+        correct_count: Number of correct choices
+    
+    Returns:
+        tuple: (points_awarded, is_correct)
+    """
+    points = question.get("points", 1)
+    is_correct = right == correct_count and not wrong
+    scoring = question.get("scoring") or "all_or_nothing"
+    if is_correct or not correct_count or scoring == "all_or_nothing":
+        return (points if is_correct else 0, is_correct)
+    
+    if scoring == "proportional":
+        awarded = 0 if wrong else points * right / correct_count
+    elif scoring == "right_minus_wrong":
+        awarded = max(0, points * (right - wrong) / correct_count)
+    elif scoring == "negative":
+        awarded = -(question.get("penalty") or 0) if right or wrong else 0
+    else:
+        awarded = 0
+    return (round(awarded, 2), False)
 
 def grade_answer(question, answer_data):
     """
@@ -69,9 +110,11 @@ def grade_mcq_multi(question, answer_data, points):
             if choice_id:
                 correct_ids.add(choice_id)
     
-    # Check if selected set matches correct set exactly
-    is_correct = selected_ids == correct_ids
-    return (points if is_correct else 0, is_correct)
+    # IDs that are not choices count as one wrong selection, as in compiled keys
+    choice_ids = set(choice.get("_id") for choice in choices if choice.get("_id"))
+    right = len(selected_ids & correct_ids)
+    wrong = len(selected_ids & choice_ids - correct_ids) + bool(selected_ids - choice_ids)
+    return multi_choice_points(question, right, wrong, len(correct_ids))
 
 def grade_true_false(question, answer_data, points):
     """Grade a true/false question"""
@@ -100,11 +143,8 @@ def grade_true_false(question, answer_data, points):
     return (points if is_correct else 0, is_correct)
 
 def grade_text(question, answer_data, points):
-    """Grade a text answer question (exact match, case-insensitive)"""
-    user_answer = answer_data.get("text_answer", "").strip()
-    correct_answer = question.get("correct_text", "").strip()
-    
-    is_correct = user_answer.lower() == correct_answer.lower()
+    """Grade a text answer question against its accepted answers (see TextMatcher)"""
+    is_correct = TextMatcher.from_question(question).matches(answer_data.get("text_answer", ""))
     return (points if is_correct else 0, is_correct)
 
 def get_correct_answers(question):
@@ -132,6 +172,171 @@ def get_correct_answers(question):
         result["correct_choice_texts"] = correct_choice_texts
     elif question_type == "TEXT":
         result["correct_text"] = question.get("correct_text", "")
+        result["accepted_answers"] = question.get("accepted_answers") or []
     
     return result
 
+def normalize_choice_id(choice_id):
+    """
+    Normalize a submitted choice ID to the string form used in compiled keys
+    
+    Mirrors ObjectId() validation without allocating an ObjectId. Raises
+    InvalidId or TypeError for values ObjectId() would reject.
+    """
+    if isinstance(choice_id, ObjectId):
+        return str(choice_id)
+    if choice_id is None:
+        # ObjectId(None) generates a fresh ID, which never matches a choice
+        return ""
+    if isinstance(choice_id, str):
+        if len(choice_id) == 24:
+            try:
+                bytes.fromhex(choice_id)
+            except ValueError:
+                raise InvalidId(f"{choice_id!r} is not a valid ObjectId")
+            return choice_id.lower()
+        raise InvalidId(f"{choice_id!r} is not a valid ObjectId")
+    raise TypeError(f"id must be an instance of (str, ObjectId), not {type(choice_id)}")
+
+def compile_question(question):
+    """
+    Compile a question document into a grading key with plain string IDs
+    
+    Each choice ID maps to a bit so multi-choice answers compare as integer
+    masks instead of ObjectId sets, and the accepted answers of a TEXT
+    question are compiled into a TextMatcher.
+    
+    Returns:
+        dict: Question ID, type, points, choice bit table, correct mask, text
+        matcher and the precomputed correct answer summary used in attempt
+        responses
+    """
+    question_type = question.get("type")
+    choice_bits = {}
+    correct_mask = 0
+    for choice in question.get("choices", []):
+        choice_id = choice.get("_id")
+        if not choice_id:
+            continue
+        choice_id = str(choice_id)
+        is_correct = choice.get("is_correct", False)
+        if choice_id in choice_bits:
+            # grade_mcq_single matches the first choice with a given ID,
+            # grade_mcq_multi counts the ID as correct if any choice is
+            if question_type == "MCQ_MULTI" and is_correct:
+                correct_mask |= choice_bits[choice_id]
+            continue
+        bit = 1 << len(choice_bits)
+        choice_bits[choice_id] = bit
+        if is_correct:
+            correct_mask |= bit
+    
+    return {
+        "id": str(question["_id"]),
+        "type": question_type,
+        "points": question.get("points", 1),
+        "pool": question.get("pool"),
+        "choice_bits": choice_bits,
+        # Set for any selected ID that is not one of the choices
+        "unknown_bit": 1 << len(choice_bits),
+        "correct_mask": correct_mask,
+        "correct_count": correct_mask.bit_count(),
+        "scoring": question.get("scoring") or "all_or_nothing",
+        "penalty": question.get("penalty") or 0,
+        "text_matcher": TextMatcher.from_question(question) if question_type == "TEXT" else None,
+        "correct_answers": get_correct_answers(question)
+    }
+
+def selection_mask(compiled_question, selected_choice_ids):
+    """
+    Build the bitmask of selected choices for a compiled question
+    
+    Returns:
+        tuple: (mask, count) where count is the number of IDs submitted
+    
+    Raises:
+        InvalidId, TypeError: For IDs ObjectId() would reject
+    """
+    choice_bits = compiled_question["choice_bits"]
+    unknown_bit = compiled_question["unknown_bit"]
+    mask = 0
+    count = 0
+    for choice_id in selected_choice_ids:
+        mask |= choice_bits.get(normalize_choice_id(choice_id), unknown_bit)
+        count += 1
+    return mask, count
+
+def grade_compiled_answer(compiled_question, answer_data):
+    """
+    Grade a single answer against a compiled question
+    
+    Produces the same result as grade_answer on the source question document.
+    
+    Returns:
+        tuple: (points_awarded, is_correct)
+    """
+    question_type = compiled_question["type"]
+    points = compiled_question["points"]
+    
+    if question_type in ("MCQ_SINGLE", "TRUE_FALSE", "MCQ_MULTI"):
+        try:
+            mask, count = selection_mask(compiled_question, answer_data.get("selected_choice_ids", []))
+        except (InvalidId, TypeError):
+            return (0, False)
+        
+        if question_type == "MCQ_MULTI":
+            right = (mask & compiled_question["correct_mask"]).bit_count()
+            return multi_choice_points(
+                compiled_question, right, mask.bit_count() - right, compiled_question["correct_count"]
+            )
+        else:
+            if count != 1:
+                return (0, False)
+            is_correct = bool(mask & compiled_question["correct_mask"])
+        return (points if is_correct else 0, is_correct)
+    elif question_type == "TEXT":
+        is_correct = compiled_question["text_matcher"].matches(answer_data.get("text_answer", ""))
+        return (points if is_correct else 0, is_correct)
+    else:
+        return (0, False)
+
+def grade_attempt(compiled_quiz, answers):
+    """
+    Grade every answer of one attempt against a compiled answer key
+    
+    Args:
+        compiled_quiz: Answer key from compile_answer_key
+        answers: List of answer dicts with 'question_id' and the answer fields
+    
+    Returns:
+        tuple: (score, graded) where graded holds one
+        (question_id, points_awarded, is_correct) tuple per answer. Answers to
+        unknown questions score (0, False); callers validate IDs beforehand.
+    """
+    questions = compiled_quiz["questions"]
+    score = 0
+    graded = []
+    for answer_data in answers:
+        question_id = answer_data.get("question_id")
+        question = questions.get(question_id) if isinstance(question_id, str) else None
+        if question is None:
+            graded.append((question_id, 0, False))
+            continue
+        points_awarded, is_correct = grade_compiled_answer(question, answer_data)
+        score += points_awarded
+        graded.append((question_id, points_awarded, is_correct))
+    # Partial credit is rounded per answer; keep the sum free of float noise
+    return round(score, 2), graded
+
+def grade_many(compiled_quiz, attempts):
+    """
+    Grade a batch of attempts against the same compiled answer key
+    
+    Args:
+        compiled_quiz: Answer key from compile_answer_key
+        attempts: Iterable of answer lists, one per attempt
+    
+    Returns:
+        list: One (score, graded) tuple per attempt, as from grade_attempt
+    """
+    return [grade_attempt(compiled_quiz, answers) for answers in attempts]
@@ -1,5 +1,9 @@
 import re
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+# Slug allocations tried before a duplicate key error is given up on
+SLUG_ATTEMPTS = 5
 
 def generate_slug(title):
     """Generate a URL-friendly slug from a title"""
@@ -15,21 +19,64 @@ def generate_slug(title):
     slug = slug.strip('-')
     return slug
 
-def generate_unique_slug(db, title, exclude_id=None):
-    """Generate a unique slug by appending a number if needed"""
-    base_slug = generate_slug(title)
-    slug = base_slug
-    counter = 1
+def taken_slugs_pipeline(base_slug, exclude_id=None):
+    """
+    Aggregation summarizing the taken base_slug and base_slug-<n> slugs
     
-    while True:
-        query = {"slug": slug}
-        if exclude_id:
-            query["_id"] = {"$ne": ObjectId(exclude_id)}
-        
-        existing = db.quizzes.find_one(query)
-        if not existing:
-            return slug
-        
-        slug = f"{base_slug}-{counter}"
-        counter += 1
+    The anchored regex is a prefix scan of the slug index; the lowest and
+    highest taken suffixes (0 for base_slug itself) are computed server-side.
+    """
+    match = {"slug": {"$regex": f"^{re.escape(base_slug)}(-[0-9]{{1,9}})?$"}}
+    if exclude_id:
+        match["_id"] = {"$ne": ObjectId(exclude_id)}
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            "suffix": {"$cond": [
+                {"$eq": ["$slug", base_slug]},
+                0,
+                # Byte offset: the base slug may contain non-ASCII word characters
+                {"$toLong": {"$substr": ["$slug", len(base_slug.encode("utf-8")) + 1, 9]}}
+            ]}
+        }},
+        {"$group": {"_id": None, "lowest": {"$min": "$suffix"}, "highest": {"$max": "$suffix"}}}
+    ]
+
+def next_free_slug(db, base_slug, exclude_id=None):
+    """
+    Find a free slug for a base slug with one aggregation
+    
+    Returns:
+        str: base_slug if it is free, otherwise base_slug-<highest suffix + 1>
+    """
+    taken = next(db.quizzes.aggregate(taken_slugs_pipeline(base_slug, exclude_id)), None)
+    if not taken or taken["lowest"] != 0:
+        return base_slug
+    return f"{base_slug}-{taken['highest'] + 1}"
 
+def is_slug_conflict(error):
+    """Whether a DuplicateKeyError was raised by the unique slug index"""
+    key_pattern = (error.details or {}).get("keyPattern") or {}
+    return "slug" in key_pattern or "slug_unique" in str(error)
+
+def save_with_unique_slug(db, title, save, exclude_id=None):
+    """
+    Allocate a unique slug for a title and write it with save(slug)
+    
+    Instead of checking and then inserting, the write itself is relied on:
+    the unique slug index rejects a slug taken concurrently, and allocation
+    is retried up to SLUG_ATTEMPTS times.
+    
+    Returns:
+        str: The slug that was written
+    """
+    base_slug = generate_slug(title)
+    for attempt in range(SLUG_ATTEMPTS):
+        slug = next_free_slug(db, base_slug, exclude_id=exclude_id)
+        try:
+            save(slug)
+            return slug
+        except DuplicateKeyError as e:
+            if not is_slug_conflict(e) or attempt == SLUG_ATTEMPTS - 1:
+                raise
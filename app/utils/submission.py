@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.models.attempt import AttemptModel
+from app.utils.scoring import grade_attempt
+from app.utils.delivery import is_randomized, attempt_answer_key
+from app.utils.attempt_session import AttemptRejected, session_fields
+from app.utils.metrics import metrics
+
+def grade_submission(answer_key, data, claims=None):
+    """
+    Validate and grade a submitted attempt against a compiled answer key
+    
+    Shared by the sync and async public controllers; does no I/O.
+    
+    Args:
+        answer_key: Compiled answer key (see app/utils/answer_key_cache.py)
+        data: Submission body with name, email and answers
+        claims: Verified attempt token claims (see verify_attempt), if any
+    
+    Returns:
+        tuple: (attempt document without _id, per-question answer summary)
+    
+    Raises:
+        ValueError: If the submission does not match the quiz
+        AttemptRejected: If it does not match because the quiz's questions
+            changed after the attempt started
+    """
+    started = time.perf_counter()
+    version = answer_key["version"]
+    try:
+        attempt, correct_answers_summary = _grade(answer_key, data, claims)
+    except ValueError:
+        if claims and "nonce" in claims and claims["version"] != version:
+            raise AttemptRejected("The quiz's questions changed after this attempt started; start a new attempt")
+        raise
+    attempt.update(session_fields(claims, version))
+    metrics.observe("quiz_grading_duration_seconds", time.perf_counter() - started)
+    return attempt, correct_answers_summary
+
+def _grade(answer_key, data, claims):
+    """Validate and grade a submission (see grade_submission)"""
+    # Randomized quizzes are graded against the questions of the attempt token
+    if is_randomized(answer_key):
+        if not claims:
+            raise ValueError("attempt_token is required for this quiz")
+        answer_key = attempt_answer_key(answer_key, claims["seed"])
+    
+    question_count = len(answer_key["question_order"])
+    if not question_count:
+        raise ValueError("Quiz has no questions")
+    
+    # Validate submission data
+    # if not data.get("name"):
+    #     raise ValueError("Name is required")
+    # if not data.get("email"):
+    #     raise ValueError("Email is required")
+    
+    answers_data = data.get("answers", [])
+    if len(answers_data) != question_count:
+        raise ValueError(f"Expected {question_count} answers, got {len(answers_data)}")
+    
+    question_map = answer_key["questions"]
+    for answer_data in answers_data:
+        question_id = answer_data.get("question_id")
+        if not question_id:
+            raise ValueError("question_id is required for each answer")
+        if not question_map.get(question_id):
+            raise ValueError(f"Question {question_id} not found")
+    if len(set(answer_data["question_id"] for answer_data in answers_data)) != question_count:
+        raise ValueError("Each question must be answered once")
+    
+    # Grade all answers against the compiled key
+    total_score, graded = grade_attempt(answer_key, answers_data)
+    graded_answers = []
+    correct_answers_summary = []
+    
+    for answer_data, (question_id, points_awarded, is_correct) in zip(answers_data, graded):
+        question = question_map[question_id]
+        
+        # Store graded answer
+        try:
+            graded_answer = {
+                "question_id": ObjectId(question_id),
+                "selected_choice_ids": [ObjectId(cid) for cid in answer_data.get("selected_choice_ids", [])],
+                "text_answer": answer_data.get("text_answer", ""),
+                "points_awarded": points_awarded,
+                "is_correct": is_correct
+            }
+            graded_answers.append(graded_answer)
+        except (InvalidId, TypeError) as e:
+            raise ValueError(f"Invalid ID format in answer: {str(e)}")
+        
+        # Get correct answer for response
+        correct_answer_info = dict(question["correct_answers"])
+        correct_answer_info["is_correct"] = is_correct
+        correct_answer_info["points_awarded"] = points_awarded
+        correct_answer_info["max_points"] = question["points"]
+        correct_answers_summary.append(correct_answer_info)
+    
+    # Create attempt document
+    attempt = AttemptModel.create_attempt({
+        "quiz_id": answer_key["quiz_id"],
+        "name": data.get("name"),
+        "email": data.get("email"),
+        "score": total_score,
+        "max_score": answer_key["max_score"],
+        "answers": graded_answers
+    })
+    return attempt, correct_answers_summary
+
+def attempt_response(answer_key, attempt, correct_answers_summary):
+    """Build the submission response from a stored (or queued) attempt"""
+    max_score = attempt["max_score"]
+    return {
+        "attempt_id": str(attempt["_id"]),
+        "quiz_id": answer_key["quiz_id"],
+        "quiz_title": answer_key["title"],
+        "name": attempt.get("name"),
+        "email": attempt.get("email"),
+        "score": attempt["score"],
+        "max_score": max_score,
+        "percentage": round((attempt["score"] / max_score * 100) if max_score > 0 else 0, 2),
+        "submitted_at": attempt.get("submitted_at").isoformat(),
+        "answers": correct_answers_summary
+    }
+
+def attempt_start_response(answer_key, claims, token):
+    """Build the response of POST /quizzes/<slug>/start"""
+    deadline = claims["deadline"]
+    return {
+        "attempt_token": token,
+        "quiz_id": answer_key["quiz_id"],
+        "quiz_version": claims["version"],
+        "started_at": datetime.utcfromtimestamp(claims["started_at"]).isoformat(),
+        "deadline": datetime.utcfromtimestamp(deadline).isoformat() if deadline else None,
+        "time_limit_seconds": answer_key.get("time_limit_seconds")
+    }
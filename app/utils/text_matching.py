@@ -0,0 +1,144 @@
+import math
+import re
+import unicodedata
+
+# Numbers as typed in an answer; rejects nan, inf and digit separators that
+# float() would otherwise accept
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+
+# Upper bound of max_edit_distance on a question
+MAX_EDIT_DISTANCE = 3
+
+# An accepted answer tolerates one typo per this many characters (at most
+# max_edit_distance), so short answers such as "ab" never match loosely
+CHARS_PER_EDIT = 4
+
+def normalize_text(text, ignore_punctuation=False):
+    """
+    Normalize a TEXT answer for comparison
+    
+    Applies Unicode NFKC (full-width and compatibility forms), case folding
+    and whitespace collapsing; with ignore_punctuation, Unicode punctuation
+    is removed as well (symbols such as '+' are kept).
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    if ignore_punctuation:
+        text = "".join(char for char in text if not unicodedata.category(char).startswith("P"))
+    return " ".join(text.split())
+
+def parse_number(text):
+    """Parse a normalized answer as a finite number, or None if it is not one"""
+    if not NUMBER_PATTERN.fullmatch(text):
+        return None
+    value = float(text)
+    return value if math.isfinite(value) else None
+
+def within_edit_distance(first, second, limit):
+    """
+    Whether two strings are at most limit insertions, deletions or
+    substitutions apart
+    
+    Stops as soon as every alignment exceeds the limit, so the cost is
+    bounded by the shorter string times the rows it takes to get there.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    previous = list(range(len(first) + 1))
+    for row, second_char in enumerate(second, start=1):
+        current = [row]
+        for column, first_char in enumerate(first, start=1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char)
+            ))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+class TextMatcher:
+    """
+    Precompiled accepted answers of a TEXT question
+    
+    Built once per question version (see compile_question) so grading an
+    answer is a normalization plus a set lookup; edit distance checks only
+    visit the accepted answers that could possibly match. Numbers are never
+    stripped of punctuation nor matched by edit distance: a numeric answer
+    is graded by value alone, exactly or within numeric_tolerance.
+    """
+    
+    def __init__(self, answers, ignore_punctuation=False, numeric_tolerance=None, max_edit_distance=0):
+        self.ignore_punctuation = bool(ignore_punctuation)
+        self.numeric_tolerance = numeric_tolerance
+        self.max_edit_distance = max_edit_distance or 0
+        
+        # Numbers are parsed before punctuation is removed, so '3.5' stays 3.5
+        # and is not also accepted as '35'
+        normalized = set()
+        self.numbers = []
+        for answer in answers:
+            if not isinstance(answer, str):
+                continue
+            value = parse_number(normalize_text(answer).replace(" ", ""))
+            if value is not None:
+                self.numbers.append(value)
+                continue
+            answer = normalize_text(answer, self.ignore_punctuation)
+            if answer:
+                normalized.add(answer)
+        self.answers = frozenset(normalized)
+        
+        self.by_length = {}
+        if self.max_edit_distance:
+            for answer in self.answers:
+                if len(answer) >= CHARS_PER_EDIT:
+                    self.by_length.setdefault(len(answer), []).append(answer)
+    
+    @classmethod
+    def from_question(cls, question):
+        """Matcher of a question document (correct_text plus accepted_answers)"""
+        return cls(
+            [question.get("correct_text", "")] + list(question.get("accepted_answers") or []),
+            ignore_punctuation=question.get("ignore_punctuation", False),
+            numeric_tolerance=question.get("numeric_tolerance"),
+            max_edit_distance=question.get("max_edit_distance", 0)
+        )
+    
+    def matches(self, text):
+        """Whether a submitted answer is accepted"""
+        if not isinstance(text, str):
+            return False
+        
+        value = parse_number(normalize_text(text).replace(" ", ""))
+        if value is not None:
+            tolerance = self.numeric_tolerance or 0
+            return any(abs(value - number) <= tolerance for number in self.numbers)
+        
+        answer = normalize_text(text, self.ignore_punctuation)
+        if not answer:
+            return False
+        if answer in self.answers:
+            return True
+        if not self.by_length:
+            return False
+        
+        limit = self.max_edit_distance
+        for length in range(len(answer) - limit, len(answer) + limit + 1):
+            # Shorter accepted answers tolerate fewer typos
+            candidate_limit = min(limit, length // CHARS_PER_EDIT)
+            if abs(length - len(answer)) > candidate_limit:
+                continue
+            for candidate in self.by_length.get(length, ()):
+                if within_edit_distance(answer, candidate, candidate_limit):
+                    return True
+        return False
+    
+    def signature(self):
+        """JSON-serializable description of what the matcher accepts (for grading versions)"""
+        return [
+            sorted(self.answers), sorted(self.numbers), self.numeric_tolerance,
+            self.max_edit_distance, self.ignore_punctuation
+        ]
@@ -0,0 +1,113 @@
+from bson import ObjectId
+from app.utils.scoring import SCORING_POLICIES
+from app.utils.text_matching import MAX_EDIT_DISTANCE
+
+QUESTION_TYPES = ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE", "TEXT"]
+
+def question_error(data):
+    """
+    Validate the data of a new question
+    
+    Choices without an _id are given one, so the data can be passed to
+    QuestionModel.create_question as is.
+    
+    Returns:
+        str: Error message, or None if the question is valid
+    """
+    if not isinstance(data, dict):
+        return "Question must be a JSON object"
+    if not data.get("text"):
+        return "Question text is required"
+    
+    question_type = data.get("type")
+    if question_type not in QUESTION_TYPES:
+        return "Invalid question type"
+    
+    # Validate choices for MCQ and TRUE_FALSE
+    if question_type in ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE"]:
+        choices = data.get("choices", [])
+        if not choices or len(choices) < 2:
+            return "At least 2 choices are required for MCQ/TRUE_FALSE questions"
+        
+        # Generate IDs for choices if not provided
+        for choice in choices:
+            if "_id" not in choice:
+                choice["_id"] = ObjectId()
+    
+    # Validate correct_text for TEXT questions
+    if question_type == "TEXT":
+        if not data.get("correct_text"):
+            return "correct_text is required for TEXT questions"
+    error = text_answer_error(data) or scoring_error(data, question_type)
+    if error:
+        return error
+    
+    if data.get("pool") is not None and not isinstance(data["pool"], str):
+        return "pool must be a string"
+    return None
+
+def text_answer_error(data):
+    """
+    Validate the TEXT answer matching fields present in question data
+    
+    Returns:
+        str: Error message, or None if the fields (or their absence) are valid
+    """
+    accepted_answers = data.get("accepted_answers", [])
+    if not isinstance(accepted_answers, list) or not all(
+        isinstance(answer, str) and answer.strip() for answer in accepted_answers
+    ):
+        return "accepted_answers must be an array of non-empty strings"
+    if "ignore_punctuation" in data and not isinstance(data["ignore_punctuation"], bool):
+        return "ignore_punctuation must be a boolean"
+    tolerance = data.get("numeric_tolerance")
+    if tolerance is not None and (
+        not isinstance(tolerance, (int, float)) or isinstance(tolerance, bool) or not 0 <= tolerance < float("inf")
+    ):
+        return "numeric_tolerance must be a non-negative number"
+    distance = data.get("max_edit_distance", 0)
+    if not isinstance(distance, int) or isinstance(distance, bool) or not 0 <= distance <= MAX_EDIT_DISTANCE:
+        return f"max_edit_distance must be an integer from 0 to {MAX_EDIT_DISTANCE}"
+    return None
+
+def scoring_error(data, question_type):
+    """
+    Validate the scoring policy fields present in question data
+    
+    Args:
+        data: New question data, or an existing question merged with an update
+        question_type: Type of the question after the change
+    
+    Returns:
+        str: Error message, or None if the fields (or their absence) are valid
+    """
+    scoring = data.get("scoring", "all_or_nothing")
+    if scoring not in SCORING_POLICIES:
+        return f"scoring must be one of {', '.join(SCORING_POLICIES)}"
+    if scoring != "all_or_nothing" and question_type != "MCQ_MULTI":
+        return "Partial credit scoring is only supported for MCQ_MULTI questions"
+    penalty = data.get("penalty", 0)
+    if not isinstance(penalty, (int, float)) or isinstance(penalty, bool) or not 0 <= penalty < float("inf"):
+        return "penalty must be a non-negative number"
+    return None
+
+def delivery_error(data):
+    """
+    Validate the per-attempt delivery settings of a quiz
+    
+    Returns:
+        str: Error message, or None if the settings (or their absence) are valid
+    """
+    pools = data.get("pools", {})
+    if not isinstance(pools, dict):
+        return "pools must be an object of pool name to number of questions drawn"
+    for name, drawn in pools.items():
+        if not isinstance(drawn, int) or isinstance(drawn, bool) or drawn < 1:
+            return f"pools.{name} must be a positive integer"
+    time_limit = data.get("time_limit_seconds")
+    if time_limit is not None and (not isinstance(time_limit, int) or isinstance(time_limit, bool) or time_limit < 1):
+        return "time_limit_seconds must be a positive integer"
+    for field in ("shuffle_questions", "shuffle_choices"):
+        if field in data and not isinstance(data[field], bool):
+            return f"{field} must be a boolean"
+    return None
@@ -0,0 +1,13 @@
+"""
+ASGI entry point (SERVER_INTERFACE=asgi)
+    
+    gunicorn -c gunicorn.conf.py          # picks asgi:app and uvicorn workers
+    uvicorn asgi:app --workers 4          # or run uvicorn directly
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
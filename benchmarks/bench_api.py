@@ -0,0 +1,358 @@
+"""
+Reproducible benchmark of the quiz API, for comparing performance changes
+against a baseline.
+
+Seeds a dataset of a configurable size (quizzes, questions per quiz,
+attempts per quiz) into a scratch database on a local mongod (dropped
+afterwards) or into mongomock, builds the real Flask app with create_app()
+on it and drives these endpoints:
+    
+    published_quizzes   GET  /quizzes                  (get_published_quizzes)
+    quiz_by_slug        GET  /quizzes/<slug>           (get_quiz_by_slug)
+    submit_attempt      POST /quizzes/<slug>/attempt   (submit_attempt)
+    all_quizzes         GET  /admin/quizzes            (get_all_quizzes)
+
+through the Flask test client (no network) and/or over HTTP (a threaded
+werkzeug server on a free local port, keep-alive connections). Throughput
+and p50/p95/p99 latencies are reported as JSON. With --baseline, every
+mode/endpoint pair is compared with an earlier result file, and the exit
+status is 1 if any p95 or p99 grew, or throughput dropped, by more than
+--max-regression.
+
+Usage:
+    python -m benchmarks.bench_api --store mongomock --quizzes 50 --questions 20 \\
+        --attempts 200 --iterations 500 --output baseline.json
+    python -m benchmarks.bench_api --store mongomock --quizzes 50 --questions 20 \\
+        --attempts 200 --iterations 500 --baseline baseline.json --max-regression 0.15
+    python -m benchmarks.bench_api --store mongo --mongo-uri mongodb://localhost:27017 --mode http
+
+Results are only comparable between runs with the same dataset options,
+seed, store and machine; the comparison refuses results whose options
+differ. mongomock (pip install mongomock, not a runtime dependency)
+measures the application's own CPU cost without a server; use a local
+mongod for numbers that include MongoDB round trips.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+from werkzeug.serving import WSGIRequestHandler, make_server
+from benchmarks.bench_scoring import build_questions, build_attempts
+from benchmarks.load_test import percentile
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+ENDPOINTS = ["published_quizzes", "quiz_by_slug", "submit_attempt", "all_quizzes"]
+MODES = ["client", "http"]
+
+# Options that must match for two result files to be compared
+DATASET_OPTIONS = ["store", "quizzes", "questions", "attempts", "seed"]
+
+def seed_dataset(db, quiz_count, question_count, attempt_count, rng):
+    """
+    Insert published quizzes with questions of every type and graded attempts
+    
+    Returns:
+        list: (slug, question documents) per quiz
+    """
+    from app.utils.answer_key_cache import compile_answer_key
+    from app.utils.submission import grade_submission
+    
+    now = datetime.utcnow()
+    quizzes = []
+    for index in range(quiz_count):
+        quiz = {
+            "_id": ObjectId(),
+            "title": f"Benchmark Quiz {index}",
+            "slug": f"benchmark-quiz-{index}",
+            "description": "",
+            "published": True,
+            "created_at": now + timedelta(seconds=index),
+            "updated_at": now
+        }
+        questions = build_questions(question_count, rng)
+        for position, question in enumerate(questions):
+            question["quiz_id"] = quiz["_id"]
+            question["created_at"] = quiz["created_at"] + timedelta(milliseconds=position)
+            question["updated_at"] = now
+        db.quizzes.insert_one(quiz)
+        db.questions.insert_many(questions)
+        
+        answer_key = compile_answer_key(quiz, questions)
+        attempts = []
+        for answers in build_attempts(questions, attempt_count, rng):
+            attempt, _ = grade_submission(answer_key, {"name": "Bench", "answers": answers})
+            attempts.append(attempt)
+        if attempts:
+            db.attempts.insert_many(attempts)
+        quizzes.append((quiz["slug"], questions))
+    return quizzes
+
+def build_requests(quizzes, iterations, rng):
+    """
+    The (method, path, JSON body) sequence of every endpoint
+    
+    Built up front from the seeded RNG so every run sends the same requests.
+    """
+    requests = {}
+    requests["published_quizzes"] = [("GET", "/quizzes", None)] * iterations
+    requests["all_quizzes"] = [("GET", "/admin/quizzes", None)] * iterations
+    requests["quiz_by_slug"] = [
+        ("GET", f"/quizzes/{rng.choice(quizzes)[0]}", None) for _ in range(iterations)
+    ]
+    submissions = []
+    for _ in range(iterations):
+        slug, questions = rng.choice(quizzes)
+        answers = build_attempts(questions, 1, rng)[0]
+        submissions.append(("POST", f"/quizzes/{slug}/attempt", {"name": "Bench", "answers": answers}))
+    requests["submit_attempt"] = submissions
+    return requests
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (ms) of one endpoint run"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0
+    }
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler without the per-request access log line"""
+    
+    def log_request(self, code="-", size="-"):
+        pass
+
+def client_sender(app):
+    """Send function of one thread through the Flask test client"""
+    client = app.test_client()
+    
+    def send(method, path, body):
+        response = client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+    
+    return send
+
+def http_sender(port):
+    """Send function of one thread over a keep-alive HTTP connection"""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    
+    def send(method, path, body):
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    
+    return send
+
+def run_endpoint(make_sender, requests, concurrency, warmup):
+    """
+    Send requests from concurrency threads, each with its own sender
+    
+    Returns:
+        dict: Summary from summarize()
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    
+    def worker(share):
+        send = make_sender()
+        for method, path, body in share[:warmup]:
+            send(method, path, body)
+        local = []
+        local_errors = 0
+        for method, path, body in share:
+            started = time.perf_counter()
+            try:
+                status = send(method, path, body)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+    
+    shares = [requests[index::concurrency] for index in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+def compare(results, baseline, max_regression):
+    """
+    Compare results with a baseline result file
+    
+    Returns:
+        tuple: (comparison rows, list of regression descriptions)
+    """
+    rows = []
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        row = {"endpoint": key}
+        for metric, worse_if_higher in (("rps", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            if not previous.get(metric):
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric]
+            row[metric] = {"baseline": previous[metric], "current": result[metric], "change": round(change, 4)}
+            # p50 is reported but not gated; it hides tail regressions
+            if metric != "p50_ms" and (change if worse_if_higher else -change) > max_regression:
+                regressions.append(f"{key} {metric}: {previous[metric]} -> {result[metric]} ({change:+.1%})")
+        rows.append(row)
+    return rows, regressions
+
+def open_database(args):
+    """
+    The scratch database of the run
+    
+    Returns:
+        tuple: (client, database)
+    """
+    if args.store == "mongomock":
+        if mongomock is None:
+            raise SystemExit("--store mongomock needs the mongomock package (pip install mongomock)")
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(args.mongo_uri)
+    return client, client[f"quiz_bench_{ObjectId()}"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", choices=["mongomock", "mongo"], default="mongomock")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=20, help="Questions per quiz")
+    parser.add_argument("--attempts", type=int, default=50, help="Attempts seeded per quiz")
+    parser.add_argument("--iterations", type=int, default=300, help="Measured requests per endpoint and mode")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per thread first")
+    parser.add_argument("--concurrency", type=int, default=1, help="Client threads (keep 1 with mongomock)")
+    parser.add_argument("--mode", default="client,http", help="Comma-separated: client, http")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated subset of " + ", ".join(ENDPOINTS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the result JSON to this file")
+    parser.add_argument("--baseline", help="Result JSON of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed p95/p99/throughput change (0.10 = 10%%)")
+    args = parser.parse_args()
+    
+    modes = [mode.strip() for mode in args.mode.split(",") if mode.strip()]
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    for name, values, allowed in (("mode", modes, MODES), ("endpoint", endpoints, ENDPOINTS)):
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            parser.error(f"unknown {name}: {', '.join(unknown)}")
+    
+    client, db = open_database(args)
+    # create_app() only checks that a URI is configured; the client is injected below
+    os.environ.setdefault("MONGO_URI", args.mongo_uri)
+    from config import Config
+    from app import create_app
+    from app.utils import database
+    from app.utils.indexes import ensure_indexes
+    
+    server = None
+    try:
+        if args.store == "mongo":
+            ensure_indexes(db)
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        quizzes = seed_dataset(db, args.quizzes, args.questions, args.attempts, rng)
+        seed_seconds = time.perf_counter() - started
+        requests = build_requests(quizzes, args.iterations, rng)
+        
+        database.db, database.client, database.client_pid = db, client, os.getpid()
+        Config.ENSURE_INDEXES_ON_STARTUP = False
+        app = create_app(Config)
+        
+        results = {}
+        for mode in modes:
+            if mode == "http":
+                server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                make_sender = lambda: http_sender(server.server_port)
+            else:
+                make_sender = lambda: client_sender(app)
+            for endpoint in endpoints:
+                result = run_endpoint(make_sender, requests[endpoint], args.concurrency, args.warmup)
+                results[f"{mode}/{endpoint}"] = result
+                print(
+                    f"{mode:<6} {endpoint:<18} {result['rps']:>9} req/s   p50 {result['p50_ms']:8.3f} ms   "
+                    f"p95 {result['p95_ms']:8.3f} ms   p99 {result['p99_ms']:8.3f} ms   errors {result['errors']}",
+                    file=sys.stderr, flush=True
+                )
+            if server is not None:
+                server.shutdown()
+                server = None
+    finally:
+        if server is not None:
+            server.shutdown()
+        database.db = database.client = database.client_pid = None
+        client.drop_database(db.name)
+        client.close()
+    
+    output = {
+        "options": {
+            "store": args.store, "quizzes": args.quizzes, "questions": args.questions,
+            "attempts": args.attempts, "iterations": args.iterations, "warmup": args.warmup,
+            "concurrency": args.concurrency, "seed": args.seed
+        },
+        "environment": {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()},
+        "created_at": datetime.utcnow().isoformat(),
+        "seed_seconds": round(seed_seconds, 3),
+        "results": results
+    }
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        mismatched = [
+            option for option in DATASET_OPTIONS
+            if baseline.get("options", {}).get(option) != output["options"][option]
+        ]
+        if mismatched:
+            raise SystemExit(f"Baseline was recorded with different options: {', '.join(mismatched)}")
+        output["comparison"], regressions = compare(results, baseline, args.max_regression)
+        output["regressions"] = regressions
+    
+    rendered = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(rendered + "\n")
+    print(rendered)
+    
+    if regressions:
+        print("Regressions over the baseline:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Compare public quiz fetch latency: two-collection reads vs. the
+materialized read document. Needs a running MongoDB; seeds and then drops
+a scratch database.
+
+Usage:
+    python -m benchmarks.bench_quiz_fetch --mongo-uri mongodb://localhost:27017 --questions 200
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+from app.utils.indexes import ensure_indexes
+from app.utils.read_model import refresh_read_model, find_read_document
+
+def seed(db, question_count):
+    """Insert one published quiz with question_count MCQ questions"""
+    now = datetime.utcnow()
+    quiz_id = db.quizzes.insert_one({
+        "title": "Benchmark Quiz",
+        "slug": "benchmark-quiz",
+        "description": "",
+        "published": True,
+        "created_at": now,
+        "updated_at": now
+    }).inserted_id
+    db.questions.insert_many([
+        {
+            "quiz_id": quiz_id,
+            "type": "MCQ_SINGLE",
+            "text": f"Question {i}",
+            "choices": [{"_id": ObjectId(), "text": f"Choice {c}", "is_correct": c == 0} for c in range(4)],
+            "correct_text": "",
+            "points": 1,
+            "created_at": now + timedelta(milliseconds=i),
+            "updated_at": now
+        }
+        for i in range(question_count)
+    ])
+    return quiz_id
+
+def fetch_two_collections(db, slug):
+    """The quiz lookup plus sorted questions scan used without read models"""
+    quiz = db.quizzes.find_one({"slug": slug, "published": True})
+    return quiz, list(db.questions.find({"quiz_id": quiz["_id"]}).sort("created_at", 1))
+
+def measure(fn, iterations):
+    """Return per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<18} p50 {statistics.median(latencies):7.3f} ms   p99 {p99:7.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    
+    client = MongoClient(args.mongo_uri)
+    db_name = f"quiz_bench_{ObjectId()}"
+    db = client[db_name]
+    try:
+        ensure_indexes(db)
+        quiz_id = seed(db, args.questions)
+        refresh_read_model(db, quiz_id)
+        
+        # Warm up connections and the server cache
+        measure(lambda: fetch_two_collections(db, "benchmark-quiz"), 20)
+        measure(lambda: find_read_document(db, "benchmark-quiz"), 20)
+        
+        print(f"{args.questions} questions, {args.iterations} fetches each")
+        report("two collections", measure(lambda: fetch_two_collections(db, "benchmark-quiz"), args.iterations))
+        report("read document", measure(lambda: find_read_document(db, "benchmark-quiz"), args.iterations))
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare per-answer grading (grade_answer) with the compiled batch engine
+(grade_many) on a synthetic quiz.
+
+Usage:
+    python -m benchmarks.bench_scoring --attempts 100000 --questions 40
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from bson import ObjectId
+from app.utils.scoring import grade_answer, grade_many
+from app.utils.answer_key_cache import compile_answer_key
+
+QUESTION_TYPES = ["MCQ_SINGLE", "MCQ_MULTI", "TRUE_FALSE", "TEXT"]
+
+def build_questions(count, rng):
+    """Build question documents covering every question type"""
+    questions = []
+    for i in range(count):
+        question_type = QUESTION_TYPES[i % len(QUESTION_TYPES)]
+        question = {
+            "_id": ObjectId(),
+            "type": question_type,
+            "text": f"Question {i}",
+            "points": rng.randint(1, 5),
+            "choices": [],
+            "correct_text": "",
+            "created_at": datetime.utcnow()
+        }
+        if question_type == "TEXT":
+            question["correct_text"] = f"answer {i}"
+        else:
+            choice_count = 2 if question_type == "TRUE_FALSE" else 5
+            correct = set(rng.sample(range(choice_count), 2 if question_type == "MCQ_MULTI" else 1))
+            question["choices"] = [
+                {"_id": ObjectId(), "text": f"Choice {c}", "is_correct": c in correct}
+                for c in range(choice_count)
+            ]
+        questions.append(question)
+    return questions
+
+def build_attempts(questions, count, rng):
+    """Build random answer lists, roughly half of them correct"""
+    attempts = []
+    for _ in range(count):
+        answers = []
+        for question in questions:
+            answer = {"question_id": str(question["_id"])}
+            if question["type"] == "TEXT":
+                answer["text_answer"] = question["correct_text"].upper() if rng.random() < 0.5 else "wrong"
+            else:
+                choices = question["choices"]
+                if question["type"] == "MCQ_MULTI":
+                    picked = rng.sample(choices, rng.randint(0, len(choices)))
+                else:
+                    picked = [rng.choice(choices)]
+                answer["selected_choice_ids"] = [str(c["_id"]) for c in picked]
+            answers.append(answer)
+        attempts.append(answers)
+    return attempts
+
+def grade_legacy(questions, attempts):
+    """Grade attempts one answer at a time, as submit_attempt used to"""
+    question_map = {str(q["_id"]): q for q in questions}
+    results = []
+    for answers in attempts:
+        score = 0
+        graded = []
+        for answer in answers:
+            points_awarded, is_correct = grade_answer(question_map[answer["question_id"]], answer)
+            score += points_awarded
+            graded.append((answer["question_id"], points_awarded, bool(is_correct)))
+        results.append((score, graded))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    questions = build_questions(args.questions, rng)
+    attempts = build_attempts(questions, args.attempts, rng)
+    quiz = {"_id": ObjectId(), "slug": "bench", "title": "Benchmark"}
+    
+    start = time.perf_counter()
+    legacy_results = grade_legacy(questions, attempts)
+    legacy_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    compiled_quiz = compile_answer_key(quiz, questions)
+    batch_results = grade_many(compiled_quiz, attempts)
+    batch_seconds = time.perf_counter() - start
+    
+    if legacy_results != batch_results:
+        raise SystemExit("grade_many results differ from grade_answer")
+    
+    answers = args.attempts * args.questions
+    print(f"{args.attempts} attempts x {args.questions} questions ({answers} answers)")
+    print(f"grade_answer: {legacy_seconds:.3f}s ({answers / legacy_seconds:,.0f} answers/s)")
+    print(f"grade_many:   {batch_seconds:.3f}s ({answers / batch_seconds:,.0f} answers/s)")
+    print(f"speedup:      {legacy_seconds / batch_seconds:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+HTTP load test of the public endpoints: sync (gunicorn gthread) vs. async
+(uvicorn) servers. Each virtual client holds one keep-alive connection and
+sends requests back to back; latency percentiles are reported per server
+and concurrency level.
+
+Start both servers against the same database, e.g.
+
+    SERVER_INTERFACE=wsgi PORT=8000 gunicorn -c gunicorn.conf.py
+    SERVER_INTERFACE=asgi PORT=8001 gunicorn -c gunicorn.conf.py
+
+Usage:
+    python -m benchmarks.load_test --target sync=http://localhost:8000 \\
+        --target async=http://localhost:8001 --path /quizzes/<slug> \\
+        --concurrency 100,1000,5000 --duration 20
+
+High concurrency needs a raised open-file limit (ulimit -n) on both sides.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+class Stats:
+    """Latencies (ms) and failures collected by the clients of one run"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def build_request(host, method, path, body):
+    """Raw HTTP/1.1 keep-alive request bytes"""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: keep-alive", "Accept: application/json"]
+    if body is not None:
+        lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+async def read_response(reader):
+    """Read one response, returning its status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    status = int(status_line.split()[1])
+    
+    content_length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            content_length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif content_length:
+        await reader.readexactly(content_length)
+    return status
+
+async def client(url, request, deadline, stats):
+    """One virtual client: a keep-alive connection sending requests until the deadline"""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            stats.latencies.append((time.perf_counter() - start) * 1000)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+async def run(base_url, method, path, body, concurrency, duration):
+    """Run one load level against one server"""
+    url = urlsplit(base_url)
+    request = build_request(url.netloc, method, path, body)
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(url, request, deadline, stats) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    latencies = sorted(stats.latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": stats.errors,
+        "statuses": stats.statuses,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p90_ms": round(percentile(latencies, 0.90), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, repeatable")
+    parser.add_argument("--path", required=True, help="e.g. /quizzes/<slug>")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", help="JSON file sent as the request body (e.g. an attempt for POST .../attempt)")
+    parser.add_argument("--concurrency", default="100,1000", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per load level")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    body = None
+    if args.body:
+        with open(args.body, "rb") as body_file:
+            body = json.dumps(json.load(body_file)).encode("utf-8")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    
+    results = []
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        for concurrency in levels:
+            result = asyncio.run(run(base_url, args.method, args.path, body, concurrency, args.duration))
+            result["target"] = name
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{name:<8} c={concurrency:<6} {result['rps']:>9} req/s   "
+                    f"p50 {result['p50_ms']:8.2f} ms   p90 {result['p90_ms']:8.2f} ms   "
+                    f"p99 {result['p99_ms']:8.2f} ms   errors {result['errors']}",
+                    flush=True
+                )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,115 @@ class Config:
     """Application configuration"""
     MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
     DB_NAME = os.environ.get("DB_NAME", "quiz_management")
+    
+    # MongoDB connection pool (one client per process, see app/utils/database.py)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Comma-separated wire compressors, e.g. "zstd,snappy,zlib"
+    MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "")
+    MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+    # Create the indexes declared in app/utils/indexes.py when a worker starts
+    ENSURE_INDEXES_ON_STARTUP = os.environ.get("ENSURE_INDEXES_ON_STARTUP", "True").lower() == "true"
+    # Test mode: fail startup if any controller query plan is a COLLSCAN
+    VERIFY_QUERY_PLANS = os.environ.get("VERIFY_QUERY_PLANS", "False").lower() == "true"
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
     
     # Flask settings
-    DEBUG = os.environ.get("FLASK_DEBUG", "True").lower() == "true"
+    DEBUG = os.environ.get("FLASK_DEBUG", "False").lower() == "true"
     HOST = os.environ.get("FLASK_HOST", "0.0.0.0")
     # Railway provides PORT automatically, fallback to FLASK_PORT or 5000
     PORT = int(os.environ.get("PORT") or os.environ.get("FLASK_PORT", "5000"))
-
+    
+    # Production server (gunicorn.conf.py): "wsgi" (Flask, gthread workers) or
+    # "asgi" (asyncio public endpoints on uvicorn workers, see app/asgi.py)
+    SERVER_INTERFACE = os.environ.get("SERVER_INTERFACE", "wsgi").lower()
+    # Worker processes and threads per worker (ASGI: threads serving the Flask endpoints)
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY") or min(2 * (os.cpu_count() or 1) + 1, 9))
+    WEB_THREADS = int(os.environ.get("WEB_THREADS", "8"))
+    WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "30"))
+    
+    # Per-process cache of compiled answer keys used to grade attempts
+    ANSWER_KEY_CACHE_SIZE = int(os.environ.get("ANSWER_KEY_CACHE_SIZE", "256"))
+    # Seconds before a cached key is reloaded (bounds staleness across workers)
+    ANSWER_KEY_CACHE_TTL = int(os.environ.get("ANSWER_KEY_CACHE_TTL", "60"))
+    
+    # Upper bound for ?limit= on paginated list endpoints
+    MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+    # Page size of endpoints that are always paginated (attempts listing)
+    DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "50"))
+    
+    # Attempts regraded per cursor batch and bulk_write
+    REGRADE_BATCH_SIZE = int(os.environ.get("REGRADE_BATCH_SIZE", "1000"))
+    # Seconds without a checkpoint before a running regrade job counts as dead
+    REGRADE_STALE_AFTER = int(os.environ.get("REGRADE_STALE_AFTER", "300"))
+    
+    # Serve GET /quizzes/<slug_or_id> from materialized quiz_read_models documents
+    # (run "python manage.py build-read-models" before enabling)
+    QUIZ_READ_MODEL = os.environ.get("QUIZ_READ_MODEL", "False").lower() == "true"
+    
+    # Cache-Control for public quiz GETs (seconds); clients and CDNs revalidate with ETags
+    PUBLIC_CACHE_MAX_AGE = int(os.environ.get("PUBLIC_CACHE_MAX_AGE", "10"))
+    PUBLIC_CACHE_STALE_WHILE_REVALIDATE = int(os.environ.get("PUBLIC_CACHE_STALE_WHILE_REVALIDATE", "30"))
+    
+    # Per-process cache of rendered public quiz JSON, in bytes (0 disables it)
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Precompressed variants to keep, in preference order ("br" needs the brotli package)
+    RESPONSE_CACHE_ENCODINGS = os.environ.get("RESPONSE_CACHE_ENCODINGS", "br,gzip")
+    
+    # Attempts fetched per cursor batch by the streaming attempts export
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Upper bound on the questions of one POST /admin/quizzes/import
+    IMPORT_MAX_QUESTIONS = int(os.environ.get("IMPORT_MAX_QUESTIONS", "5000"))
+    
+    # Seconds GET /admin/quizzes/<id>/stats serves cached analytics before recomputing
+    ANALYTICS_CACHE_TTL = int(os.environ.get("ANALYTICS_CACHE_TTL", "300"))
+    # Attempts younger than this are left for the next computation (covers writes in flight)
+    ANALYTICS_SETTLE_SECONDS = int(os.environ.get("ANALYTICS_SETTLE_SECONDS", "5"))
+    
+    # Attempt writes: "sync" (insert_one per submission) or "buffered" (write-behind queue)
+    ATTEMPT_WRITE_MODE = os.environ.get("ATTEMPT_WRITE_MODE", "sync").lower()
+    # Queued attempts per process before submissions get 503
+    ATTEMPT_QUEUE_SIZE = int(os.environ.get("ATTEMPT_QUEUE_SIZE", "10000"))
+    # Flush when this many attempts are queued or after this many milliseconds
+    ATTEMPT_FLUSH_SIZE = int(os.environ.get("ATTEMPT_FLUSH_SIZE", "500"))
+    ATTEMPT_FLUSH_INTERVAL_MS = int(os.environ.get("ATTEMPT_FLUSH_INTERVAL_MS", "200"))
+    # Local append-only files for batches Mongo could not take in time
+    # (run "python manage.py replay-spill" to insert them)
+    ATTEMPT_SPILL_DIR = os.environ.get("ATTEMPT_SPILL_DIR", "spill")
+    # Fraction of ATTEMPT_QUEUE_SIZE queued at which batches are spilled instead of inserted
+    ATTEMPT_SPILL_BACKLOG = float(os.environ.get("ATTEMPT_SPILL_BACKLOG", "0.8"))
+    # fsync every spill write (survives a host crash, costs a disk flush per batch)
+    ATTEMPT_SPILL_FSYNC = os.environ.get("ATTEMPT_SPILL_FSYNC", "False").lower() == "true"
+    
+    # Start tokens (POST /quizzes/<slug>/start): seconds an untimed token stays
+    # valid, and slack after a timed quiz's deadline for network latency
+    ATTEMPT_TOKEN_MAX_AGE = int(os.environ.get("ATTEMPT_TOKEN_MAX_AGE", "86400"))
+    ATTEMPT_DEADLINE_GRACE = int(os.environ.get("ATTEMPT_DEADLINE_GRACE", "10"))
+    # Where submitted start token nonces are kept: "mongo" (attempt_nonces
+    # collection with a TTL index, shared by all workers) or "memory" (per process)
+    NONCE_STORE = os.environ.get("NONCE_STORE", "mongo").lower()
+    NONCE_CACHE_SIZE = int(os.environ.get("NONCE_CACHE_SIZE", "100000"))
+    
+    # Request, MongoDB and grading metrics served at /metrics (Prometheus text format)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True").lower() == "true"
+    # Directory shared by the worker processes of one host; when set, /metrics
+    # reports the sum over all workers instead of the worker that answers
+    METRICS_DIR = os.environ.get("METRICS_DIR", "")
+    # Seconds between a worker's writes of its series to METRICS_DIR
+    METRICS_WRITE_INTERVAL = float(os.environ.get("METRICS_WRITE_INTERVAL", "1"))
+    
+    # Per-request profiling (function profile plus MongoDB command timeline), off
+    # unless a secret or a sampling rate is set. Requests sending the secret in
+    # the X-Profile header are profiled, as is this fraction of all requests.
+    PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+    # Functions listed per report, by self and by cumulative time
+    PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "25"))
+    # Where reports are kept: "memory" (last PROFILE_BUFFER_SIZE per process) or
+    # "mongo" (request_profiles collection, shared by all workers)
+    PROFILE_STORE = os.environ.get("PROFILE_STORE", "memory").lower()
+    PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", "100"))
+    PROFILE_RETENTION_SECONDS = int(os.environ.get("PROFILE_RETENTION_SECONDS", "86400"))
@@ -0,0 +1,45 @@
+"""
+gunicorn settings for production
+
+    gunicorn -c gunicorn.conf.py
+
+Each worker process runs WEB_THREADS request threads (gthread), so a
+deployment serves WEB_CONCURRENCY x WEB_THREADS concurrent requests. Attempt
+grading is CPU-bound and spreads across the worker processes; Mongo round
+trips overlap across the threads of each worker.
+
+With SERVER_INTERFACE=asgi the workers are uvicorn event loops serving
+asgi:app instead: the public /quizzes endpoints hold no thread per request,
+so each worker can keep thousands of connections open.
+"""
+from config import Config
+
+bind = f"{Config.HOST}:{Config.PORT}"
+workers = Config.WEB_CONCURRENCY
+if Config.SERVER_INTERFACE == "asgi":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    backlog = 4096
+else:
+    wsgi_app = "wsgi:app"
+    worker_class = "gthread"
+    threads = Config.WEB_THREADS
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_TIMEOUT
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth of per-process caches
+max_requests = 10000
+max_requests_jitter = 1000
+
+# MongoClient is not fork-safe: never import the app in the master process.
+# Each worker imports wsgi.py after the fork and opens its own client.
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+def post_fork(server, worker):
+    """Drop any MongoDB client inherited from the master process"""
+    from app.utils import database
+    database.reset_after_fork()
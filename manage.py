@@ -0,0 +1,162 @@
+"""
+Command line tools for the Quiz Management System
+
+Usage:
+    python manage.py regrade <quiz_id> [--batch-size N] [--resume]
+    python manage.py ensure-indexes
+    python manage.py verify-indexes [--ensure]
+    python manage.py build-read-models
+    python manage.py replay-spill [--spill-dir DIR]
+    python manage.py rebuild-stats [--quiz-id ID] [--batch-size N]
+"""
+import argparse
+import sys
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import Config
+from app.utils.attempt_writer import replay_spill_files
+from app.utils.database import get_db
+from app.utils.indexes import ensure_indexes as create_declared_indexes, verify_query_plans
+from app.utils.quiz_stats import rebuild_quiz_stats
+from app.utils.read_model import rebuild_read_models
+from app.utils.regrade import RegradeInProgress, claim_regrade_job, run_regrade
+
+def print_progress(job):
+    """Print regrade progress on one line"""
+    total = job.get("total")
+    processed = job.get("processed", 0)
+    percentage = f" ({processed / total * 100:.1f}%)" if total else ""
+    print(f"\r{job['status']}: {processed}/{total}{percentage} attempts, {job.get('updated', 0)} updated", end="", flush=True)
+
+def regrade(args):
+    """Regrade every attempt of a quiz against its current questions"""
+    try:
+        quiz_id = ObjectId(args.quiz_id)
+    except InvalidId:
+        print(f"Invalid quiz ID: {args.quiz_id}", file=sys.stderr)
+        return 1
+    
+    db = get_db()
+    if not db.quizzes.find_one({"_id": quiz_id}, {"_id": 1}):
+        print(f"Quiz not found: {args.quiz_id}", file=sys.stderr)
+        return 1
+    
+    try:
+        job = claim_regrade_job(db, quiz_id, args.batch_size, resume=args.resume)
+    except RegradeInProgress as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    
+    job = run_regrade(db, job, progress=print_progress)
+    print()
+    if job["status"] != "completed":
+        print(f"Regrade failed: {job.get('error')} (rerun with --resume to continue)", file=sys.stderr)
+        return 1
+    return 0
+
+def ensure_indexes(args):
+    """Create all declared indexes"""
+    failed = False
+    for collection_name, result in create_declared_indexes(get_db()).items():
+        if isinstance(result, str):
+            failed = True
+            print(f"✗ {collection_name}: {result}", file=sys.stderr)
+        else:
+            print(f"✓ {collection_name}: {', '.join(result)}")
+    return 1 if failed else 0
+
+def verify_indexes(args):
+    """Explain every controller query and fail on collection scans"""
+    db = get_db()
+    if args.ensure and ensure_indexes(args):
+        return 1
+    
+    report = verify_query_plans(db)
+    for query in report:
+        mark = "✗" if query["collscan"] else "✓"
+        print(f"{mark} {query['name']}: {' > '.join(query['stages'])}")
+    return 1 if any(query["collscan"] for query in report) else 0
+
+def build_read_models(args):
+    """Materialize the public read document of every published quiz"""
+    built = rebuild_read_models(
+        get_db(),
+        progress=lambda count: print(f"\r{count} quizzes", end="", flush=True)
+    )
+    print(f"\rBuilt {built} quiz read documents")
+    return 0
+
+def replay_spill(args):
+    """Insert attempts spilled to disk by the write-behind queue"""
+    try:
+        replayed = replay_spill_files(
+            get_db().attempts,
+            args.spill_dir,
+            progress=lambda count: print(f"\r{count} attempts", end="", flush=True)
+        )
+    except RuntimeError as e:
+        print(f"\n{e}", file=sys.stderr)
+        return 1
+    print(f"\rReplayed {replayed} spilled attempts")
+    return 0
+
+def rebuild_stats(args):
+    """Recompute the live quiz_stats counters from attempts"""
+    quiz_id = None
+    if args.quiz_id:
+        try:
+            quiz_id = ObjectId(args.quiz_id)
+        except InvalidId:
+            print(f"Invalid quiz ID: {args.quiz_id}", file=sys.stderr)
+            return 1
+    
+    counted = rebuild_quiz_stats(
+        get_db(),
+        quiz_id,
+        batch_size=args.batch_size,
+        progress=lambda count: print(f"\r{count} attempts", end="", flush=True)
+    )
+    print(f"\rCounted {counted} attempts")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz Management System tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    regrade_parser = subparsers.add_parser("regrade", help="Regrade all attempts of a quiz")
+    regrade_parser.add_argument("quiz_id")
+    regrade_parser.add_argument("--batch-size", type=int, default=Config.REGRADE_BATCH_SIZE)
+    regrade_parser.add_argument("--resume", action="store_true", help="Continue an interrupted regrade")
+    regrade_parser.set_defaults(handler=regrade)
+    
+    indexes_parser = subparsers.add_parser("ensure-indexes", help="Create the declared indexes")
+    indexes_parser.set_defaults(handler=ensure_indexes)
+    
+    verify_parser = subparsers.add_parser("verify-indexes", help="Fail if any controller query is a COLLSCAN")
+    verify_parser.add_argument("--ensure", action="store_true", help="Create the declared indexes first")
+    verify_parser.set_defaults(handler=verify_indexes)
+    
+    read_models_parser = subparsers.add_parser("build-read-models", help="Build quiz read documents")
+    read_models_parser.set_defaults(handler=build_read_models)
+    
+    spill_parser = subparsers.add_parser("replay-spill", help="Insert spilled attempts")
+    spill_parser.add_argument("--spill-dir", default=Config.ATTEMPT_SPILL_DIR)
+    spill_parser.set_defaults(handler=replay_spill)
+    
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute live quiz statistics")
+    stats_parser.add_argument("--quiz-id", help="Only this quiz (default: all quizzes)")
+    stats_parser.add_argument("--batch-size", type=int, default=1000)
+    stats_parser.set_defaults(handler=rebuild_stats)
+    
+    args = parser.parse_args()
+    # 0 would make pymongo pick its own batch size and put everything in one bulk_write
+    if getattr(args, "batch_size", 1) < 1:
+        parser.error("--batch-size must be a positive integer")
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from app.utils.text_matching import TextMatcher, within_edit_distance
+
+
+def test_ignore_punctuation_keeps_decimal_point():
+    matcher = TextMatcher(["3.5"], ignore_punctuation=True)
+    assert matcher.matches("3.5")
+    assert matcher.matches("3.50")
+    assert not matcher.matches("35")
+    assert not matcher.matches("3-5")
+
+
+def test_numbers_match_by_value_without_tolerance():
+    matcher = TextMatcher(["42"])
+    assert matcher.matches(" 42 ")
+    assert matcher.matches("42.0")
+    assert not matcher.matches("42.01")
+
+
+def test_numbers_match_within_tolerance():
+    matcher = TextMatcher(["3.14"], ignore_punctuation=True, numeric_tolerance=0.01)
+    assert matcher.matches("3.1416")
+    assert not matcher.matches("314")
+    assert not matcher.matches("3.2")
+
+
+def test_text_answers_still_ignore_punctuation():
+    matcher = TextMatcher(["New York"], ignore_punctuation=True)
+    assert matcher.matches("new york!")
+    assert matcher.matches("\"New York.\"")
+
+
+def test_short_answers_are_not_fuzzy_matched():
+    matcher = TextMatcher(["ab"], max_edit_distance=2)
+    assert matcher.matches("AB")
+    assert not matcher.matches("xy")
+    assert not matcher.matches("z")
+
+
+def test_edit_distance_is_capped_by_answer_length():
+    matcher = TextMatcher(["paris", "photosynthesis"], max_edit_distance=3)
+    # 5 characters tolerate a single typo
+    assert matcher.matches("pariss")
+    assert not matcher.matches("parsi")
+    # 14 characters tolerate the full three
+    assert matcher.matches("fotosynthesys")
+    assert not matcher.matches("fotosinthesys")
+
+
+def test_numbers_never_match_by_edit_distance():
+    matcher = TextMatcher(["12345"], max_edit_distance=3)
+    assert not matcher.matches("12346")
+
+
+def test_within_edit_distance():
+    assert within_edit_distance("kitten", "sitting", 3)
+    assert not within_edit_distance("kitten", "sitting", 2)
+    assert within_edit_distance("", "ab", 2)